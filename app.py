@@ -1,46 +1,42 @@
 import os
-from flask import Flask, render_template, redirect, url_for
+import threading
+import time
+import click
+from flask import Flask, render_template, redirect, url_for, current_app
+from flask.cli import AppGroup
 from flask_migrate import Migrate
 from flask_login import LoginManager, current_user
-from dotenv import load_dotenv
-from database import db, create_database_if_not_exists, init_db
+from config import Config
+from database import db, init_db, bootstrap_db
+from database.pool import opciones_engine
 from controllers.heladeria_controller import heladeria_bp
 from controllers.auth_controller import auth_bp
-from models.usuario import Usuario, UserMixin
+from models.usuario import Usuario
+from services.cache import init_cache
+from services.contrasenas import init_contrasenas
+from services.eventos import init_eventos, pendientes, procesar_lote, publicar
+from services.importador import ENTIDADES, TAMANO_LOTE, importar, leer_filas
+from services.instrumentacion import init_instrumentacion
+from services.inventario import sugerir_reposicion
+from services.plantillas import init_plantillas, precompilar_plantillas
+from services.reportes import reconstruir_resumenes
 
-# Cargar configuración desde .env
-load_dotenv()
-
-# Inicializar la aplicación y especificar la carpeta de templates
-app = Flask(__name__, template_folder='views')
-
-# Configuración de la base de datos
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-    f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-)
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.secret_key = os.getenv('SECRET_KEY', 'clave_secreta_predeterminada')
-
-# Crear la base de datos si no existe
-create_database_if_not_exists()
-
-# Inicializar la base de datos y migraciones
-init_db(app)
-migrate = Migrate(app, db)
+# Migraciones en la carpeta del proyecto (no en el directorio actual); en
+# modo batch para que las alteraciones de tablas funcionen también en SQLite
+migrate = Migrate(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'),
+                  render_as_batch=True)
 
 # Configurar Flask-Login
-login_manager = LoginManager(app)
+login_manager = LoginManager()
 login_manager.login_view = 'auth.login'  # Redirigir si no está autenticado
 login_manager.login_message = "Por favor, inicia sesión para acceder a esta página."
 
 # Cargar usuario desde la sesión
 @login_manager.user_loader
 def load_user(user_id):
-    return Usuario.query.get(int(user_id))
+    return db.session.get(Usuario, int(user_id))
 
 # Ruta principal (índice)
-@app.route('/')
 def index():
     # Verificar si el usuario está autenticado
     if current_user.is_authenticated:
@@ -48,10 +44,174 @@ def index():
     else:
         return redirect(url_for('auth.login'))  # Redirige al login si no está autenticado
 
-# Registrar los blueprints
-app.register_blueprint(auth_bp, url_prefix='/auth')
-app.register_blueprint(heladeria_bp, url_prefix='/heladeria')
+
+def create_app(config=None):
+    """
+    Crea la aplicación sin tocar la base de datos: las tablas se crean con
+    `flask heladeria init-db` o, si BOOTSTRAP_AUTOMATICO está activo, en la
+    primera solicitud.
+    `config` puede ser una clase/objeto de configuración o un diccionario.
+    """
+    # Inicializar la aplicación y especificar la carpeta de templates
+    app = Flask(__name__, template_folder='views')
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones_engine(app.config)
+
+    # Inicializar la base de datos, migraciones, sesión, caché, contraseñas y plantillas
+    init_db(app)
+    migrate.init_app(app, db)
+    login_manager.init_app(app)
+    init_cache(app)
+    init_contrasenas(app)
+    init_plantillas(app)
+    init_eventos(app)
+
+    # Registrar rutas y blueprints
+    app.add_url_rule('/', 'index', index)
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(heladeria_bp, url_prefix='/heladeria')
+
+    # Métricas y perfilado de todas las rutas (auth y heladería), solo si se piden
+    if app.config.get('INSTRUMENTACION'):
+        init_instrumentacion(app)
+
+    app.cli.add_command(heladeria_cli)
+    if app.config.get('BOOTSTRAP_AUTOMATICO'):
+        registrar_bootstrap_automatico(app)
+    return app
+
+
+def registrar_bootstrap_automatico(app):
+    """Ejecuta bootstrap_db una sola vez, antes de la primera solicitud."""
+    lock = threading.Lock()
+    listo = []
+
+    @app.before_request
+    def bootstrap_en_primer_uso():
+        if listo:
+            return
+        with lock:
+            if not listo:
+                bootstrap_db(app)
+                listo.append(True)
+
+
+# *** COMANDOS DE CONSOLA ***
+
+heladeria_cli = AppGroup('heladeria', help='Comandos de administración de la heladería.')
+
+
+@heladeria_cli.command('init-db')
+def init_db_command():
+    """Crea la base de datos y aplica las migraciones pendientes."""
+    bootstrap_db(current_app)
+    click.echo('Base de datos inicializada.')
+
+
+@heladeria_cli.command('precompilar')
+def precompilar_command():
+    """Compila las plantillas y guarda su bytecode (PLANTILLAS_BYTECODE_DIRECTORIO)."""
+    nombres = precompilar_plantillas(current_app)
+    click.echo(f'{len(nombres)} plantillas compiladas.')
+
+
+@heladeria_cli.command('eventos')
+@click.option('--una-vez', is_flag=True, help='Procesar lo pendiente y terminar.')
+def eventos_command(una_vez):
+    """Vacía el outbox de eventos en este proceso (en lugar de, o además de, los workers web)."""
+    despachador = current_app.extensions['heladeria_eventos']
+    if una_vez:
+        total = 0
+        while True:
+            reclamados = procesar_lote(despachador.lote, despachador.max_intentos, despachador.plazo)
+            total += reclamados
+            if reclamados < despachador.lote:
+                break
+        pendientes_, muertos = pendientes()
+        click.echo(f'{total} eventos procesados; {pendientes_} pendientes, {muertos} descartados.')
+        return
+    despachador.hilos = max(despachador.hilos, 1)
+    despachador.iniciar()
+    click.echo('Procesando eventos (Ctrl+C para terminar)...')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        despachador.detener()
+
+
+@heladeria_cli.command('reposicion')
+@click.option('--dias-historial', type=int, help='Días de ventas para estimar el consumo (REPOSICION_DIAS_HISTORIAL).')
+@click.option('--dias-cobertura', type=int, help='Días de consumo que cubre el pedido (REPOSICION_DIAS_COBERTURA).')
+def reposicion_command(dias_historial, dias_cobertura):
+    """Sugiere pedidos para los ingredientes bajo stock y publica el evento 'reposicion_sugerida' (para cron)."""
+    sugerencias = sugerir_reposicion(
+        dias_historial or current_app.config['REPOSICION_DIAS_HISTORIAL'],
+        dias_cobertura or current_app.config['REPOSICION_DIAS_COBERTURA'],
+    )
+    if not sugerencias:
+        click.echo('Ningún ingrediente bajo stock.')
+        return
+    for s in sugerencias:
+        dias = 'sin consumo' if s['dias_restantes'] is None else f"{s['dias_restantes']} días"
+        click.echo(f"{s['nombre']}: pedir {s['cantidad']} (hay {s['inventario']}, umbral {s['umbral']}, {dias})")
+    publicar('reposicion_sugerida', ingredientes=sugerencias)
+    db.session.commit()
+
+
+@heladeria_cli.command('reconstruir-reportes')
+@click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), help='Solo desde esta fecha (UTC); por defecto, todo el libro.')
+def reconstruir_reportes_command(desde):
+    """Rehace los resúmenes por hora y por día de los reportes desde el libro de ventas."""
+    filas = reconstruir_resumenes(desde.date() if desde else None)
+    click.echo(f'{filas} resúmenes por hora reconstruidos.')
+
+
+@heladeria_cli.command('import')
+@click.argument('archivo', type=click.File('r', encoding='utf-8'))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), help='Por defecto, según la extensión del archivo.')
+@click.option('--entidad', type=click.Choice(ENTIDADES), help='Entidad de las filas sin columna "entidad".')
+@click.option('--lote', default=TAMANO_LOTE, show_default=True, help='Filas por INSERT y por commit.')
+@click.option('--procesos', type=int, help='Procesos para hashear contraseñas (por defecto, uno por CPU).')
+@click.option('--solo-nuevos', is_flag=True, help='No modificar las filas que ya existen.')
+def import_command(archivo, formato, entidad, lote, procesos, solo_nuevos):
+    """
+    Importa usuarios, ingredientes, productos y recetas desde un CSV o JSONL,
+    con upserts en lotes. Volver a importar el mismo archivo no duplica nada.
+    """
+    if formato is None:
+        extension = os.path.splitext(archivo.name)[1].lower()
+        formato = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension)
+        if formato is None:
+            raise click.UsageError('No se reconoce el formato del archivo; indica --formato.')
+
+    ultimo = [time.perf_counter()]
+
+    def progreso(importador):
+        # Como mucho una línea por segundo
+        ahora = time.perf_counter()
+        if ahora - ultimo[0] >= 1:
+            ultimo[0] = ahora
+            click.echo(f'  {importador.total} filas ({importador.total / (ahora - importador.inicio):.0f} filas/s)')
+
+    resumen = importar(leer_filas(archivo, formato), entidad, tamano_lote=lote, procesos=procesos,
+                       solo_nuevos=solo_nuevos, progreso=progreso)
+
+    for numero, error in resumen['errores'][:20]:
+        click.echo(f'Línea {numero}: {error}', err=True)
+    if len(resumen['errores']) > 20:
+        click.echo(f'... y {len(resumen["errores"]) - 20} errores más', err=True)
+    detalle = ', '.join(f'{n} {e}' for e, n in resumen['por_entidad'].items() if n)
+    click.echo(f'{resumen["filas"]} filas importadas en {resumen["segundos"]:.2f} s '
+               f'({resumen["filas_por_segundo"]:.0f} filas/s){": " + detalle if detalle else ""}; '
+               f'{len(resumen["errores"])} con errores.')
+    if resumen['errores']:
+        raise SystemExit(1)
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
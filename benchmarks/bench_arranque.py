@@ -0,0 +1,63 @@
+"""
+Mide el costo de arranque de la aplicación en un proceso nuevo:
+- importación del módulo app,
+- create_app(),
+- primera solicitud atendida (incluye crear el engine y la primera conexión).
+
+Uso: python -m benchmarks.bench_arranque [--repeticiones 5] [--salida arranque.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.comun import RAIZ
+
+# Se ejecuta en un intérprete nuevo para no reutilizar módulos ya importados
+SCRIPT = '''
+import json, sys, time
+t0 = time.perf_counter()
+import app as modulo
+t1 = time.perf_counter()
+aplicacion = modulo.create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+t2 = time.perf_counter()
+respuesta = aplicacion.test_client().get('/heladeria/api/productos')
+t3 = time.perf_counter()
+assert respuesta.status_code == 200, respuesta.status_code
+print(json.dumps({'importacion_ms': (t1 - t0) * 1000, 'create_app_ms': (t2 - t1) * 1000,
+                  'primera_solicitud_ms': (t3 - t2) * 1000, 'total_ms': (t3 - t0) * 1000}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'arranque.db')}"
+        # Las tablas se crean una vez fuera de la medición, como haría `flask heladeria init-db`
+        subprocess.run([sys.executable, '-c', 'import sys, app; from database import bootstrap_db; '
+                        'bootstrap_db(app.create_app({"SQLALCHEMY_DATABASE_URI": sys.argv[1]}))', uri],
+                       cwd=RAIZ, check=True, capture_output=True)
+        muestras = []
+        for _ in range(args.repeticiones):
+            salida = subprocess.run([sys.executable, '-c', SCRIPT, uri], cwd=RAIZ, check=True,
+                                    capture_output=True, text=True).stdout
+            muestras.append(json.loads(salida.strip().splitlines()[-1]))
+
+    resultado = {clave: round(statistics.median(m[clave] for m in muestras), 2) for clave in muestras[0]}
+    resultado['repeticiones'] = args.repeticiones
+    texto = json.dumps(resultado, indent=2)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Suite reproducible de rendimiento de los endpoints REST, sin red ni MySQL:
+siembra N productos e ingredientes (con recetas) en SQLite en memoria o en
+archivo y mide listado, detalle, vender, reabastecer, login y refresh con el cliente
+de pruebas de Flask (secuencial) y con un servidor WSGI real bajo
+concurrencia. Informa p50/p99 y solicitudes por segundo en JSON.
+
+Uso:
+    python -m benchmarks.bench_endpoints medir [--tamanos 100,1000,10000] [--db memoria,archivo]
+        [--modos cliente,wsgi] [--solicitudes 500] [--solicitudes-login 20] [--concurrencia 16]
+        [--semilla 1] [--salida base.json]
+    python -m benchmarks.bench_endpoints comparar base.json nuevo.json [--umbral 0.10]
+
+`comparar` termina con código 1 si algún escenario empeoró más que el umbral
+(p50 o p99 más altos, o menos solicitudes por segundo).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import sqlalchemy
+
+from benchmarks.comun import (crear_app, percentiles, sembrar_ingredientes, sembrar_productos, sembrar_recetas,
+                              servidor_wsgi, token_para)
+from database import db
+from models.usuario import Usuario
+from services import sesiones
+from services.contrasenas import hashear
+from services.sesiones import emitir_token_refresco
+
+ESCENARIOS = ('listado', 'detalle', 'vender', 'reabastecer', 'login', 'refresh')
+METRICAS = (('p50_ms', 1), ('p99_ms', 1), ('req_por_segundo', -1))  # 1: más es peor; -1: menos es peor
+
+
+class Contexto:
+    """Datos sembrados y cabeceras con los que se arman las solicitudes."""
+
+    def __init__(self, productos, ingredientes, cabeceras, refresco):
+        self.productos = productos
+        self.ingredientes = ingredientes
+        self.cabeceras = cabeceras
+        self.refresco = refresco
+
+
+def solicitud(escenario, ctx, rng):
+    """(método, ruta, cuerpo JSON, cabeceras) de una solicitud del escenario."""
+    if escenario == 'listado':
+        return 'GET', f'/heladeria/api/productos?limit=100&after={rng.choice(ctx.productos)}', None, {}
+    if escenario == 'detalle':
+        return 'GET', f'/heladeria/api/productos/{rng.choice(ctx.productos)}', None, ctx.cabeceras['cliente']
+    if escenario == 'vender':
+        return 'POST', f'/heladeria/api/productos/vender/{rng.choice(ctx.productos)}', None, ctx.cabeceras['cliente']
+    if escenario == 'reabastecer':
+        return ('POST', f'/heladeria/api/ingredientes/reabastecer/{rng.choice(ctx.ingredientes)}',
+                {'cantidad': 1}, ctx.cabeceras['empleado'])
+    if escenario == 'login':
+        return 'POST', '/auth/api_login', {'username': 'bench_login', 'password': 'clave'}, {}
+    if escenario == 'refresh':
+        return 'POST', '/auth/refresh', {'refresh_token': ctx.refresco}, {}
+    raise ValueError(escenario)
+
+
+def sembrar(app, n):
+    with app.app_context():
+        productos = sembrar_productos(n)
+        ingredientes = sembrar_ingredientes(n)
+        sembrar_recetas(productos, ingredientes)
+        # Con el método de PASSWORD_HASH_METODO: el login mide ese costo (sin rehash)
+        usuario = Usuario(username='bench_login', password=hashear('clave'), es_cliente=True)
+        db.session.add(usuario)
+        db.session.commit()
+        cabeceras = {rol: token_para(rol) for rol in ('cliente', 'empleado')}
+        refresco = emitir_token_refresco(usuario)
+    return Contexto(productos, ingredientes, cabeceras, refresco)
+
+
+def ejecutar_cliente(app, solicitudes, concurrencia):
+    """Cliente de pruebas de Flask, una solicitud a la vez (sin red)."""
+    client = app.test_client()
+
+    def enviar(s):
+        metodo, ruta, cuerpo, cabeceras = s
+        inicio = time.perf_counter()
+        codigo = client.open(ruta, method=metodo, json=cuerpo, headers=cabeceras).status_code
+        return codigo, (time.perf_counter() - inicio) * 1000
+
+    return [enviar(s) for s in solicitudes]
+
+
+def ejecutar_wsgi(app, solicitudes, concurrencia):
+    """Servidor WSGI con hilos y `concurrencia` clientes HTTP simultáneos."""
+    with servidor_wsgi(app) as base:
+        def enviar(s):
+            metodo, ruta, cuerpo, cabeceras = s
+            datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+            cabeceras = dict(cabeceras, **({'Content-Type': 'application/json'} if datos else {}))
+            peticion = urllib.request.Request(base + ruta, data=datos, headers=cabeceras, method=metodo)
+            inicio = time.perf_counter()
+            try:
+                with urllib.request.urlopen(peticion, timeout=60) as respuesta:
+                    respuesta.read()
+                    codigo = respuesta.status
+            except urllib.error.HTTPError as e:
+                codigo = e.code
+            except OSError:
+                codigo = None
+            return codigo, (time.perf_counter() - inicio) * 1000
+
+        with ThreadPoolExecutor(max_workers=concurrencia) as clientes:
+            return list(clientes.map(enviar, solicitudes))
+
+
+MODOS = {'cliente': ejecutar_cliente, 'wsgi': ejecutar_wsgi}
+
+
+def medir_escenario(app, ctx, escenario, modo, args):
+    rng = random.Random(f'{args.semilla}-{escenario}')
+    # Cada login verifica un hash pbkdf2 (cientos de ms): se mide con menos solicitudes
+    total = args.solicitudes_login if escenario == 'login' else args.solicitudes
+    calentamiento = [solicitud(escenario, ctx, rng) for _ in range(min(args.calentamiento, total))]
+    solicitudes = [solicitud(escenario, ctx, rng) for _ in range(total)]
+    concurrencia = args.concurrencia if modo == 'wsgi' else 1
+
+    MODOS[modo](app, calentamiento, concurrencia)
+    inicio = time.perf_counter()
+    resultados = MODOS[modo](app, solicitudes, concurrencia)
+    duracion = time.perf_counter() - inicio
+
+    return dict(
+        escenario=escenario, modo=modo, concurrencia=concurrencia, solicitudes=len(resultados),
+        errores=sum(1 for codigo, _ in resultados if codigo != 200),
+        req_por_segundo=round(len(resultados) / duracion, 1),
+        **percentiles([t for _, t in resultados]),
+    )
+
+
+def medir(args):
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for tipo_db in args.db:
+            for n in args.tamanos:
+                uri = 'sqlite://' if tipo_db == 'memoria' else f"sqlite:///{os.path.join(tmp, f'bench_{n}.db')}"
+                app = crear_app(uri)
+                ctx = sembrar(app, n)
+                for modo in args.modos:
+                    if modo == 'wsgi' and tipo_db == 'memoria':
+                        # La base en memoria es una sola conexión compartida: no admite escrituras concurrentes
+                        continue
+                    for escenario in args.escenarios:
+                        sesiones.tokens.clear()
+                        sesiones.usuarios.clear()
+                        resultado = dict(db=tipo_db, tamano=n, **medir_escenario(app, ctx, escenario, modo, args))
+                        print(json.dumps(resultado), file=sys.stderr)
+                        resultados.append(resultado)
+                with app.app_context():
+                    db.engine.dispose()
+
+    return {
+        'meta': {
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'parametros': {k: v for k, v in vars(args).items() if k not in ('accion', 'salida')},
+        },
+        'resultados': resultados,
+    }
+
+
+def clave(resultado):
+    return resultado['escenario'], resultado['modo'], resultado['db'], resultado['tamano']
+
+
+def comparar(base, nuevo, umbral=0.10):
+    """
+    Compara dos ejecuciones escenario por escenario. Devuelve las filas
+    comparadas con el cambio relativo de cada métrica y si hay regresión.
+    """
+    anteriores = {clave(r): r for r in base['resultados']}
+    filas = []
+    for actual in nuevo['resultados']:
+        anterior = anteriores.get(clave(actual))
+        if anterior is None:
+            continue
+        cambios = {}
+        regresion = bool(actual['errores']) and not anterior['errores']
+        for metrica, sentido in METRICAS:
+            if not anterior[metrica]:
+                continue
+            cambio = (actual[metrica] - anterior[metrica]) / anterior[metrica]
+            cambios[metrica] = round(cambio, 4)
+            regresion |= cambio * sentido > umbral
+        filas.append({'escenario': clave(actual), 'cambios': cambios, 'regresion': regresion})
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    acciones = parser.add_subparsers(dest='accion', required=True)
+
+    lista = lambda tipo: lambda texto: [tipo(x) for x in texto.split(',') if x]
+    p_medir = acciones.add_parser('medir', help='Ejecuta la suite y emite los resultados en JSON')
+    p_medir.add_argument('--tamanos', type=lista(int), default=[100, 1000])
+    p_medir.add_argument('--db', type=lista(str), default=['memoria', 'archivo'])
+    p_medir.add_argument('--modos', type=lista(str), default=list(MODOS))
+    p_medir.add_argument('--escenarios', type=lista(str), default=list(ESCENARIOS))
+    p_medir.add_argument('--solicitudes', type=int, default=500)
+    p_medir.add_argument('--solicitudes-login', type=int, default=20)
+    p_medir.add_argument('--calentamiento', type=int, default=20)
+    p_medir.add_argument('--concurrencia', type=int, default=16)
+    p_medir.add_argument('--semilla', type=int, default=1)
+    p_medir.add_argument('--salida', help='Archivo JSON (por defecto, la salida estándar)')
+
+    p_comparar = acciones.add_parser('comparar', help='Marca regresiones entre dos ejecuciones')
+    p_comparar.add_argument('base')
+    p_comparar.add_argument('nuevo')
+    p_comparar.add_argument('--umbral', type=float, default=0.10, help='Cambio relativo tolerado (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    if args.accion == 'medir':
+        desconocidos = (set(args.db) - {'memoria', 'archivo'}) | (set(args.modos) - set(MODOS)) \
+            | (set(args.escenarios) - set(ESCENARIOS))
+        if desconocidos:
+            parser.error(f'Valores desconocidos: {", ".join(sorted(desconocidos))}')
+        salida = json.dumps(medir(args), indent=2)
+        if args.salida:
+            with open(args.salida, 'w', encoding='utf-8') as f:
+                f.write(salida + '\n')
+        else:
+            print(salida)
+        return
+
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.nuevo, encoding='utf-8') as f:
+        nuevo = json.load(f)
+    filas = comparar(base, nuevo, args.umbral)
+    for fila in filas:
+        cambios = ', '.join(f'{m} {c:+.1%}' for m, c in fila['cambios'].items())
+        print(f"{'REGRESIÓN' if fila['regresion'] else 'ok':9} {'/'.join(map(str, fila['escenario']))}: {cambios}")
+    if any(f['regresion'] for f in filas):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Compara las calculadoras escalares de models/funciones.py con sus versiones
+por lote (models/funciones_lote.py) en un cálculo de precios por escenario:
+costo, rentabilidad y producto más rentable de P productos (2000 por
+defecto, con 4 de I=200 ingredientes cada uno) para E escenarios de precios
+de los ingredientes (50).
+
+Uso: python -m benchmarks.bench_funciones [--productos 2000] [--ingredientes 200] [--escenarios 50] [--salida funciones.json]
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from models.funciones import calcular_calorias, calcular_rentabilidad, producto_mas_rentable
+from models.funciones_lote import (calcular_calorias_lote, calcular_rentabilidad_lote, matriz_recetas,
+                                   producto_mas_rentable_lote)
+
+
+def escalar(recetas, precio, calorias, escenarios, nombres):
+    """Una llamada por producto y escenario, con las listas de dicts que esperan las funciones."""
+    por_producto = {}
+    for p, i, c in recetas:
+        por_producto.setdefault(p, []).append((i, c))
+    kcal = [calcular_calorias([calorias[i] * c for i, c in por_producto[p]]) for p in range(len(nombres))]
+    mejores = []
+    for precios in escenarios:
+        productos = [{'nombre': nombres[p],
+                      'rentabilidad': calcular_rentabilidad(precio[p], [{'precio': precios[i] * c} for i, c in lineas])}
+                     for p, lineas in por_producto.items()]
+        mejores.append(producto_mas_rentable(productos))
+    return kcal, mejores
+
+
+def por_lote(recetas, precio, calorias, escenarios, nombres):
+    cantidades = matriz_recetas(recetas, range(len(nombres)), range(len(calorias)))
+    kcal = calcular_calorias_lote(cantidades, calorias)
+    return kcal, producto_mas_rentable_lote(nombres, calcular_rentabilidad_lote(precio, cantidades, escenarios))
+
+
+def medir(funcion, *args, repeticiones=5):
+    mejor, resultado = float('inf'), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return round(mejor * 1000, 3), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--ingredientes', type=int, default=200)
+    parser.add_argument('--escenarios', type=int, default=50)
+    parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    recetas = [(p, i, rng.randint(1, 3)) for p in range(args.productos)
+               for i in rng.sample(range(args.ingredientes), min(4, args.ingredientes))]
+    precio = [float(rng.randint(10, 40)) for _ in range(args.productos)]
+    calorias = [rng.randint(10, 300) for _ in range(args.ingredientes)]
+    escenarios = [[rng.uniform(0.5, 5) for _ in range(args.ingredientes)] for _ in range(args.escenarios)]
+    nombres = [f'Producto {p}' for p in range(args.productos)]
+
+    ms_escalar, (kcal, mejores) = medir(escalar, recetas, precio, calorias, escenarios, nombres)
+    ms_lote, (kcal_lote, mejores_lote) = medir(por_lote, recetas, precio, calorias, np.array(escenarios), nombres)
+    assert np.allclose(kcal, kcal_lote) and list(mejores_lote) == mejores
+
+    resultado = {
+        'productos': args.productos,
+        'ingredientes': args.ingredientes,
+        'escenarios': args.escenarios,
+        'escalar_ms': ms_escalar,
+        'lote_ms': ms_lote,
+        'aceleracion': round(ms_escalar / ms_lote, 1),
+    }
+    texto = json.dumps(resultado, indent=2)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Mide el renderizado de la página de productos con una tabla de N filas
+(5000 por defecto):
+- completo: sin caché de fragmentos (consulta + cuerpo de la tabla),
+- fragmento: con el cuerpo de la tabla en la caché de fragmentos,
+y la carga de todas las plantillas en un worker nuevo, compilándolas o
+leyendo el bytecode guardado en disco.
+
+Uso: python -m benchmarks.bench_plantillas [--filas 5000] [--repeticiones 50] [--salida plantillas.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache
+
+from benchmarks.comun import crear_app, percentiles, sembrar_productos
+from models.producto import Producto
+from services.plantillas import precompilar_plantillas
+
+
+def medir_render(app, repeticiones):
+    latencias = []
+    with app.test_request_context('/heladeria/productos'):
+        render_template('productos.html', productos=Producto.query)  # calentamiento
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            render_template('productos.html', productos=Producto.query)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+    return percentiles(latencias)
+
+
+def medir_carga(app, bytecode, repeticiones):
+    """Tiempo de cargar todas las plantillas con la caché en memoria de Jinja vacía."""
+    app.jinja_env.bytecode_cache = bytecode
+    precompilar_plantillas(app)
+    latencias = []
+    for _ in range(repeticiones):
+        app.jinja_env.cache.clear()
+        inicio = time.perf_counter()
+        precompilar_plantillas(app)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return percentiles(latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--filas', type=int, default=5000)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = crear_app(f"sqlite:///{os.path.join(tmp, 'plantillas.db')}")
+        with app.app_context():
+            sembrar_productos(args.filas)
+
+        app.config['CACHE_DESHABILITADA'] = True
+        completo = medir_render(app, args.repeticiones)
+        app.config['CACHE_DESHABILITADA'] = False
+        fragmento = medir_render(app, args.repeticiones)
+
+        compilando = medir_carga(app, None, args.repeticiones)
+        desde_bytecode = medir_carga(app, FileSystemBytecodeCache(tmp), args.repeticiones)
+
+    resultado = {
+        'filas': args.filas,
+        'render_completo': completo,
+        'render_con_fragmento': fragmento,
+        'carga_compilando': compilando,
+        'carga_desde_bytecode': desde_bytecode,
+    }
+    texto = json.dumps(resultado, indent=2)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
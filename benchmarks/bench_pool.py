@@ -0,0 +1,91 @@
+"""
+Prueba de carga del pool de conexiones: levanta la app en un servidor WSGI
+real con hilos (SQLite en archivo como sustituto de MySQL o la URI indicada),
+dispara solicitudes con 200 clientes concurrentes y compara la latencia con
+el tiempo que las solicitudes esperaron por una conexión del pool.
+
+Uso: python -m benchmarks.bench_pool [--concurrencia 200] [--solicitudes 4000]
+                                     [--pool-size 10] [--max-overflow 20] [--uri ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server
+
+from app import create_app
+from config import Config
+from database import db
+from database.pool import metricas_pool
+from benchmarks.comun import HandlerSilencioso, sembrar_productos, token_para
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrencia', type=int, default=200)
+    parser.add_argument('--solicitudes', type=int, default=4000)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--max-overflow', type=int, default=20)
+    parser.add_argument('--uri', help='URI de la base (por defecto SQLite en un archivo temporal)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = args.uri or f"sqlite:///{os.path.join(tmp, 'pool.db')}"
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': uri,
+            'DB_POOL_SIZE': args.pool_size,
+            'DB_MAX_OVERFLOW': args.max_overflow,
+            'DB_POOL_TIMEOUT': Config.DB_POOL_TIMEOUT,
+        })
+        with app.app_context():
+            db.create_all()
+            producto_id = sembrar_productos(10)[0]
+            cabecera = token_para('cliente')
+
+        servidor = make_server('127.0.0.1', 0, app, threaded=True, request_handler=HandlerSilencioso)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{servidor.server_port}/heladeria/api/productos/{producto_id}/calorias'
+
+        def solicitar(_):
+            inicio = time.perf_counter()
+            peticion = urllib.request.Request(url, headers=cabecera)
+            try:
+                with urllib.request.urlopen(peticion, timeout=60) as respuesta:
+                    respuesta.read()
+                    codigo = respuesta.status
+            except Exception:
+                codigo = None
+            return codigo, (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrencia) as clientes:
+            resultados = list(clientes.map(solicitar, range(args.solicitudes)))
+        duracion = time.perf_counter() - inicio
+        servidor.shutdown()
+
+        with app.app_context():
+            pool = metricas_pool(db.engine)
+
+    latencias = sorted(t for _, t in resultados)
+    errores = sum(1 for codigo, _ in resultados if codigo != 200)
+    p50 = statistics.median(latencias)
+    print(json.dumps({
+        'concurrencia': args.concurrencia,
+        'solicitudes': args.solicitudes,
+        'errores': errores,
+        'req_por_segundo': round(args.solicitudes / duracion, 1),
+        'p50_ms': round(p50, 2),
+        'p99_ms': round(latencias[int(len(latencias) * 0.99) - 1], 2),
+        'pool': pool,
+        # Fracción de la latencia típica que se pasó esperando conexión
+        'espera_pool_sobre_p50': round(pool.get('espera_media_ms', 0) / p50, 4),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Mide los reportes de ventas sobre un libro de N ventas (200000 por defecto)
+repartidas en 90 días:
+- top 10 productos por ingresos de los últimos 30 días, agregando el libro
+  o leyendo los resúmenes por día,
+- la serie por hora de un día,
+y el tiempo de reconstruir los resúmenes desde el libro.
+
+Uso: python -m benchmarks.bench_reportes [--ventas 200000] [--productos 100] [--repeticiones 20] [--salida reportes.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.comun import crear_app, percentiles, sembrar_productos
+from database import db
+from models.venta import Venta
+from services.reportes import reconstruir_resumenes, serie_ventas, top_productos
+
+
+def sembrar_ventas(n, producto_ids, dias=90, lote=10000):
+    rng = random.Random(1)
+    ahora = datetime.datetime.utcnow()
+    for inicio in range(0, n, lote):
+        db.session.execute(insert(Venta), [
+            {'producto_id': rng.choice(producto_ids), 'cantidad': rng.randint(1, 3), 'precio_unitario': 10.0,
+             'total': 10.0, 'costo_unitario': 5.0,
+             'fecha': ahora - datetime.timedelta(seconds=rng.randrange(dias * 86400))}
+            for _ in range(min(lote, n - inicio))
+        ])
+    db.session.commit()
+
+
+def top_desde_libro(desde, n=10):
+    """El mismo reporte agregando el libro completo del rango."""
+    ingresos = func.sum(Venta.total)
+    return db.session.execute(
+        select(Venta.producto_id, ingresos).where(Venta.fecha >= desde)
+        .group_by(Venta.producto_id).order_by(ingresos.desc()).limit(n)
+    ).all()
+
+
+def medir(funcion, repeticiones):
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return percentiles(latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ventas', type=int, default=200000)
+    parser.add_argument('--productos', type=int, default=100)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = crear_app(f"sqlite:///{os.path.join(tmp, 'reportes.db')}")
+        with app.app_context():
+            sembrar_ventas(args.ventas, sembrar_productos(args.productos))
+
+            inicio = time.perf_counter()
+            reconstruir_resumenes()
+            reconstruccion = round((time.perf_counter() - inicio) * 1000, 3)
+
+            hasta = datetime.datetime.utcnow().date()
+            desde = hasta - datetime.timedelta(days=29)
+            resultado = {
+                'ventas': args.ventas,
+                'productos': args.productos,
+                'reconstruccion_ms': reconstruccion,
+                'top_desde_libro': medir(lambda: top_desde_libro(datetime.datetime.combine(desde, datetime.time())),
+                                         args.repeticiones),
+                'top_desde_resumenes': medir(lambda: top_productos(desde, hasta), args.repeticiones),
+                'serie_por_hora': medir(lambda: serie_ventas(hasta, hasta, 'hora'), args.repeticiones),
+            }
+
+    texto = json.dumps(resultado, indent=2)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Mide la latencia por solicitud de un endpoint protegido con token_required
+con la caché de tokens/usuarios habilitada y deshabilitada.
+
+Uso: python -m benchmarks.bench_token_cache [--solicitudes 2000]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.comun import crear_app, sembrar_productos, token_para
+from services import sesiones
+from services.sesiones import CacheTTL
+
+
+def medir(client, url, cabecera, solicitudes):
+    tiempos = []
+    for _ in range(solicitudes):
+        inicio = time.perf_counter()
+        assert client.get(url, headers=cabecera).status_code == 200
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {'p50_ms': round(statistics.median(tiempos), 4),
+            'p99_ms': round(tiempos[int(len(tiempos) * 0.99) - 1], 4),
+            'media_ms': round(statistics.fmean(tiempos), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--solicitudes', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = crear_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        with app.app_context():
+            producto_id = sembrar_productos(1)[0]
+            cabecera = token_para('cliente')
+        client = app.test_client()
+        url = f'/heladeria/api/productos/{producto_id}/calorias'
+
+        originales = sesiones.tokens, sesiones.usuarios
+        sesiones.tokens, sesiones.usuarios = CacheTTL(0, 0), CacheTTL(0, 0)
+        sin_cache = medir(client, url, cabecera, args.solicitudes)
+        sesiones.tokens, sesiones.usuarios = originales
+        con_cache = medir(client, url, cabecera, args.solicitudes)
+
+    print(json.dumps({
+        'sin_cache': sin_cache,
+        'con_cache': con_cache,
+        'reduccion_p50': f"{(1 - con_cache['p50_ms'] / sin_cache['p50_ms']) * 100:.1f}%",
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Compara el rendimiento de vender un carrito producto por producto
+(POST /heladeria/api/productos/vender/<id>) contra una sola llamada a
+POST /heladeria/api/ventas/lote.
+
+Uso: python -m benchmarks.bench_ventas_lote [--carritos 200] [--items 10]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.comun import crear_app, sembrar_productos, token_para
+
+
+def medir(nombre, carritos, vender_carrito):
+    inicio = time.perf_counter()
+    for carrito in carritos:
+        vender_carrito(carrito)
+    duracion = time.perf_counter() - inicio
+    items = sum(len(c) for c in carritos)
+    return {'modo': nombre, 'carritos': len(carritos), 'items': items,
+            'segundos': round(duracion, 4), 'carritos_por_segundo': round(len(carritos) / duracion, 1),
+            'items_por_segundo': round(items / duracion, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--carritos', type=int, default=200)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--productos', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = crear_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        with app.app_context():
+            ids = sembrar_productos(args.productos)
+            cabecera = token_para('cliente')
+
+        rnd = random.Random(42)
+        carritos = [[rnd.choice(ids) for _ in range(args.items)] for _ in range(args.carritos)]
+        client = app.test_client()
+
+        def por_item(carrito):
+            for producto_id in carrito:
+                assert client.post(f'/heladeria/api/productos/vender/{producto_id}', headers=cabecera).status_code == 200
+
+        def por_lote(carrito):
+            items = [{'producto_id': p, 'cantidad': 1} for p in carrito]
+            assert client.post('/heladeria/api/ventas/lote', json=items, headers=cabecera).status_code == 200
+
+        resultados = [medir('por_item', carritos, por_item), medir('lote', carritos, por_lote)]
+        resultados.append({'aceleracion': round(resultados[0]['segundos'] / resultados[1]['segundos'], 2)})
+        print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import datetime
+import statistics
+import threading
+from contextlib import contextmanager
+import jwt
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from app import create_app
+from database import db
+from controllers.auth_controller import SECRET_KEY
+from models.usuario import Usuario
+from models.producto import Producto
+from models.ingrediente import Ingrediente
+from models.receta import Receta
+
+
+def crear_app(uri='sqlite://'):
+    """Aplicación para medir los endpoints sin depender de MySQL."""
+    # Sin límite de intentos de login: se mide el costo del hash, no el limitador.
+    # Sin despachador de eventos: comparte la base (en memoria, una sola conexión)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'SECRET_KEY': 'clave_benchmark',
+                      'LOGIN_RAFAGA_USUARIO': 0, 'LOGIN_RAFAGA_IP': 0, 'EVENTOS_HILOS': 0})
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def sembrar_productos(n):
+    """Inserta `n` productos en bloque y devuelve sus IDs."""
+    db.session.execute(db.insert(Producto), [
+        {'nombre': f'Producto {i}', 'precio_publico': 10.0 + i % 7, 'calorias_totales': 200,
+         'costo_produccion': 5.0, 'rentabilidad': 0.0}
+        for i in range(n)
+    ])
+    db.session.commit()
+    return [fila[0] for fila in db.session.execute(db.select(Producto.id))]
+
+
+def token_para(rol='admin'):
+    """Crea un usuario con el rol indicado y devuelve la cabecera con su JWT."""
+    usuario = Usuario(username=f'bench_{rol}', password='x', **{f'es_{rol}': True})
+    db.session.add(usuario)
+    db.session.commit()
+    token = jwt.encode({
+        'user_id': usuario.id,
+        'es_admin': usuario.es_admin or False,
+        'es_empleado': usuario.es_empleado or False,
+        'es_cliente': usuario.es_cliente or False,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, SECRET_KEY, algorithm='HS256')
+    return {'x-access-token': token}
+
+
+def sembrar_ingredientes(n, inventario=10 ** 9):
+    """Inserta `n` ingredientes en bloque (con inventario de sobra) y devuelve sus IDs."""
+    db.session.execute(db.insert(Ingrediente), [
+        {'nombre': f'Ingrediente {i}', 'precio': 1.0 + i % 5, 'calorias': 50 + i % 100,
+         'inventario': inventario, 'es_vegetariano': i % 2 == 0}
+        for i in range(n)
+    ])
+    db.session.commit()
+    return [fila[0] for fila in db.session.execute(db.select(Ingrediente.id))]
+
+
+def sembrar_recetas(producto_ids, ingrediente_ids, por_producto=2):
+    """Asigna a cada producto `por_producto` ingredientes consecutivos."""
+    n = len(ingrediente_ids)
+    db.session.execute(db.insert(Receta), [
+        {'producto_id': p, 'ingrediente_id': ingrediente_ids[(i + k) % n], 'cantidad': 1}
+        for i, p in enumerate(producto_ids) for k in range(min(por_producto, n))
+    ])
+    db.session.commit()
+
+
+class HandlerSilencioso(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+@contextmanager
+def servidor_wsgi(app):
+    """Sirve la app en un servidor WSGI real con hilos y devuelve su URL base."""
+    servidor = make_server('127.0.0.1', 0, app, threaded=True, request_handler=HandlerSilencioso)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        yield f'http://127.0.0.1:{servidor.server_port}'
+    finally:
+        servidor.shutdown()
+
+
+def percentiles(latencias_ms):
+    """p50 y p99 (ms) de una lista de latencias."""
+    latencias = sorted(latencias_ms)
+    return {'p50_ms': round(statistics.median(latencias), 3),
+            'p99_ms': round(latencias[max(0, int(len(latencias) * 0.99) - 1)], 3)}
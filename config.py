@@ -0,0 +1,108 @@
+import os
+from dotenv import load_dotenv
+
+# Cargar configuración desde .env (antes de que otros módulos lean os.getenv)
+load_dotenv()
+
+
+def uri_mysql():
+    """URI de MySQL armada con las variables DB_* del entorno."""
+    return (
+        f"mysql+pymysql://{os.getenv('DB_USER', 'root')}:{os.getenv('DB_PASSWORD', '')}"
+        f"@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '3306')}/{os.getenv('DB_NAME', 'heladeria')}"
+    )
+
+
+class Config:
+    # Configuración de la base de datos (DATABASE_URL tiene prioridad sobre DB_*)
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL') or uri_mysql()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = os.getenv('SECRET_KEY', 'clave_secreta_predeterminada')
+
+    # Pool de conexiones por proceso (ver database/pool.py). Por defecto una
+    # conexión por hilo de gunicorn, con margen de overflow para ráfagas.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE') or os.getenv('GUNICORN_THREADS') or 5)
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 280))  # menor que el wait_timeout de MySQL
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') == '1'
+
+    # Crear base y tablas en la primera solicitud en lugar de con `flask heladeria init-db`
+    BOOTSTRAP_AUTOMATICO = os.getenv('BOOTSTRAP_AUTOMATICO', '0') == '1'
+
+    # Caché de lecturas del catálogo: 'memoria' (por worker) o 'sqlite' (compartida
+    # en la máquina). Sin CACHE_BACKEND se usa 'sqlite' cuando gunicorn corre más
+    # de un worker. La versión en memoria no ve las escrituras de otros workers:
+    # caduca cada CACHE_TTL segundos, el atraso máximo de una lectura.
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND')
+    CACHE_TTL = float(os.getenv('CACHE_TTL', 5))
+    CACHE_SQLITE_RUTA = os.getenv('CACHE_SQLITE_RUTA')
+
+    # Bytecode de las plantillas en disco (por defecto, instance/jinja), para
+    # que los workers arranquen sin compilarlas; `flask heladeria precompilar`
+    # lo genera en el despliegue
+    PLANTILLAS_BYTECODE = os.getenv('PLANTILLAS_BYTECODE', '1') == '1'
+    PLANTILLAS_BYTECODE_DIRECTORIO = os.getenv('PLANTILLAS_BYTECODE_DIRECTORIO')
+
+    # Outbox de eventos (efectos posteriores a la venta): hilos por worker que
+    # lo vacían (0: ninguno, se usa `flask heladeria eventos`), eventos por
+    # lote, espera máxima entre revisiones y reintentos antes de descartarlo
+    EVENTOS_HILOS = int(os.getenv('EVENTOS_HILOS', 1))
+    EVENTOS_LOTE = int(os.getenv('EVENTOS_LOTE', 100))
+    EVENTOS_INTERVALO = float(os.getenv('EVENTOS_INTERVALO', 1.0))
+    EVENTOS_MAX_INTENTOS = int(os.getenv('EVENTOS_MAX_INTENTOS', 5))
+
+    # Sugerencias de reposición (`flask heladeria reposicion`): días de ventas
+    # con que se estima el consumo y días de consumo que cubre cada pedido
+    REPOSICION_DIAS_HISTORIAL = int(os.getenv('REPOSICION_DIAS_HISTORIAL', 14))
+    REPOSICION_DIAS_COBERTURA = int(os.getenv('REPOSICION_DIAS_COBERTURA', 7))
+
+    # Instrumentación opcional: métricas en /metrics (protegidas con METRICAS_TOKEN
+    # si se define) y perfilado cProfile de una fracción de las solicitudes
+    INSTRUMENTACION = os.getenv('INSTRUMENTACION', '0') == '1'
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN')
+    # Con varios workers cada uno vuelca sus métricas en este directorio (cada
+    # METRICAS_INTERVALO segundos como máximo) y /metrics suma las de todos;
+    # sin él, cada worker expone solo las suyas. gunicorn.conf.py lo define
+    METRICAS_DIRECTORIO = os.getenv('METRICAS_DIRECTORIO')
+    METRICAS_INTERVALO = float(os.getenv('METRICAS_INTERVALO', 1.0))
+    PERFIL_MUESTREO = float(os.getenv('PERFIL_MUESTREO', 0))
+    PERFIL_DIRECTORIO = os.getenv('PERFIL_DIRECTORIO')
+    PERFIL_MAXIMO = int(os.getenv('PERFIL_MAXIMO', 20))
+
+    # Hash de contraseñas (método de werkzeug con sus parámetros, p. ej.
+    # 'pbkdf2:sha256:200000' o 'scrypt:16384:8:1'). Al cambiarlo, cada usuario
+    # se rehashea con el nuevo costo la próxima vez que inicia sesión.
+    PASSWORD_HASH_METODO = os.getenv('PASSWORD_HASH_METODO', 'pbkdf2:sha256')
+    # Verificaciones simultáneas en toda la máquina, sumando todos los workers
+    # (por defecto, la mitad de los núcleos; se coordinan con archivos de
+    # bloqueo en HASH_RANURAS_DIRECTORIO, por defecto instance/hash) y
+    # verificaciones pendientes por worker antes de responder 503
+    HASH_HILOS = int(os.getenv('HASH_HILOS', 0))
+    HASH_COLA = int(os.getenv('HASH_COLA', 0))
+    HASH_RANURAS_DIRECTORIO = os.getenv('HASH_RANURAS_DIRECTORIO')
+    # Límite de intentos de login (token bucket por usuario y por IP); 0 desactiva.
+    # Los cubos son de cada worker: con N workers de gunicorn un atacante que
+    # reparte sus intentos entre ellos tiene hasta N veces la ráfaga y el ritmo.
+    LOGIN_RAFAGA_USUARIO = int(os.getenv('LOGIN_RAFAGA_USUARIO', 10))
+    LOGIN_POR_MINUTO_USUARIO = float(os.getenv('LOGIN_POR_MINUTO_USUARIO', 5))
+    LOGIN_RAFAGA_IP = int(os.getenv('LOGIN_RAFAGA_IP', 50))
+    LOGIN_POR_MINUTO_IP = float(os.getenv('LOGIN_POR_MINUTO_IP', 30))
+
+    # Tokens: el de acceso es corto y el refresh token permite renovarlo en
+    # /auth/refresh sin volver a verificar la contraseña. Con algoritmos
+    # asimétricos (EdDSA, ES256, RS256) las claves son PEM, en texto o como ruta.
+    JWT_ALGORITMO = os.getenv('JWT_ALGORITMO', 'HS256')
+    JWT_CLAVE_PRIVADA = os.getenv('JWT_CLAVE_PRIVADA')
+    JWT_CLAVE_PUBLICA = os.getenv('JWT_CLAVE_PUBLICA')
+    JWT_MINUTOS_ACCESO = int(os.getenv('JWT_MINUTOS_ACCESO', 60))
+    JWT_DIAS_REFRESCO = int(os.getenv('JWT_DIAS_REFRESCO', 30))
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SECRET_KEY = 'clave_de_pruebas'
+    PASSWORD_HASH_METODO = 'pbkdf2:sha256:1000'
+    EVENTOS_HILOS = 0
@@ -2,14 +2,15 @@ from flask import Blueprint, request, jsonify, render_template, redirect, url_fo
 from flask_login import login_user, logout_user, login_required, current_user
 from models.usuario import Usuario, UserMixin
 from database import db
+# SECRET_KEY se reexporta: con HS256 es la clave con la que se firman los tokens
+from services.sesiones import (SECRET_KEY, decodificar_refresco, emitir_token_acceso, emitir_token_refresco,
+                               obtener_claves, principal_desde_token, refrescar, revocados)
+from services.consultas import presupuesto_sql
+from services.autorizacion import mascara_roles, tiene_rol
+from services.contrasenas import LimiteExcedido, VerificadorOcupado, autenticar, hashear
 import jwt
-import datetime
+import math
 from functools import wraps
-from werkzeug.security import generate_password_hash
-import os
-
-# Cargar la clave secreta desde .env
-SECRET_KEY = os.getenv('SECRET_KEY', 'clave_secreta_default')  # Valor predeterminado si no está configurado
 
 # Crear el blueprint para rutas de autenticación
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -23,45 +24,28 @@ def token_required(f):
             return jsonify({'error': 'Token requerido'}), 401
 
         try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-            # Obtener usuario desde la base de datos
-            user = Usuario.query.get(data['user_id'])
-            if not user:
-                return jsonify({'error': 'Usuario no encontrado'}), 404
-
-            # Asignar atributos de roles al usuario actual
-            user.es_admin = data.get('es_admin', False)
-            user.es_empleado = data.get('es_empleado', False)
-            user.es_cliente = data.get('es_cliente', False)
-            
-            # Usar el usuario para la función decorada
-            return f(user, *args, **kwargs)
+            # Token verificado y usuario cacheados: sin consulta a la base en cada llamada
+            claves = obtener_claves()
+            user = principal_desde_token(token, claves.verificacion, (claves.algoritmo,))
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'El token ha expirado'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'error': 'Token inválido'}), 401
+        if not user:
+            return jsonify({'error': 'Usuario no encontrado'}), 404
 
-    return decorated
+        # Usar el usuario (con los roles del token) para la función decorada
+        return f(user, *args, **kwargs)
 
-# Decorador para verificar roles específicos
-def check_roles(*roles):
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            # Verificar si el usuario tiene al menos uno de los roles permitidos
-            print("Usuario actual:", current_user.username, current_user.__dict__)  # Depuración
-            if not any(getattr(current_user, f'es_{role}', False) for role in roles):
-                raise PermissionError("No autorizado")
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
+    return decorated
 
 # Decorador para verificar roles API
 def role_required_api(*roles):
+    mascara = mascara_roles(*roles)
     def decorator(f):
         @wraps(f)
         def decorated_function(current_user, *args, **kwargs):
-            if not any(getattr(current_user, f'es_{role}', False) for role in roles):
+            if not tiene_rol(current_user, mascara):
                 return jsonify({'error': 'No autorizado'}), 403
             return f(current_user, *args, **kwargs)
         return decorated_function
@@ -69,18 +53,30 @@ def role_required_api(*roles):
 
 # Decorador para verificar roles en el frontend
 def role_required_html(*roles):
+    mascara = mascara_roles(*roles)
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            try:
-                # Verificar roles usando el decorador base
-                check_roles(*roles)(f)(*args, **kwargs)
-            except PermissionError:
+            # Verificar la máscara de roles sin ejecutar la vista
+            if not tiene_rol(current_user, mascara):
                 abort(403)  # Renderiza automáticamente 403.html
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+def respuesta_login_rechazado(error, es_json=True):
+    """429 si se excedió el límite de intentos, 503 si el verificador está saturado."""
+    if isinstance(error, LimiteExcedido):
+        mensaje, codigo, reintentar = 'Demasiados intentos, intenta más tarde', 429, math.ceil(error.reintentar)
+    else:
+        mensaje, codigo, reintentar = 'Servicio ocupado, intenta nuevamente', 503, 1
+    if es_json:
+        respuesta = jsonify({'error': mensaje})
+    else:
+        flash(mensaje, 'error')
+        respuesta = render_template('login.html')
+    return respuesta, codigo, {'Retry-After': str(reintentar)}
+
 # **Ruta de Login (Formulario HTML y API)**
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -89,19 +85,17 @@ def login():
         username = request.form.get('username') or request.json.get('username')
         password = request.form.get('password') or request.json.get('password')
 
-        usuario = Usuario.query.filter_by(username=username).first()
-        if usuario and usuario.check_password(password):
+        try:
+            # Límite de intentos, verificación en el pool acotado y rehash si cambió el costo
+            usuario = autenticar(username, password, request.remote_addr)
+        except (LimiteExcedido, VerificadorOcupado) as e:
+            return respuesta_login_rechazado(e, request.is_json)
+        if usuario:
             login_user(usuario)
 
             if request.is_json:
-                token = jwt.encode({
-                    'user_id': usuario.id,
-                    'es_admin': usuario.es_admin,
-                    'es_empleado': usuario.es_empleado,
-                    'es_cliente': usuario.es_cliente,
-                    'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
-                }, SECRET_KEY, algorithm='HS256')
-                return jsonify({'message': 'Inicio de sesión exitoso', 'token': token}), 200
+                return jsonify({'message': 'Inicio de sesión exitoso', 'token': emitir_token_acceso(usuario),
+                                'refresh_token': emitir_token_refresco(usuario)}), 200
             else:
                 flash('Inicio de sesión exitoso', 'success')
                 return redirect(url_for('heladeria.pagina_listar_productos'))
@@ -128,19 +122,54 @@ def api_login():
     username = data.get('username')
     password = data.get('password')
 
-    usuario = Usuario.query.filter_by(username=username).first()
-    if not usuario or not usuario.check_password(password):
+    try:
+        usuario = autenticar(username, password, request.remote_addr)
+    except (LimiteExcedido, VerificadorOcupado) as e:
+        return respuesta_login_rechazado(e)
+    if not usuario:
         return jsonify({'error': 'Credenciales inválidas'}), 401
 
-    token = jwt.encode({
-        'user_id': usuario.id,
-        'es_admin': usuario.es_admin,
-        'es_empleado': usuario.es_empleado,
-        'es_cliente': usuario.es_cliente,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
-    }, SECRET_KEY, algorithm='HS256')
+    return jsonify({
+        'token': emitir_token_acceso(usuario),
+        'refresh_token': emitir_token_refresco(usuario),
+        'message': f'Bienvenido, {username}!'
+    }), 200
 
-    return jsonify({'token': token, 'message': f'Bienvenido, {username}!'}), 200
+# **Renovar el token de acceso (sin contraseña)**
+@auth_bp.route('/refresh', methods=['POST'])
+@presupuesto_sql(2)
+def refresh():
+    """
+    Entrega un nuevo token de acceso a cambio de un refresh token vigente y
+    no revocado. No verifica la contraseña.
+    """
+    data = request.get_json(silent=True) or {}
+    if not data.get('refresh_token'):
+        return jsonify({'error': 'Falta el refresh_token'}), 400
+    try:
+        token = refrescar(data['refresh_token'])
+    except jwt.ExpiredSignatureError:
+        return jsonify({'error': 'El refresh token ha expirado'}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({'error': 'Refresh token inválido'}), 401
+    return jsonify({'token': token}), 200
+
+# **Revocar un refresh token (cierre de sesión de la API)**
+@auth_bp.route('/revocar', methods=['POST'])
+@presupuesto_sql(3)
+def revocar():
+    data = request.get_json(silent=True) or {}
+    if not data.get('refresh_token'):
+        return jsonify({'error': 'Falta el refresh_token'}), 400
+    try:
+        datos_token = decodificar_refresco(data['refresh_token'])
+    except jwt.ExpiredSignatureError:
+        # Vencido: ya no sirve, no hace falta guardarlo
+        return jsonify({'message': 'Token revocado'}), 200
+    except jwt.InvalidTokenError:
+        return jsonify({'error': 'Refresh token inválido'}), 401
+    revocados.revocar(datos_token['jti'], datos_token['exp'])
+    return jsonify({'message': 'Token revocado'}), 200
 
 # **Registrar nuevos usuarios (solo admins)**
 @auth_bp.route('/register', methods=['POST'])
@@ -157,7 +186,7 @@ def register(current_user):
     if Usuario.query.filter_by(username=username).first():
         return jsonify({'error': 'El usuario ya existe'}), 400
 
-    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+    hashed_password = hashear(password)
     nuevo_usuario = Usuario(
         username=username,
         password=hashed_password,
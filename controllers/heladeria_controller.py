@@ -4,25 +4,53 @@ from models.ingrediente import Ingrediente
 from models.producto import Producto
 from models.usuario import Usuario, UserMixin
 from database import db
+from database.pool import metricas_pool
 from controllers.auth_controller import token_required, role_required_api, role_required_html
+from services import metricas  # Mantiene costo/calorías/rentabilidad al cambiar ingredientes o recetas
+from services.cache import cache_catalogo, invalida_catalogo
+from services.catalogo import responder_listado
+from services.consultas import presupuesto_sql
+from services.contrasenas import hashear
+from services.inventario import (reabastecer_ingredientes, reabastecer_por_tipo, renovar_complementos, modelo_de_tipo,
+                                 reabastecer_producto as reabastecer_stock_producto, renovar_productos,
+                                 validar_renovacion, ingredientes_bajo_stock, ReabastecimientoInvalido,
+                                 RenovacionInvalida, TipoInvalido)
+from services.reportes import entero, rango, serie_ventas, top_productos, ReporteInvalido
+from services.ventas import (registrar_venta, registrar_ventas_lote, ProductoNoEncontrado, ProductoAgotado,
+                             LoteInvalido, StockInsuficiente, _entero_positivo)
 
 heladeria_bp = Blueprint('heladeria', __name__, url_prefix='/heladeria')
 
+# Cada ruta declara con @presupuesto_sql(n) cuántas sentencias SQL puede
+# ejecutar por solicitud (cachés frías); las pruebas fallan si lo excede o
+# si repite una sentencia (ver tests/plugin_sql.py)
+
+# Campos expuestos por los listados de la API
+CAMPOS_PRODUCTO = ['id', 'nombre', 'precio_publico', 'calorias_totales']
+CAMPOS_PRODUCTO_ADMIN = ['costo_produccion', 'rentabilidad', 'rentabilidad_unitaria']
+CAMPOS_INGREDIENTE = ['id', 'nombre', 'precio', 'calorias', 'inventario', 'es_vegetariano', 'tipo']
+CAMPOS_BASE = ['sabor']
+CAMPOS_UMBRALES = ['stock_minimo', 'punto_reorden', 'bajo_stock']
+
 
 # *** RUTAS DEL FRONTEND ***
 
 # Página de inicio para listar productos
 @heladeria_bp.route('/productos', methods=['GET'])
+@presupuesto_sql(2)
+@cache_catalogo
 def pagina_listar_productos():
     """
     Página de inicio para listar productos.
     Accesible por cualquier usuario (incluso no autenticado).
     """
-    productos = Producto.query.all()
-    return render_template('productos.html', productos=productos)
+    # Consulta perezosa: si el cuerpo de la tabla está en caché no se ejecuta
+    return render_template('productos.html', productos=Producto.query)
 
 # Página para detalles de un producto
 @heladeria_bp.route('/productos/detalle/<int:id>', methods=['GET'])
+@presupuesto_sql(2)
+@cache_catalogo
 def pagina_detalle_producto(id):
     """
     Muestra los detalles de un producto específico.
@@ -51,6 +79,7 @@ def pagina_detalle_producto(id):
 
 # Página para listar ingredientes
 @heladeria_bp.route('/ingredientes', methods=['GET'])
+@presupuesto_sql(2)
 @login_required
 @role_required_html('empleado', 'admin') # Permite tanto a empleados como administradores
 def pagina_listar_ingredientes():
@@ -58,57 +87,75 @@ def pagina_listar_ingredientes():
     Lista todos los ingredientes.
     Solo accesible por empleados y administradores.
     """
-    ingredientes = Ingrediente.query.all()
-    return render_template('ingredientes.html', ingredientes=ingredientes)
+    # Consulta perezosa: si el cuerpo de la tabla está en caché no se ejecuta
+    return render_template('ingredientes.html', ingredientes=Ingrediente.query)
 
 # Página para reabastecer ingredientes
 @heladeria_bp.route('/ingredientes/reabastecer/<int:id>', methods=['GET', 'POST'])
+@presupuesto_sql(4)
 @login_required
 @role_required_html('admin')
+@invalida_catalogo
 def pagina_reabastecer_ingrediente(id):
     """
     Permite reabastecer el inventario de un ingrediente específico.
     Solo accesible por administradores.
     """
+    if request.method == 'POST':
+        # Incremento atómico en la base, sin cargar y modificar el objeto
+        try:
+            linea, = reabastecer_ingredientes([{'id': id, 'cantidad': int(request.form.get('cantidad', 0))}])
+        except (ValueError, ReabastecimientoInvalido):
+            flash('Ingrediente no encontrado o cantidad inválida.', 'error')
+            return redirect(url_for('heladeria.pagina_listar_ingredientes'))
+        flash(f'Inventario de {linea["nombre"]} incrementado en {linea["cantidad"]} unidades.', 'success')
+        return redirect(url_for('heladeria.pagina_listar_ingredientes'))
+
     ingrediente = Ingrediente.query.get(id)
     if not ingrediente:
         flash('Ingrediente no encontrado.', 'error')
         return redirect(url_for('heladeria.pagina_listar_ingredientes'))
 
-    if request.method == 'POST':
-        cantidad = int(request.form.get('cantidad', 0))
-        ingrediente.inventario += cantidad
-        db.session.commit()
-        flash(f'Inventario de {ingrediente.nombre} incrementado en {cantidad} unidades.', 'success')
-        return redirect(url_for('heladeria.pagina_listar_ingredientes'))
-
     return render_template('reabastecer_ingrediente.html', ingrediente=ingrediente)
 
 # Página para vender un producto
 @heladeria_bp.route('/productos/vender/<int:id>', methods=['GET', 'POST'])
+@presupuesto_sql(9)
+@invalida_catalogo
 def pagina_vender_producto(id):
     """
     Permite vender un producto.
     Accesible por cualquier usuario autenticado.
     """
+    if request.method == 'POST':
+        # Registrar venta con un UPDATE atómico y una fila en el libro de ventas
+        try:
+            venta = registrar_venta(id, usuario_id=current_user.id if current_user.is_authenticated else None)
+        except ProductoNoEncontrado:
+            flash('Producto no encontrado.', 'error')
+            return redirect(url_for('heladeria.pagina_listar_productos'))
+        except ProductoAgotado as e:
+            flash(f'Producto agotado: {", ".join(e.productos)}.', 'error')
+            return redirect(url_for('heladeria.pagina_listar_productos'))
+        except StockInsuficiente as e:
+            flash(f'No hay stock suficiente de: {", ".join(e.ingredientes)}.', 'error')
+            return redirect(url_for('heladeria.pagina_listar_productos'))
+        flash(f'Producto {venta["nombre"]} vendido exitosamente.', 'success')
+        return redirect(url_for('heladeria.pagina_listar_productos'))
+
     producto = Producto.query.get(id)
     if not producto:
         flash('Producto no encontrado.', 'error')
         return redirect(url_for('heladeria.pagina_listar_productos'))
 
-    if request.method == 'POST':
-        # Simular venta
-        producto.rentabilidad += producto.precio_publico
-        db.session.commit()
-        flash(f'Producto {producto.nombre} vendido exitosamente.', 'success')
-        return redirect(url_for('heladeria.pagina_listar_productos'))
-
     return render_template('vender_producto.html', producto=producto)
 
 # Página para renovar inventario de un producto
 @heladeria_bp.route('/productos/renovar/<int:id>', methods=['GET', 'POST'])
+@presupuesto_sql(3)
 @login_required
 @role_required_html('admin')
+@invalida_catalogo
 def pagina_renovar_inventario_producto(id):
     """
     Permite renovar el inventario de un producto.
@@ -120,10 +167,13 @@ def pagina_renovar_inventario_producto(id):
         return redirect(url_for('heladeria.pagina_listar_productos'))
 
     if request.method == 'POST':
-        nueva_cantidad = int(request.form.get('nueva_cantidad', 0))
-        producto.inventario = nueva_cantidad
-        db.session.commit()
-        flash(f'Inventario del producto {producto.nombre} renovado a {nueva_cantidad} unidades.', 'success')
+        nueva_cantidad = request.form.get('nueva_cantidad', type=int)
+        if nueva_cantidad is None or nueva_cantidad < 0:
+            flash('La nueva cantidad debe ser un número entero positivo.', 'error')
+            return render_template('renovar_inventario.html', producto=producto), 400
+        nombre = producto.nombre
+        renovar_productos({id: nueva_cantidad})
+        flash(f'Inventario del producto {nombre} renovado a {nueva_cantidad} unidades.', 'success')
         return redirect(url_for('heladeria.pagina_listar_productos'))
 
     return render_template('renovar_inventario.html', producto=producto)
@@ -133,6 +183,7 @@ def pagina_renovar_inventario_producto(id):
 
 # Crear un administrador
 @heladeria_bp.route('/usuarios/crear_admin', methods=['POST'])
+@presupuesto_sql(3)
 @token_required
 @role_required_api('admin')
 def crear_admin(current_user):
@@ -143,51 +194,38 @@ def crear_admin(current_user):
     if Usuario.query.filter_by(username="admin").first():
         return jsonify({"error": "El usuario admin ya existe"}), 400
 
-    nuevo_usuario = Usuario(username="admin", password="admin123", es_admin=True)
+    nuevo_usuario = Usuario(username="admin", password=hashear("admin123"), es_admin=True)
     db.session.add(nuevo_usuario)
     db.session.commit()
     return jsonify({"message": "Usuario admin creado exitosamente."})
 
 # Listar todos los productos (Acceso público)
 @heladeria_bp.route('/api/productos', methods=['GET'])
+@presupuesto_sql(2)
+@cache_catalogo
 def listar_productos():
     """
     Listar todos los productos.
+    Acepta paginación por cursor (?after=<id>&limit=<n>), proyección de
+    columnas (?fields=id,nombre) y streaming NDJSON (?format=ndjson).
     Acceso: Público (no requiere autenticación).
     """
-    productos = Producto.query.all()
-
-    productos_data = []
-    for producto in productos:
-        # Datos básicos visibles para todos
-        producto_info = {
-            'id': producto.id,
-            'nombre': producto.nombre,
-            'precio_publico': producto.precio_publico,
-            'calorias_totales': producto.calorias_totales
-        }
-
-        # Solo el administrador puede ver el costo y la rentabilidad
-        if current_user.is_authenticated and current_user.es_admin:
-            producto_info.update({
-                'costo_produccion': producto.costo_produccion,
-                'rentabilidad': producto.rentabilidad
-            })
-
-        productos_data.append(producto_info)
-
-    return jsonify(productos_data), 200
+    # Solo el administrador puede ver el costo y la rentabilidad
+    if current_user.is_authenticated and current_user.es_admin:
+        return responder_listado(Producto, CAMPOS_PRODUCTO + CAMPOS_PRODUCTO_ADMIN,
+                                 CAMPOS_PRODUCTO + ['costo_produccion', 'rentabilidad'])
+    return responder_listado(Producto, CAMPOS_PRODUCTO, CAMPOS_PRODUCTO)
 
 
 # Consultar un producto por ID (Clientes, empleados, administradores)
 @heladeria_bp.route('/api/productos/<int:id>', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('admin', 'empleado', 'cliente')
 def obtener_producto(current_user, id):
     """
     Consultar un producto por ID.
     """
-    print(current_user.__dict__)  # Depuración para verificar roles y datos
     producto = Producto.query.get(id)
     if not producto:
         return jsonify({'error': 'Producto no encontrado'}), 404
@@ -197,12 +235,15 @@ def obtener_producto(current_user, id):
         'precio_publico': producto.precio_publico,
         'calorias_totales': producto.calorias_totales,
         'costo_produccion': producto.costo_produccion,
-        'rentabilidad': producto.rentabilidad
+        'rentabilidad': producto.rentabilidad,
+        'rentabilidad_unitaria': producto.rentabilidad_unitaria,
+        'inventario': producto.inventario
     })
 
 
 # Consultar un producto según su nombre
 @heladeria_bp.route('/api/productos/nombre/<string:nombre>', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('empleado', 'admin')
 def obtener_producto_por_nombre(current_user, nombre):
@@ -219,11 +260,14 @@ def obtener_producto_por_nombre(current_user, nombre):
         'precio_publico': producto.precio_publico,
         'calorias_totales': producto.calorias_totales,
         'costo_produccion': producto.costo_produccion,
-        'rentabilidad': producto.rentabilidad
+        'rentabilidad': producto.rentabilidad,
+        'rentabilidad_unitaria': producto.rentabilidad_unitaria,
+        'inventario': producto.inventario
     })
 
 # Consultar un ingrediente según su nombre
 @heladeria_bp.route('/api/ingredientes/nombre/<string:nombre>', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('empleado', 'admin')
 def obtener_ingrediente_por_nombre(current_user, nombre):
@@ -240,32 +284,38 @@ def obtener_ingrediente_por_nombre(current_user, nombre):
         'precio': ingrediente.precio,
         'calorias': ingrediente.calorias,
         'inventario': ingrediente.inventario,
-        'es_vegetariano': ingrediente.es_vegetariano
+        'es_vegetariano': ingrediente.es_vegetariano,
+        'tipo': ingrediente.tipo
     })
 
 # Reabastecer un producto según su ID
 @heladeria_bp.route('/api/productos/reabastecer/<int:id>', methods=['POST'])
+@presupuesto_sql(3)
 @token_required
 @role_required_api('empleado', 'admin')
+@invalida_catalogo
 def reabastecer_producto(current_user, id):
     """
     Reabastecer un producto por ID.
     Acceso: Empleados y administradores.
     """
-    data = request.get_json()
-    cantidad = data.get('cantidad', 0)
+    data = request.get_json(silent=True) or {}
+    cantidad = data.get('cantidad')
 
-    producto = Producto.query.get(id)
-    if not producto:
+    # UPDATE atómico inventario = inventario + :n, sin leer la fila antes
+    try:
+        nombre, inventario = reabastecer_stock_producto(id, cantidad)
+    except ReabastecimientoInvalido:
+        return jsonify({'error': 'La cantidad debe ser un número entero positivo'}), 400
+    except ProductoNoEncontrado:
         return jsonify({'error': 'Producto no encontrado'}), 404
-
-    producto.inventario += cantidad
-    db.session.commit()
-    return jsonify({'message': f'Inventario de {producto.nombre} incrementado en {cantidad} unidades'})
+    return jsonify({'message': f'Inventario de {nombre} incrementado en {cantidad} unidades',
+                    'inventario': inventario})
 
 
 # Consultar calorías de un producto (Clientes, empleados, administradores)
 @heladeria_bp.route('/api/productos/<int:id>/calorias', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('cliente', 'empleado', 'admin')
 def consultar_calorias(current_user, id):
@@ -280,6 +330,7 @@ def consultar_calorias(current_user, id):
 
 # Consultar rentabilidad de un producto (Solo administradores)
 @heladeria_bp.route('/api/productos/<int:id>/rentabilidad', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('admin')
 def consultar_rentabilidad(current_user, id):
@@ -294,6 +345,7 @@ def consultar_rentabilidad(current_user, id):
 
 # Consultar el costo de producción de un producto (administradores)
 @heladeria_bp.route('/api/productos/<int:id>/costo_produccion', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('admin')
 def consultar_costo_produccion(current_user, id):
@@ -308,42 +360,96 @@ def consultar_costo_produccion(current_user, id):
 
 # Vender un producto por ID (Clientes, empleados, administradores)
 @heladeria_bp.route('/api/productos/vender/<int:id>', methods=['POST'])
+@presupuesto_sql(9)
 @token_required
 @role_required_api('cliente', 'empleado', 'admin')
+@invalida_catalogo
 def vender_producto(current_user, id):
     """
     Vender un producto por ID.
     Acceso: Clientes, empleados y administradores.
     """
-    producto = Producto.query.get(id)
-    if not producto:
+    # Registrar venta (UPDATE atómico + libro de ventas, sin leer la fila antes)
+    try:
+        venta = registrar_venta(id, usuario_id=current_user.id)
+    except ProductoNoEncontrado:
         return jsonify({'error': 'Producto no encontrado'}), 404
-    # Registrar venta
-    producto.rentabilidad += producto.precio_publico
-    db.session.commit()
-    return jsonify({'message': f'¡Producto {producto.nombre} vendido exitosamente!'})
+    except ProductoAgotado as e:
+        return jsonify({'error': 'Producto agotado', 'productos': e.productos}), 409
+    except StockInsuficiente as e:
+        return jsonify({'error': 'Stock insuficiente', 'ingredientes': e.ingredientes}), 409
+    return jsonify({'message': f'¡Producto {venta["nombre"]} vendido exitosamente!'})
+
+# Vender un carrito completo en una sola transacción (Clientes, empleados, administradores)
+@heladeria_bp.route('/api/ventas/lote', methods=['POST'])
+@presupuesto_sql(9)
+@token_required
+@role_required_api('cliente', 'empleado', 'admin')
+@invalida_catalogo
+def vender_lote(current_user):
+    """
+    Vende varios productos en una sola solicitud.
+    Cuerpo: lista de {"producto_id", "cantidad"} (o {"items": [...]}).
+    Acceso: Clientes, empleados y administradores.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+
+    try:
+        lineas = registrar_ventas_lote(items, usuario_id=current_user.id)
+    except LoteInvalido as e:
+        return jsonify({'error': 'Lote de venta inválido', 'lineas': e.lineas}), 400
+    except ProductoAgotado as e:
+        return jsonify({'error': 'Producto agotado', 'productos': e.productos}), 409
+    except StockInsuficiente as e:
+        return jsonify({'error': 'Stock insuficiente', 'ingredientes': e.ingredientes}), 409
+
+    return jsonify({
+        'message': f'{len(lineas)} líneas vendidas exitosamente',
+        'total': sum(l['total'] for l in lineas),
+        'lineas': lineas
+    })
 
 # Listar todos los ingredientes (Empleados y administradores)
 @heladeria_bp.route('/api/ingredientes', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('empleado', 'admin')
 def listar_ingredientes(current_user):
     """
     Listar todos los ingredientes.
+    Acepta paginación por cursor, proyección de columnas y streaming NDJSON
+    igual que /api/productos. Con ?tipo=base o ?tipo=complemento solo se leen
+    los de ese tipo (filtro sobre el discriminador indexado); las bases
+    permiten además el campo `sabor`.
     Acceso: Empleados y administradores.
     """
-    ingredientes = Ingrediente.query.all()
-    return jsonify([{
-        'id': i.id,
-        'nombre': i.nombre,
-        'precio': i.precio,
-        'calorias': i.calorias,
-        'inventario': i.inventario,
-        'es_vegetariano': i.es_vegetariano
-    } for i in ingredientes])
+    if 'tipo' not in request.args:
+        return responder_listado(Ingrediente, CAMPOS_INGREDIENTE + CAMPOS_UMBRALES, CAMPOS_INGREDIENTE)
+    try:
+        modelo = modelo_de_tipo(request.args['tipo'])
+    except TipoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    permitidos = CAMPOS_INGREDIENTE + CAMPOS_UMBRALES + (CAMPOS_BASE if hasattr(modelo, 'sabor') else [])
+    return responder_listado(modelo, permitidos, CAMPOS_INGREDIENTE)
+
+# Ingredientes en su punto de reorden (Empleados y administradores)
+@heladeria_bp.route('/api/ingredientes/bajo_stock', methods=['GET'])
+@presupuesto_sql(2)
+@token_required
+@role_required_api('empleado', 'admin')
+def listar_bajo_stock(current_user):
+    """
+    Ingredientes que llegaron a su punto de reorden o a su stock mínimo.
+    Se leen por el índice de bajo_stock: el costo depende de cuántos hay,
+    no del tamaño del catálogo.
+    Acceso: Empleados y administradores.
+    """
+    return jsonify(ingredientes_bajo_stock())
 
 # Consultar un ingrediente por ID (Empleados y administradores)
 @heladeria_bp.route('/api/ingredientes/<int:id>', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('empleado', 'admin')
 def obtener_ingrediente_por_id(current_user, id):
@@ -360,11 +466,60 @@ def obtener_ingrediente_por_id(current_user, id):
         'precio': ingrediente.precio,
         'calorias': ingrediente.calorias,
         'inventario': ingrediente.inventario,
-        'es_vegetariano': ingrediente.es_vegetariano
+        'es_vegetariano': ingrediente.es_vegetariano,
+        'tipo': ingrediente.tipo,
+        'stock_minimo': ingrediente.stock_minimo,
+        'punto_reorden': ingrediente.punto_reorden,
+        'bajo_stock': bool(ingrediente.bajo_stock)
     })
 
+# Actualizar un ingrediente (Solo administradores)
+@heladeria_bp.route('/api/ingredientes/<int:id>', methods=['PUT'])
+@presupuesto_sql(6)
+@token_required
+@role_required_api('admin')
+@invalida_catalogo
+def actualizar_ingrediente(current_user, id):
+    """
+    Actualiza nombre, precio, calorías, si es vegetariano o los umbrales de
+    stock (stock_minimo, punto_reorden; null los quita) de un ingrediente.
+    Las métricas de los productos que lo usan se recalculan al confirmar.
+    Acceso: Solo administradores.
+    """
+    ingrediente = Ingrediente.query.get(id)
+    if not ingrediente:
+        return jsonify({'error': 'Ingrediente no encontrado'}), 404
+
+    data = request.get_json() or {}
+    for campo in ('precio', 'calorias'):
+        if campo in data and (not isinstance(data[campo], (int, float)) or data[campo] < 0):
+            return jsonify({'error': f'El campo {campo} debe ser un número positivo'}), 400
+    for campo in ('stock_minimo', 'punto_reorden'):
+        valor = data.get(campo)
+        if valor is not None and (not isinstance(valor, int) or isinstance(valor, bool) or valor < 0):
+            return jsonify({'error': f'El campo {campo} debe ser un entero no negativo o null'}), 400
+    for campo in ('nombre', 'precio', 'calorias', 'es_vegetariano', 'stock_minimo', 'punto_reorden'):
+        if campo in data:
+            setattr(ingrediente, campo, data[campo])
+    # La respuesta se arma antes del commit para no volver a leer la fila expirada
+    respuesta = {
+        'id': ingrediente.id,
+        'nombre': ingrediente.nombre,
+        'precio': ingrediente.precio,
+        'calorias': ingrediente.calorias,
+        'inventario': ingrediente.inventario,
+        'es_vegetariano': ingrediente.es_vegetariano,
+        'tipo': ingrediente.tipo,
+        'stock_minimo': ingrediente.stock_minimo,
+        'punto_reorden': ingrediente.punto_reorden
+    }
+    db.session.commit()
+
+    return jsonify(respuesta)
+
 # Consultar si un ingrediente es sano (Clientes, empleados, administradores)
 @heladeria_bp.route('/api/ingredientes/<int:id>/es_sano', methods=['GET'])
+@presupuesto_sql(2)
 @token_required
 @role_required_api('cliente', 'empleado', 'admin')
 def consultar_ingrediente_es_sano(current_user, id):
@@ -380,51 +535,169 @@ def consultar_ingrediente_es_sano(current_user, id):
 
 # Reabastecer un ingrediente (Empleados y administradores)
 @heladeria_bp.route('/api/ingredientes/reabastecer/<int:id>', methods=['POST'])
+@presupuesto_sql(4)
 @token_required
 @role_required_api('empleado', 'admin')
+@invalida_catalogo
 def reabastecer_ingrediente(current_user, id):
     """
     Reabastecer un ingrediente por ID.
     Acceso: Empleados y administradores.
     """
-    data = request.get_json()
-    cantidad = data.get('cantidad', 0)
+    data = request.get_json(silent=True) or {}
 
-    ingrediente = Ingrediente.query.get(id)
-    if not ingrediente:
-        return jsonify({'error': 'Ingrediente no encontrado'}), 404
+    try:
+        linea, = reabastecer_ingredientes([{'id': id, 'cantidad': data.get('cantidad')}])
+    except ReabastecimientoInvalido as e:
+        error = e.lineas[0]['error']
+        return jsonify({'error': error}), 404 if error == 'Ingrediente no encontrado' else 400
+    return jsonify({'message': f'Inventario de {linea["nombre"]} incrementado en {linea["cantidad"]} unidades'})
 
-    ingrediente.inventario += cantidad
-    db.session.commit()
-    return jsonify({'message': f'Inventario de {ingrediente.nombre} incrementado en {cantidad} unidades'})
+# Reabastecer varios ingredientes en una sola transacción (Empleados y administradores)
+@heladeria_bp.route('/api/ingredientes/reabastecer', methods=['POST'])
+@presupuesto_sql(4)
+@token_required
+@role_required_api('empleado', 'admin')
+@invalida_catalogo
+def reabastecer_ingredientes_lote(current_user):
+    """
+    Reabastece varios ingredientes con un único UPDATE.
+    Cuerpo: lista de {"id", "cantidad"} (o {"items": [...]}); sin "cantidad"
+    se usa la cantidad por defecto del tipo (5 para Base, 10 para Complemento).
+    Con {"tipo": "base", "cantidad"?} se reabastecen todos los de ese tipo.
+    Acceso: Empleados y administradores.
+    """
+    data = request.get_json(silent=True)
+
+    try:
+        if isinstance(data, dict) and 'tipo' in data:
+            total = reabastecer_por_tipo(data['tipo'], data.get('cantidad'))
+            return jsonify({'message': f'{total} ingredientes de tipo {data["tipo"]} reabastecidos', 'total': total})
+        items = data.get('items') if isinstance(data, dict) else data
+        lineas = reabastecer_ingredientes(items)
+    except TipoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except ReabastecimientoInvalido as e:
+        return jsonify({'error': 'Reabastecimiento inválido', 'lineas': e.lineas}), 400
+    return jsonify({'message': f'{len(lineas)} ingredientes reabastecidos', 'ingredientes': lineas})
+
+# Renovar el inventario de todos los complementos (Solo administradores)
+@heladeria_bp.route('/api/ingredientes/renovar', methods=['POST'])
+@presupuesto_sql(2)
+@token_required
+@role_required_api('admin')
+@invalida_catalogo
+def renovar_complementos_api(current_user):
+    """
+    Renueva (deja en 0) el inventario de todos los complementos con un único UPDATE.
+    Acceso: Solo administradores.
+    """
+    total = renovar_complementos()
+    return jsonify({'message': f'{total} complementos renovados', 'total': total})
 
 # Renovar inventario de un producto por ID
 @heladeria_bp.route('/api/productos/renovar/<int:id>', methods=['POST'])
+@presupuesto_sql(3)
 @token_required
 @role_required_api('admin')  # Solo accesible para administradores
+@invalida_catalogo
 def renovar_inventario_producto(current_user, id):
     """
     Actualiza el inventario de un producto según su ID.
     Solo accesible por administradores.
     """
-    # Buscar el producto por ID
-    producto = Producto.query.get(id)
-    if not producto:
-        return jsonify({'error': 'Producto no encontrado'}), 404
-
     # Obtener nueva cantidad del cuerpo de la solicitud
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     nueva_cantidad = data.get('nueva_cantidad', None)
-    
-    if nueva_cantidad is None or not isinstance(nueva_cantidad, int) or nueva_cantidad < 0:
+
+    if not _entero_positivo(nueva_cantidad, minimo=0):
         return jsonify({'error': 'La nueva cantidad debe ser un número entero positivo'}), 400
 
-    # Actualizar el inventario del producto
-    producto.inventario = nueva_cantidad
-    db.session.commit()
+    # Actualizar el inventario del producto con un UPDATE, sin cargarlo antes
+    try:
+        renovar_productos({id: nueva_cantidad})
+    except ProductoNoEncontrado:
+        return jsonify({'error': 'Producto no encontrado'}), 404
+    nombre = db.session.execute(db.select(Producto.nombre).where(Producto.id == id)).scalar()
 
-    return jsonify({'message': f'Inventario del producto "{producto.nombre}" renovado a {nueva_cantidad} unidades'})
+    return jsonify({'message': f'Inventario del producto "{nombre}" renovado a {nueva_cantidad} unidades'})
 
+# Renovar el inventario de varios productos (Solo administradores)
+@heladeria_bp.route('/api/productos/renovar', methods=['POST'])
+@presupuesto_sql(2)
+@token_required
+@role_required_api('admin')
+@invalida_catalogo
+def renovar_inventario_productos(current_user):
+    """
+    Fija el inventario de varios productos con un único UPDATE.
+    Cuerpo: lista de {"id", "nueva_cantidad"} (o {"items": [...]});
+    nueva_cantidad null deja de llevar el stock del producto.
+    Si algún producto no existe no se aplica ningún cambio.
+    Acceso: Solo administradores.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    try:
+        total = renovar_productos(validar_renovacion(items))
+    except RenovacionInvalida as e:
+        return jsonify({'error': 'Renovación inválida', 'lineas': e.lineas}), 400
+    except ProductoNoEncontrado as e:
+        return jsonify({'error': 'Productos no encontrados', 'ids': e.args[0]}), 404
+    return jsonify({'message': f'{total} productos renovados', 'total': total})
+
+# Ventas por hora o por día (Solo administradores)
+@heladeria_bp.route('/api/reportes/ventas', methods=['GET'])
+@presupuesto_sql(2)
+@token_required
+@role_required_api('admin')
+def reporte_ventas(current_user):
+    """
+    Unidades, ingresos, costo y margen por periodo, leídos de los resúmenes.
+    Parámetros: desde y hasta (AAAA-MM-DD, inclusive; por defecto los
+    últimos 7 días), granularidad=dia|hora y producto_id opcional.
+    Acceso: Solo administradores.
+    """
+    granularidad = request.args.get('granularidad', 'dia')
+    try:
+        desde, hasta = rango(request.args.get('desde'), request.args.get('hasta'), granularidad)
+        producto_id = entero(request.args.get('producto_id'), 'producto_id')
+    except ReporteInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'granularidad': granularidad,
+                    'periodos': serie_ventas(desde, hasta, granularidad, producto_id)})
+
+# Productos más vendidos (Solo administradores)
+@heladeria_bp.route('/api/reportes/productos/top', methods=['GET'])
+@presupuesto_sql(2)
+@token_required
+@role_required_api('admin')
+def reporte_top_productos(current_user):
+    """
+    Los n productos (10 por defecto) con más ingresos, unidades o margen
+    (?orden=) entre dos fechas, leídos de los resúmenes por día.
+    Acceso: Solo administradores.
+    """
+    try:
+        desde, hasta = rango(request.args.get('desde'), request.args.get('hasta'))
+        productos = top_productos(desde, hasta, entero(request.args.get('n', '10'), 'n'),
+                                  request.args.get('orden', 'ingresos'))
+    except ReporteInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'productos': productos})
+
+
+# Estado del pool de conexiones (Solo administradores)
+@heladeria_bp.route('/api/sistema/pool', methods=['GET'])
+@presupuesto_sql(1)
+@token_required
+@role_required_api('admin')
+def estado_pool(current_user):
+    """
+    Conexiones en uso, overflow y tiempos de espera del pool de este proceso.
+    Acceso: Solo administradores.
+    """
+    return jsonify({nombre or 'default': metricas_pool(engine) for nombre, engine in db.engines.items()})
 
 
 # *** MÉTODOS AUXILIARES ***
@@ -1,28 +1,42 @@
 import pymysql
-import os
+from flask_migrate import stamp, upgrade
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import inspect
+from sqlalchemy.engine import make_url
 
 db = SQLAlchemy()
 
-def create_database_if_not_exists():
-    """Verifica si la base de datos existe; si no, la crea."""
-    db_name = os.getenv("DB_NAME")
+def create_database_if_not_exists(uri):
+    """Verifica si la base de datos MySQL existe; si no, la crea."""
+    url = make_url(uri)
+    if not url.drivername.startswith('mysql'):
+        return
     connection = pymysql.connect(
-        host=os.getenv("DB_HOST"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        port=int(os.getenv("DB_PORT")),
+        host=url.host,
+        user=url.username,
+        password=url.password or '',
+        port=url.port or 3306,
     )
     try:
         with connection.cursor() as cursor:
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
-        print(f"Base de datos '{db_name}' verificada o creada exitosamente.")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{url.database}`")
+        print(f"Base de datos '{url.database}' verificada o creada exitosamente.")
     finally:
         connection.close()
 
 def init_db(app):
-    """Inicializa SQLAlchemy y crea las tablas si no existen."""
+    """Registra SQLAlchemy en la app. No abre conexiones ni ejecuta DDL."""
     db.init_app(app)
+
+# Primera revisión de migrations/: el esquema que creaba db.create_all()
+REVISION_INICIAL = '0001'
+
+def bootstrap_db(app):
+    """Crea la base de datos (MySQL) y aplica las migraciones pendientes."""
+    create_database_if_not_exists(app.config['SQLALCHEMY_DATABASE_URI'])
     with app.app_context():
-        db.create_all()
+        tablas = inspect(db.engine).get_table_names()
+        if tablas and 'alembic_version' not in tablas:
+            # Base creada con create_all antes de las migraciones: se marca el esquema inicial
+            stamp(revision=REVISION_INICIAL)
+        upgrade()
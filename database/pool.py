@@ -0,0 +1,77 @@
+import threading
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMedido(QueuePool):
+    """
+    QueuePool que además mide cuánto espera cada solicitud para obtener una
+    conexión (incluye abrirla si hace falta) y cuántas veces se agotó el tiempo.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.obtenciones = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.agotados = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._lock_metricas:
+                self.agotados += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._lock_metricas:
+                self.obtenciones += 1
+                self.espera_total += espera
+                self.espera_maxima = max(self.espera_maxima, espera)
+
+
+def opciones_engine(config):
+    """
+    Opciones de SQLAlchemy para el engine según la configuración DB_POOL_*.
+    El tamaño es por proceso: con gunicorn el total de conexiones es
+    workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+    SQLite en memoria usa su propio pool y no se toca.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.drivername.startswith('sqlite') and url.database in (None, '', ':memory:'):
+        return {}
+    return {
+        'poolclass': PoolMedido,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        # Reciclar antes del wait_timeout de MySQL y validar la conexión al tomarla
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def metricas_pool(engine):
+    """Estado del pool de un engine: conexiones en uso, overflow y tiempos de espera."""
+    pool = engine.pool
+    datos = {'clase': type(pool).__name__, 'estado': pool.status()}
+    if isinstance(pool, QueuePool):
+        datos.update({
+            'tamano': pool.size(),
+            'en_uso': pool.checkedout(),
+            'disponibles': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+        })
+    if isinstance(pool, PoolMedido):
+        datos.update({
+            'obtenciones': pool.obtenciones,
+            'agotados': pool.agotados,
+            'espera_media_ms': round(pool.espera_total / pool.obtenciones * 1000, 3) if pool.obtenciones else 0.0,
+            'espera_maxima_ms': round(pool.espera_maxima * 1000, 3),
+        })
+    return datos
@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+
+# gunicorn -c gunicorn.conf.py "app:create_app()"
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# Cada worker crea su propio pool; sin DB_POOL_SIZE explícito se usa una
+# conexión por hilo (ver config.py). Total máximo hacia MySQL:
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW), que debe quedar bajo max_connections.
+os.environ.setdefault('GUNICORN_THREADS', str(threads))
+# La caché del catálogo elige su backend según haya uno o varios workers
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+
+# Las métricas de /metrics se suman entre workers a través de este directorio
+# (ver services/instrumentacion.py); se vacía al arrancar gunicorn, no cuando
+# se reemplaza un worker, para que los contadores no retrocedan
+os.environ.setdefault('METRICAS_DIRECTORIO',
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metricas'))
+
+
+def on_starting(server):
+    directorio = os.environ['METRICAS_DIRECTORIO']
+    if os.path.isdir(directorio):
+        for nombre in os.listdir(directorio):
+            if nombre.endswith(('.json', '.json.tmp')):
+                os.remove(os.path.join(directorio, nombre))
@@ -0,0 +1,69 @@
+"""recetas, ventas y tipos de ingrediente
+
+Lo que los modelos agregaron sobre el esquema inicial antes de existir las
+migraciones: el libro de ventas, las recetas, la herencia de ingredientes
+(tipo, sabor) y la rentabilidad unitaria de los productos.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-17 00:33:40.112304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ingredientes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tipo', sa.String(length=20), server_default='ingrediente', nullable=False))
+        batch_op.add_column(sa.Column('sabor', sa.String(length=50), nullable=True))
+        batch_op.create_index(batch_op.f('ix_ingredientes_tipo'), ['tipo'], unique=False)
+
+    with op.batch_alter_table('productos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rentabilidad_unitaria', sa.Float(), nullable=True))
+
+    op.create_table('receta',
+    sa.Column('producto_id', sa.Integer(), nullable=False),
+    sa.Column('ingrediente_id', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ingrediente_id'], ['ingredientes.id'], ),
+    sa.ForeignKeyConstraint(['producto_id'], ['productos.id'], ),
+    sa.PrimaryKeyConstraint('producto_id', 'ingrediente_id')
+    )
+    with op.batch_alter_table('receta', schema=None) as batch_op:
+        batch_op.create_index('ix_receta_ingrediente_id', ['ingrediente_id'], unique=False)
+
+    op.create_table('ventas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('producto_id', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('precio_unitario', sa.Float(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['producto_id'], ['productos.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('ventas')
+    with op.batch_alter_table('receta', schema=None) as batch_op:
+        batch_op.drop_index('ix_receta_ingrediente_id')
+
+    op.drop_table('receta')
+    with op.batch_alter_table('productos', schema=None) as batch_op:
+        batch_op.drop_column('rentabilidad_unitaria')
+
+    with op.batch_alter_table('ingredientes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ingredientes_tipo'))
+        batch_op.drop_column('sabor')
+        batch_op.drop_column('tipo')
@@ -1,15 +1,23 @@
+from database import db
 from models.ingrediente import Ingrediente
 
 class Base(Ingrediente):
+    __mapper_args__ = {'polymorphic_identity': 'base'}
+
+    CANTIDAD_ABASTECER = 5
+
+    # Columna propia de las bases (nula para los demás tipos en la tabla única)
+    sabor = db.Column(db.String(50), nullable=True)
+
     def __init__(self, nombre, precio, calorias, inventario, es_vegetariano, sabor):
-        super().__init__(nombre, precio, calorias, inventario, es_vegetariano)
-        self.sabor = sabor
+        super().__init__(nombre=nombre, precio=precio, calorias=calorias, inventario=inventario,
+                         es_vegetariano=es_vegetariano, sabor=sabor)
 
-    def abastecer(self, cantidad=5):
+    def abastecer(self, cantidad=None):
         """
         Incrementa el inventario en la cantidad especificada (por defecto, 5 unidades).
         """
-        self.inventario += cantidad
+        self.inventario += self.CANTIDAD_ABASTECER if cantidad is None else cantidad
 
     # Getter y Setter para sabor
     def get_sabor(self):
@@ -1,14 +1,19 @@
 from models.ingrediente import Ingrediente
 
 class Complemento(Ingrediente):
+    __mapper_args__ = {'polymorphic_identity': 'complemento'}
+
+    CANTIDAD_ABASTECER = 10
+
     def __init__(self, nombre, precio, calorias, inventario, es_vegetariano):
-        super().__init__(nombre, precio, calorias, inventario, es_vegetariano)
+        super().__init__(nombre=nombre, precio=precio, calorias=calorias, inventario=inventario,
+                         es_vegetariano=es_vegetariano)
 
-    def abastecer(self, cantidad=10):
+    def abastecer(self, cantidad=None):
         """
         Incrementa el inventario en la cantidad especificada (por defecto, 10 unidades).
         """
-        self.inventario += cantidad
+        self.inventario += self.CANTIDAD_ABASTECER if cantidad is None else cantidad
 
     def renovar_inventario(self):
         """
@@ -0,0 +1,26 @@
+import datetime
+from database import db
+
+class Evento(db.Model):
+    """
+    Outbox de eventos: se inserta en la misma transacción que el cambio que
+    lo origina (por ejemplo, una venta) y lo procesa después un despachador
+    en segundo plano (ver services/eventos.py). Procesado, se borra.
+    """
+    __tablename__ = 'outbox'
+    __table_args__ = (db.Index('ix_outbox_muerto_disponible', 'muerto', 'disponible'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    datos = db.Column(db.JSON, nullable=False)
+    creado = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    # Desde cuándo se puede procesar: se posterga al reclamarlo y al reintentar
+    disponible = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    reclamo = db.Column(db.String(32), nullable=True, index=True)
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    # Agotó los reintentos: queda para revisión y no se vuelve a procesar
+    muerto = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __repr__(self):
+        return f'<Evento {self.id} {self.tipo}>'
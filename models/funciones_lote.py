@@ -0,0 +1,48 @@
+"""
+Versiones por lote de las calculadoras de models/funciones.py: reciben
+columnas (arreglos de NumPy o secuencias) de todo un catálogo y devuelven
+un arreglo con el resultado de cada producto.
+
+Las recetas se pasan como una matriz `cantidades` de productos x
+ingredientes (unidades de cada ingrediente en cada producto, 0 si no lo
+usa; ver matriz_recetas). Los precios pueden ser un vector por ingrediente
+o una matriz escenarios x ingredientes: en ese caso el resultado tiene una
+fila por escenario.
+"""
+import numpy as np
+
+
+def es_sano_lote(calorias, vegetariano) -> np.ndarray:
+    return (np.asarray(calorias) < 100) | np.asarray(vegetariano, dtype=bool)
+
+
+def calcular_calorias_lote(cantidades, calorias) -> np.ndarray:
+    return np.round(np.asarray(calorias, dtype=float) @ np.asarray(cantidades, dtype=float).T * 0.95, 2)
+
+
+def calcular_costo_lote(cantidades, precios) -> np.ndarray:
+    return np.asarray(precios, dtype=float) @ np.asarray(cantidades, dtype=float).T
+
+
+def calcular_rentabilidad_lote(precio, cantidades, precios) -> np.ndarray:
+    return np.asarray(precio, dtype=float) - calcular_costo_lote(cantidades, precios)
+
+
+def producto_mas_rentable_lote(nombres, rentabilidad):
+    """Nombre del producto más rentable (el primero si hay empate); uno por escenario si `rentabilidad` es 2D."""
+    indices = np.argmax(np.asarray(rentabilidad), axis=-1)
+    return np.asarray(nombres, dtype=object)[indices]
+
+
+def matriz_recetas(recetas, producto_ids, ingrediente_ids) -> np.ndarray:
+    """
+    Matriz densa productos x ingredientes a partir de filas (producto_id,
+    ingrediente_id, cantidad), en el orden de `producto_ids` e `ingrediente_ids`.
+    """
+    filas = {p: i for i, p in enumerate(producto_ids)}
+    columnas = {ing: j for j, ing in enumerate(ingrediente_ids)}
+    matriz = np.zeros((len(filas), len(columnas)))
+    if recetas:
+        p, ing, cantidad = zip(*recetas)
+        np.add.at(matriz, ([filas[x] for x in p], [columnas[x] for x in ing]), cantidad)
+    return matriz
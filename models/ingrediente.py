@@ -1,14 +1,36 @@
 from database import db
+from models.receta import Receta  # Registra el modelo usado por la relación 'recetas'
 
 class Ingrediente(db.Model):
     __tablename__ = 'ingredientes'
 
+    # Cantidad por defecto al reabastecer; cada tipo de ingrediente define la suya
+    CANTIDAD_ABASTECER = None
+
     id = db.Column(db.Integer, primary_key=True)
-    nombre = db.Column(db.String(100), nullable=False)
+    nombre = db.Column(db.String(100), nullable=False, unique=True, index=True)
     precio = db.Column(db.Float, nullable=False)
     calorias = db.Column(db.Float, nullable=False)
     inventario = db.Column(db.Integer, default=0)
+    # Umbrales de stock (NULL: sin control). Al llegar al punto de reorden
+    # (por defecto, el stock mínimo) conviene pedir; bajo_stock lo calcula la
+    # base en cada escritura y su índice permite listar esos ingredientes
+    # sin recorrer la tabla.
+    stock_minimo = db.Column(db.Integer, nullable=True)
+    punto_reorden = db.Column(db.Integer, nullable=True)
+    bajo_stock = db.Column(db.Boolean, db.Computed('coalesce(inventario, 0) <= coalesce(punto_reorden, stock_minimo)'),
+                           index=True)
     es_vegetariano = db.Column(db.Boolean, default=False)
+    # Discriminador de la herencia de tabla única (Base, Complemento)
+    tipo = db.Column(db.String(20), nullable=False, default='ingrediente', server_default='ingrediente', index=True)
+
+    __mapper_args__ = {'polymorphic_on': tipo, 'polymorphic_identity': 'ingrediente'}
+
+    recetas = db.relationship('Receta', back_populates='ingrediente')
 
     def es_sano(self):
         return self.calorias < 100 or self.es_vegetariano
+
+
+# Registrar las subclases para que las filas se carguen con su tipo real
+from models import base, complemento  # noqa: E402
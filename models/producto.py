@@ -1,4 +1,5 @@
 from database import db
+from models.receta import Receta  # Registra el modelo usado por la relación 'receta'
 
 class Producto(db.Model):
     __tablename__ = 'productos'
@@ -9,3 +10,10 @@ class Producto(db.Model):
     calorias_totales = db.Column(db.Float, nullable=True)
     costo_produccion = db.Column(db.Float, nullable=True)
     rentabilidad = db.Column(db.Float, nullable=True)
+    # Margen por unidad (precio - costo), mantenido por services.metricas
+    rentabilidad_unitaria = db.Column(db.Float, nullable=True)
+    # Unidades terminadas en stock; NULL si el producto se prepara al momento
+    # y no se lleva su inventario (entonces solo se controlan los ingredientes)
+    inventario = db.Column(db.Integer, nullable=True)
+
+    receta = db.relationship('Receta', back_populates='producto', cascade='all, delete-orphan')
@@ -0,0 +1,20 @@
+from database import db
+
+class Receta(db.Model):
+    """
+    Asociación producto-ingrediente: cuántas unidades de cada ingrediente
+    consume una unidad vendida del producto.
+    """
+    __tablename__ = 'receta'
+    # Índice inverso ingrediente -> productos para recalcular solo los afectados
+    __table_args__ = (db.Index('ix_receta_ingrediente_id', 'ingrediente_id'),)
+
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), primary_key=True)
+    ingrediente_id = db.Column(db.Integer, db.ForeignKey('ingredientes.id'), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=1)
+
+    producto = db.relationship('Producto', back_populates='receta')
+    ingrediente = db.relationship('Ingrediente', back_populates='recetas')
+
+    def __repr__(self):
+        return f'<Receta producto={self.producto_id} ingrediente={self.ingrediente_id} cantidad={self.cantidad}>'
@@ -0,0 +1,42 @@
+from sqlalchemy.orm import declared_attr
+from database import db
+
+class ResumenVentas:
+    """
+    Totales de ventas de un producto en un periodo. Se suman en la misma
+    transacción de cada venta (ver services/reportes.py) y se pueden
+    reconstruir desde el libro `ventas`. La clave (periodo, producto_id)
+    sirve los reportes de todos los productos por rango y el índice
+    (producto_id, periodo) los de un producto.
+    """
+
+    @declared_attr
+    def producto_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('productos.id'), primary_key=True)
+
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Float, nullable=False, default=0.0)
+    costo = db.Column(db.Float, nullable=False, default=0.0)
+    # Líneas del libro que resume la fila
+    ventas = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VentaPorHora(ResumenVentas, db.Model):
+    __tablename__ = 'ventas_por_hora'
+    __table_args__ = (db.Index('ix_ventas_por_hora_producto_periodo', 'producto_id', 'periodo'),)
+
+    # Inicio de la hora (UTC)
+    periodo = db.Column(db.DateTime, primary_key=True)
+
+    def __repr__(self):
+        return f'<VentaPorHora producto={self.producto_id} {self.periodo}>'
+
+
+class VentaPorDia(ResumenVentas, db.Model):
+    __tablename__ = 'ventas_por_dia'
+    __table_args__ = (db.Index('ix_ventas_por_dia_producto_periodo', 'producto_id', 'periodo'),)
+
+    periodo = db.Column(db.Date, primary_key=True)
+
+    def __repr__(self):
+        return f'<VentaPorDia producto={self.producto_id} {self.periodo}>'
@@ -0,0 +1,15 @@
+from database import db
+
+class TokenRevocado(db.Model):
+    """
+    Refresh token revocado antes de vencer. Solo se guarda su identificador
+    (jti) hasta la fecha en que vencería; después la fila se puede purgar.
+    """
+    __tablename__ = 'tokens_revocados'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(32), nullable=False, unique=True)
+    expira = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<TokenRevocado {self.jti}>'
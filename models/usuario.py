@@ -2,6 +2,17 @@ from flask_login import UserMixin
 from database import db
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Cada rol es un bit: verificar permisos es un AND entre dos enteros
+ROLES = {'admin': 1, 'empleado': 2, 'cliente': 4}
+
+
+def mascara_de(es_admin=False, es_empleado=False, es_cliente=False):
+    """Máscara de un usuario a partir de sus banderas es_*."""
+    return ((ROLES['admin'] if es_admin else 0)
+            | (ROLES['empleado'] if es_empleado else 0)
+            | (ROLES['cliente'] if es_cliente else 0))
+
+
 class Usuario(UserMixin, db.Model):
     __tablename__ = 'usuarios'
 
@@ -12,6 +23,11 @@ class Usuario(UserMixin, db.Model):
     es_empleado = db.Column(db.Boolean, default=False)
     es_cliente = db.Column(db.Boolean, default=False)
 
+    @property
+    def roles(self):
+        """Máscara de bits de los roles del usuario (ver ROLES)."""
+        return mascara_de(self.es_admin, self.es_empleado, self.es_cliente)
+
     def set_password(self, password):
         """Crea un hash seguro para la contraseña."""
         self.password = generate_password_hash(password)
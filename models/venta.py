@@ -0,0 +1,22 @@
+import datetime
+from database import db
+
+class Venta(db.Model):
+    """
+    Libro de ventas (solo inserción). Cada fila registra una venta con el
+    precio y el costo de producción vigentes en el momento en que se realizó.
+    """
+    __tablename__ = 'ventas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False, index=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True, index=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=1)
+    precio_unitario = db.Column(db.Float, nullable=False)
+    total = db.Column(db.Float, nullable=False)
+    # NULL en las ventas anteriores a registrarlo (los reportes usan el costo actual)
+    costo_unitario = db.Column(db.Float, nullable=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<Venta {self.id} producto={self.producto_id} cantidad={self.cantidad}>'
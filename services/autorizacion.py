@@ -0,0 +1,19 @@
+from models.usuario import ROLES
+
+
+def mascara_roles(*roles):
+    """
+    Compila una lista de roles a su máscara de bits. Se llama una sola vez al
+    decorar la vista; un rol desconocido es un error de programación.
+    """
+    mascara = 0
+    for rol in roles:
+        if rol not in ROLES:
+            raise ValueError(f'Rol desconocido: {rol}')
+        mascara |= ROLES[rol]
+    return mascara
+
+
+def tiene_rol(usuario, mascara):
+    """True si el usuario tiene al menos uno de los roles de la máscara."""
+    return bool(getattr(usuario, 'roles', 0) & mascara)
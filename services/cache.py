@@ -0,0 +1,251 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from functools import wraps
+from flask import current_app, g, has_request_context, request, make_response
+from flask_login import current_user
+from sqlalchemy import event
+from database import db
+
+
+class CacheMemoria:
+    """
+    LRU en memoria del proceso. Cada worker tiene su propia versión del
+    catálogo y no se entera de las escrituras de los demás, así que la versión
+    caduca a los `ttl` segundos: pasado ese tiempo se descartan las entradas y
+    cambian ETag y Last-Modified, con lo que una lectura nunca queda más
+    atrasada que el ttl. Sin ttl solo sirve con un único worker.
+    """
+
+    def __init__(self, maximo=1024, ttl=None):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        # Se parte del reloj para que un reinicio no repita ETags ya entregados
+        self._version = int(time.time() * 1000)
+        self._modificado = int(time.time())
+        self._creada = time.monotonic()
+
+    @property
+    def version_acotada(self):
+        """Si una escritura de otro worker llega a verse (a lo sumo tras el ttl)."""
+        return bool(self.ttl)
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def version(self):
+        with self._lock:
+            if self.ttl and time.monotonic() - self._creada >= self.ttl:
+                self._nueva_version()
+            return self._version, self._modificado
+
+    def incrementar_version(self):
+        with self._lock:
+            self._nueva_version()
+
+    def _nueva_version(self):
+        self._version += 1
+        # Segundos enteros y estrictamente crecientes para que Last-Modified sea exacto
+        self._modificado = max(int(time.time()), self._modificado + 1)
+        self._creada = time.monotonic()
+        self._datos.clear()
+
+
+class CacheSQLite:
+    """
+    Backend en un archivo SQLite local: lo comparten todos los workers de la
+    misma máquina, incluida la versión del catálogo.
+    """
+    version_acotada = True
+
+    def __init__(self, ruta, maximo=4096):
+        self.ruta = ruta
+        self.maximo = maximo
+        self._local = threading.local()
+        with self._conexion() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (clave TEXT PRIMARY KEY, valor BLOB, usado REAL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS version (id INTEGER PRIMARY KEY CHECK (id = 1), '
+                         'numero INTEGER, modificado REAL)')
+            conn.execute('INSERT OR IGNORE INTO version VALUES (1, ?, ?)', (int(time.time() * 1000), int(time.time())))
+
+    def _conexion(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, clave):
+        fila = self._conexion().execute('SELECT valor FROM cache WHERE clave = ?', (clave,)).fetchone()
+        return pickle.loads(fila[0]) if fila else None
+
+    def set(self, clave, valor):
+        conn = self._conexion()
+        conn.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)', (clave, pickle.dumps(valor), time.time()))
+        conn.execute('DELETE FROM cache WHERE clave IN (SELECT clave FROM cache ORDER BY usado DESC LIMIT -1 OFFSET ?)',
+                     (self.maximo,))
+
+    def version(self):
+        return tuple(self._conexion().execute('SELECT numero, modificado FROM version').fetchone())
+
+    def incrementar_version(self):
+        conn = self._conexion()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('UPDATE version SET numero = numero + 1, modificado = MAX(?, modificado + 1)', (int(time.time()),))
+        conn.execute('DELETE FROM cache')
+        conn.execute('COMMIT')
+
+
+def crear_backend(config):
+    """
+    Crea el backend indicado por CACHE_BACKEND ('memoria' o 'sqlite'); sin
+    indicarlo, 'sqlite' si hay más de un worker (WEB_CONCURRENCY).
+    """
+    tipo = config.get('CACHE_BACKEND') or ('sqlite' if int(config.get('WEB_CONCURRENCY') or 1) > 1 else 'memoria')
+    maximo = int(config.get('CACHE_MAXIMO', 1024))
+    if tipo == 'sqlite':
+        ruta = config.get('CACHE_SQLITE_RUTA') or os.path.join(current_app.instance_path, 'cache_catalogo.db')
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        return CacheSQLite(ruta, maximo)
+    if tipo == 'memoria':
+        return CacheMemoria(maximo, ttl=float(config.get('CACHE_TTL', 5)))
+    raise ValueError(f'Backend de caché desconocido: {tipo}')
+
+
+def init_cache(app):
+    with app.app_context():
+        app.extensions['heladeria_cache'] = crear_backend(app.config)
+
+
+def obtener_backend():
+    backend = current_app.extensions.get('heladeria_cache')
+    if backend is None:
+        backend = current_app.extensions['heladeria_cache'] = crear_backend(current_app.config)
+    return backend
+
+
+def invalidar_catalogo():
+    """Nueva versión del catálogo: cambia el ETag de todas las lecturas cacheadas."""
+    obtener_backend().incrementar_version()
+
+
+def _rol_actual():
+    if not current_user.is_authenticated:
+        return 'anonimo'
+    return f"roles{getattr(current_user, 'roles', 0)}"
+
+
+def cache_catalogo(f):
+    """
+    Cachea la respuesta de una lectura pública del catálogo.
+    La clave combina endpoint, parámetros y rol (el administrador ve datos que
+    los demás no). El ETag deriva de la versión del catálogo, así que una
+    solicitud condicional se responde con 304 sin consultar la base ni
+    renderizar la plantilla.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_app.config.get('CACHE_DESHABILITADA'):
+            return f(*args, **kwargs)
+
+        backend = obtener_backend()
+        version, modificado = backend.version()
+        clave = '|'.join([
+            request.endpoint,
+            repr(sorted(request.view_args.items())),
+            repr(sorted(request.args.items(multi=True))),
+            request.headers.get('Accept', ''),
+            _rol_actual(),
+        ])
+        etag = hashlib.sha1(f'{version}|{clave}'.encode()).hexdigest()
+        last_modified = formatdate(modificado, usegmt=True)
+
+        if etag in request.if_none_match or _no_modificado(modificado):
+            response = make_response('', 304)
+        else:
+            entrada = backend.get(clave)
+            if entrada is not None and entrada[0] == version:
+                _, cuerpo, mimetype = entrada
+                response = current_app.response_class(cuerpo, mimetype=mimetype)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                backend.set(clave, (version, response.get_data(), response.mimetype))
+
+        response.set_etag(etag)
+        response.headers['Last-Modified'] = last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.update(('Cookie', 'x-access-token'))
+        return response
+    return decorated_function
+
+
+def _no_modificado(modificado):
+    if 'If-None-Match' in request.headers or 'If-Modified-Since' not in request.headers:
+        return False
+    try:
+        return parsedate_to_datetime(request.headers['If-Modified-Since']).timestamp() >= modificado
+    except (TypeError, ValueError):
+        return False
+
+
+def invalida_catalogo(f):
+    """
+    Para rutas de escritura (venta, reabastecimiento, renovación): si durante
+    la solicitud se confirmó alguna escritura se publica una nueva versión del
+    catálogo. No se deduce del código de estado: las páginas HTML rechazan un
+    formulario con una redirección y eso no debe descartar la caché.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.pop('catalogo_modificado', None)
+        response = make_response(f(*args, **kwargs))
+        if g.pop('catalogo_modificado', False):
+            invalidar_catalogo()
+        return response
+    return decorated_function
+
+
+# *** ESCRITURAS CONFIRMADAS ***
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _anotar_sentencia_de_escritura(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['catalogo_escrito'] = True
+
+
+@event.listens_for(db.session, 'after_flush')
+def _anotar_flush_de_escritura(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info['catalogo_escrito'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _marcar_catalogo_modificado(session):
+    if session.info.pop('catalogo_escrito', False) and has_request_context():
+        g.catalogo_modificado = True
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_escritura(session):
+    session.info.pop('catalogo_escrito', None)
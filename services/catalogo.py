@@ -0,0 +1,87 @@
+import json
+from urllib.parse import urlencode
+from flask import Response, jsonify, request, stream_with_context
+from sqlalchemy import select
+from database import db
+
+# Tamaño máximo de página y de lote al recorrer resultados en streaming
+MAX_LIMITE = 1000
+TAMANO_LOTE = 500
+
+
+class ParametrosInvalidos(Exception):
+    """Los parámetros de paginación o proyección no son válidos."""
+
+
+def leer_parametros(campos_permitidos, campos_defecto):
+    """
+    Lee `fields`, `after`, `limit` y `format` de la query string.
+    `fields` es una lista separada por comas y solo puede contener campos
+    permitidos; `id` siempre se incluye porque es el cursor de paginación.
+    """
+    campos = campos_defecto
+    if request.args.get('fields'):
+        campos = [c.strip() for c in request.args['fields'].split(',') if c.strip()]
+        desconocidos = [c for c in campos if c not in campos_permitidos]
+        if desconocidos:
+            raise ParametrosInvalidos(f'Campos no permitidos: {", ".join(desconocidos)}')
+        if 'id' not in campos:
+            campos = ['id'] + campos
+
+    try:
+        after = int(request.args['after']) if 'after' in request.args else None
+        limite = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        raise ParametrosInvalidos('after y limit deben ser enteros')
+    if limite is not None and not 1 <= limite <= MAX_LIMITE:
+        raise ParametrosInvalidos(f'limit debe estar entre 1 y {MAX_LIMITE}')
+
+    ndjson = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+    return campos, after, limite, ndjson
+
+
+def consulta_paginada(modelo, campos, after=None, limite=None):
+    """
+    SELECT de solo las columnas pedidas, ordenado por id y paginado por
+    cursor (WHERE id > :after LIMIT :limite) en lugar de OFFSET.
+    """
+    stmt = select(*(getattr(modelo, c) for c in campos)).order_by(modelo.id)
+    if after is not None:
+        stmt = stmt.where(modelo.id > after)
+    if limite is not None:
+        stmt = stmt.limit(limite)
+    return stmt
+
+
+def responder_listado(modelo, campos_permitidos, campos_defecto):
+    """
+    Respuesta de listado compartida por /api/productos y /api/ingredientes.
+    - JSON (por defecto): arreglo de objetos; si la página está completa se
+      indica el siguiente cursor en X-Next-Cursor y en la cabecera Link.
+    - NDJSON (?format=ndjson o Accept: application/x-ndjson): un objeto por
+      línea, generado a medida que se leen las filas con yield_per, por lo que
+      la memoria no depende del tamaño de la tabla.
+    """
+    try:
+        campos, after, limite, ndjson = leer_parametros(campos_permitidos, campos_defecto)
+    except ParametrosInvalidos as e:
+        return jsonify({'error': str(e)}), 400
+
+    stmt = consulta_paginada(modelo, campos, after, limite)
+
+    if ndjson:
+        def generar():
+            for fila in db.session.execute(stmt.execution_options(yield_per=TAMANO_LOTE)):
+                yield json.dumps(dict(zip(campos, fila)), ensure_ascii=False) + '\n'
+        return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+    filas = [dict(zip(campos, fila)) for fila in db.session.execute(stmt)]
+    response = jsonify(filas)
+    if limite is not None and len(filas) == limite:
+        siguiente = filas[-1]['id']
+        args = request.args.to_dict()
+        args['after'] = siguiente
+        response.headers['X-Next-Cursor'] = str(siguiente)
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response, 200
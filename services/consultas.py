@@ -0,0 +1,95 @@
+import threading
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from database import db
+
+
+class DialectoNoSoportado(ValueError):
+    """La base en uso no admite la operación (se soportan MySQL, SQLite y PostgreSQL)."""
+
+
+def presupuesto_sql(maximo, repetidas=False):
+    """
+    Declara cuántas sentencias SQL puede ejecutar una ruta por solicitud (con
+    las cachés frías). No cambia el comportamiento en producción: lo verifica
+    el plugin de pruebas tests/plugin_sql.py, que además falla si una misma
+    sentencia se repite en la solicitud salvo que `repetidas` sea True.
+    Como los decoradores usan functools.wraps, el atributo llega a la vista
+    registrada sin importar el orden.
+    """
+    def decorator(f):
+        f.presupuesto_sql = maximo
+        f.permite_repetidas = repetidas
+        return f
+    return decorator
+
+
+class ContadorSQL:
+    """
+    Context manager que anota las sentencias ejecutadas por un engine:
+        with ContadorSQL(db.engine) as contador:
+            ...
+        contador.total, contador.repetidas()
+    Con `solo_este_hilo` solo cuenta las del hilo que lo creó; con `filtro`
+    (una función que recibe el SQL), solo las que cumplen. Con `parametros`,
+    `contador.parametros` guarda los de cada sentencia, en el mismo orden.
+    """
+
+    def __init__(self, engine, solo_este_hilo=False, filtro=None, parametros=False):
+        self.engine = engine
+        self.hilo = threading.get_ident() if solo_este_hilo else None
+        self.filtro = filtro
+        self.sentencias = []
+        self.parametros = [] if parametros else None
+
+    def _anotar(self, conn, cursor, statement, parameters, context, executemany):
+        if self.hilo is not None and self.hilo != threading.get_ident():
+            return
+        if self.filtro is not None and not self.filtro(statement):
+            return
+        self.sentencias.append(statement)
+        if self.parametros is not None:
+            self.parametros.append(parameters)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._anotar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._anotar)
+
+    @property
+    def total(self):
+        return len(self.sentencias)
+
+    def repetidas(self):
+        """Sentencias (mismo SQL) ejecutadas más de una vez: el síntoma de un N+1."""
+        return repetidas(self.sentencias)
+
+
+def repetidas(sentencias):
+    return {s: n for s, n in Counter(sentencias).items() if n > 1}
+
+
+def insert_o_actualizar(modelo, claves, columnas, valor):
+    """
+    INSERT en bloque de `modelo` que, si la clave ya existe, asigna a cada
+    columna de `columnas` la expresión valor(actual, insertada) (ON CONFLICT
+    en SQLite/PostgreSQL, ON DUPLICATE KEY en MySQL). Sin columnas, las filas
+    existentes no se modifican. Devuelve la sentencia, para ejecutarla con
+    la lista de filas.
+    """
+    tabla = modelo.__table__
+    dialecto = db.engine.dialect.name
+    if dialecto == 'mysql':
+        stmt = mysql.insert(tabla)
+        cambios = {c: valor(tabla.c[c], stmt.inserted[c]) for c in columnas}
+        return stmt.on_duplicate_key_update(cambios or {claves[0]: tabla.c[claves[0]]})
+    if dialecto in ('sqlite', 'postgresql'):
+        stmt = (sqlite if dialecto == 'sqlite' else postgresql).insert(tabla)
+        if not columnas:
+            return stmt.on_conflict_do_nothing(index_elements=claves)
+        return stmt.on_conflict_do_update(
+            index_elements=claves, set_={c: valor(tabla.c[c], stmt.excluded[c]) for c in columnas})
+    raise DialectoNoSoportado(f'Upsert no soportado para {dialecto}')
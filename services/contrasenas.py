@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+from database import db
+from models.usuario import Usuario
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class LimiteExcedido(Exception):
+    """Demasiados intentos de login para un usuario o una IP."""
+
+    def __init__(self, reintentar):
+        super().__init__('Demasiados intentos de inicio de sesión')
+        self.reintentar = reintentar
+
+
+class VerificadorOcupado(Exception):
+    """La cola de verificación de contraseñas está llena."""
+
+
+def normalizar_metodo(metodo):
+    """
+    Método de hash con todos sus parámetros, tal como queda al inicio del
+    hash guardado: 'pbkdf2' -> 'pbkdf2:sha256:1000000', 'scrypt' -> 'scrypt:32768:8:1'.
+    """
+    partes = metodo.split(':')
+    if partes[0] == 'pbkdf2' and len(partes) <= 3:
+        valores = partes[1:] + ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)][len(partes) - 1:]
+    elif partes[0] == 'scrypt' and len(partes) <= 4:
+        valores = partes[1:] + ['32768', '8', '1'][len(partes) - 1:]
+    else:
+        raise ValueError(f'Método de hash no soportado: {metodo}')
+    return ':'.join([partes[0], *valores])
+
+
+class CuboTokens:
+    """
+    Limitador token bucket por clave (usuario o IP): cada clave admite
+    `rafaga` intentos seguidos y recupera `por_minuto` intentos por minuto.
+    Guarda como mucho `maximo` claves (LRU). Con `rafaga=0` no limita.
+    """
+
+    def __init__(self, rafaga, por_minuto, maximo=10000):
+        self.rafaga = rafaga
+        self.por_segundo = por_minuto / 60
+        self.maximo = maximo
+        self._cubos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave):
+        """Consume un intento; devuelve 0 si se permite o los segundos a esperar."""
+        if self.rafaga <= 0:
+            return 0
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, antes = self._cubos.pop(clave, (self.rafaga, ahora))
+            tokens = min(self.rafaga, tokens + (ahora - antes) * self.por_segundo)
+            espera = 0 if tokens >= 1 else (1 - tokens) / self.por_segundo if self.por_segundo else float('inf')
+            self._cubos[clave] = (tokens - 1 if not espera else tokens, ahora)
+            while len(self._cubos) > self.maximo:
+                self._cubos.popitem(last=False)
+        return espera
+
+    def clear(self):
+        with self._lock:
+            self._cubos.clear()
+
+
+class RanurasHost:
+    """
+    Semáforo compartido por todos los procesos de la máquina: `n` archivos de
+    bloqueo en `directorio`, tomados con flock. Cada worker de gunicorn tiene
+    su propio pool, así que sin esto el límite de hashes simultáneos se
+    multiplicaría por la cantidad de workers. El bloqueo se libera solo si el
+    proceso muere. Sin fcntl (Windows) no limita.
+    """
+
+    def __init__(self, directorio, n, espera=10.0):
+        self.rutas = [os.path.join(directorio, f'ranura-{i}.lock') for i in range(n)]
+        self.espera = espera
+        os.makedirs(directorio, exist_ok=True)
+
+    @contextmanager
+    def ocupar(self):
+        """Toma una ranura libre; lanza VerificadorOcupado si no se libera ninguna en `espera` s."""
+        if fcntl is None:
+            yield
+            return
+        limite = time.monotonic() + self.espera
+        while True:
+            for ruta in self.rutas:
+                fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                return
+            if time.monotonic() >= limite:
+                raise VerificadorOcupado('Todas las ranuras de hash de la máquina están ocupadas')
+            time.sleep(0.005)
+
+
+class Contrasenas:
+    """
+    Hash y verificación de contraseñas. Las verificaciones corren en un pool
+    acotado de hilos (hashlib libera el GIL mientras calcula) y cada una toma
+    una de las `ranuras` de la máquina, así que un pico de logins ocupa como
+    mucho HASH_HILOS núcleos entre todos los workers; con `cola`
+    verificaciones pendientes en un worker las siguientes se rechazan en
+    lugar de esperar.
+    """
+
+    def __init__(self, metodo, hilos, cola, limite_usuario, limite_ip, ranuras=None):
+        self.metodo = normalizar_metodo(metodo)
+        self.hilos = hilos
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='contrasenas')
+        self._pendientes = threading.BoundedSemaphore(cola)
+        self.limite_usuario = limite_usuario
+        self.limite_ip = limite_ip
+        self.ranuras = ranuras
+
+    def hashear(self, password):
+        return generate_password_hash(password, method=self.metodo)
+
+    def necesita_rehash(self, hash_):
+        """True si el hash se generó con otro método o parámetros que los configurados."""
+        return hash_.split('$', 1)[0] != self.metodo
+
+    def verificar(self, hash_, password):
+        """
+        (válida, nuevo hash o None): si la contraseña es válida pero el hash
+        usa otro método, el nuevo hash se calcula en el mismo pool.
+        """
+        if not self._pendientes.acquire(blocking=False):
+            raise VerificadorOcupado('Demasiadas verificaciones de contraseña en curso')
+        try:
+            return self._pool.submit(self._verificar, hash_, password).result()
+        finally:
+            self._pendientes.release()
+
+    def _verificar(self, hash_, password):
+        if self.ranuras is None:
+            return self._calcular(hash_, password)
+        with self.ranuras.ocupar():
+            return self._calcular(hash_, password)
+
+    def _calcular(self, hash_, password):
+        if not check_password_hash(hash_, password):
+            return False, None
+        return True, self.hashear(password) if self.necesita_rehash(hash_) else None
+
+    def limitar(self, username, ip):
+        """Consume un intento del usuario y de la IP; lanza LimiteExcedido si no quedan."""
+        espera = max(self.limite_usuario.consumir(username), self.limite_ip.consumir(ip))
+        if espera:
+            raise LimiteExcedido(espera)
+
+
+def init_contrasenas(app):
+    # HASH_HILOS es el límite de la máquina: cada worker puede usarlo entero
+    # si los demás están libres, pero las ranuras compartidas lo hacen respetar
+    hilos = int(app.config.get('HASH_HILOS') or max(1, (os.cpu_count() or 2) // 2))
+    directorio = app.config.get('HASH_RANURAS_DIRECTORIO') or os.path.join(app.instance_path, 'hash')
+    app.extensions['heladeria_contrasenas'] = Contrasenas(
+        app.config.get('PASSWORD_HASH_METODO', 'pbkdf2:sha256'),
+        hilos,
+        int(app.config.get('HASH_COLA') or hilos * 4),
+        CuboTokens(int(app.config.get('LOGIN_RAFAGA_USUARIO', 10)), float(app.config.get('LOGIN_POR_MINUTO_USUARIO', 5))),
+        CuboTokens(int(app.config.get('LOGIN_RAFAGA_IP', 50)), float(app.config.get('LOGIN_POR_MINUTO_IP', 30))),
+        RanurasHost(directorio, hilos),
+    )
+
+
+def obtener_contrasenas():
+    contrasenas = current_app.extensions.get('heladeria_contrasenas')
+    if contrasenas is None:
+        init_contrasenas(current_app)
+        contrasenas = current_app.extensions['heladeria_contrasenas']
+    return contrasenas
+
+
+def hashear(password):
+    """Hash de una contraseña con el método configurado (PASSWORD_HASH_METODO)."""
+    return obtener_contrasenas().hashear(password)
+
+
+def autenticar(username, password, ip):
+    """
+    Devuelve el usuario si las credenciales son válidas, o None. Aplica el
+    límite de intentos por usuario e IP y, si el hash guardado usa otro
+    método o costo que el configurado, lo reemplaza (rehash al iniciar sesión).
+    Lanza LimiteExcedido o VerificadorOcupado.
+    """
+    contrasenas = obtener_contrasenas()
+    contrasenas.limitar(f'usuario:{username}', f'ip:{ip}')
+    usuario = Usuario.query.filter_by(username=username).first()
+    if not usuario or not isinstance(password, str) or not password:
+        return None
+    valida, nuevo_hash = contrasenas.verificar(usuario.password, password)
+    if not valida:
+        return None
+    if nuevo_hash:
+        usuario.password = nuevo_hash
+        db.session.commit()
+    return usuario
@@ -0,0 +1,191 @@
+import datetime
+import logging
+import os
+import threading
+import uuid
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, select, update
+from database import db
+from models.evento import Evento
+
+logger = logging.getLogger(__name__)
+
+# tipo de evento -> funciones suscritas
+SUSCRIPTORES = {}
+
+
+def suscriptor(tipo):
+    """
+    Registra una función que procesa los eventos de `tipo` en lotes:
+        @suscriptor('venta_registrada')
+        def sumar_puntos(eventos): ...   # lista con los `datos` de cada evento
+    Corre en el despachador, con contexto de app, en la misma transacción que
+    borra los eventos del outbox. La entrega es al menos una vez: si falla,
+    el lote se reintenta, así que los suscriptores deben ser idempotentes.
+    """
+    def decorator(f):
+        SUSCRIPTORES.setdefault(tipo, []).append(f)
+        return f
+    return decorator
+
+
+def publicar(tipo, **datos):
+    """
+    Agrega un evento al outbox dentro de la transacción en curso: se guarda
+    (y luego se procesa) solo si esa transacción hace commit.
+    """
+    db.session.execute(insert(Evento).values(tipo=tipo, datos=datos))
+    db.session.info['eventos_publicados'] = True
+
+
+def _fallar(ids, error, max_intentos):
+    """Posterga los eventos con espera exponencial o los marca como muertos."""
+    ahora = datetime.datetime.utcnow()
+    for evento in db.session.execute(select(Evento).where(Evento.id.in_(ids))).scalars():
+        evento.intentos += 1
+        evento.error = error[:1000]
+        evento.reclamo = None
+        evento.muerto = evento.intentos >= max_intentos
+        evento.disponible = ahora + datetime.timedelta(seconds=min(2 ** evento.intentos, 300))
+    db.session.commit()
+
+
+def _procesar(tipo, eventos, max_intentos):
+    try:
+        for funcion in SUSCRIPTORES.get(tipo, ()):
+            funcion([e.datos for e in eventos])
+        db.session.execute(delete(Evento).where(Evento.id.in_([e.id for e in eventos])))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if len(eventos) > 1:
+            # Uno por uno para aislar el evento que falla
+            for evento in eventos:
+                _procesar(tipo, [evento], max_intentos)
+            return
+        logger.exception('Falló el evento %s (%s)', eventos[0].id, tipo)
+        _fallar([eventos[0].id], f'{type(e).__name__}: {e}', max_intentos)
+
+
+def procesar_lote(lote=100, max_intentos=5, plazo=60):
+    """
+    Reclama hasta `lote` eventos disponibles y los procesa agrupados por tipo.
+    El reclamo posterga los eventos `plazo` segundos: si el proceso muere a
+    mitad, otro los retoma después. Devuelve cuántos eventos reclamó.
+    """
+    ahora = datetime.datetime.utcnow()
+    ids = db.session.execute(
+        select(Evento.id).where(Evento.muerto.is_(False), Evento.disponible <= ahora).order_by(Evento.id).limit(lote)
+    ).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return 0
+
+    # Otro despachador pudo reclamar algunos entre el SELECT y el UPDATE
+    reclamo = uuid.uuid4().hex
+    db.session.execute(
+        update(Evento)
+        .where(Evento.id.in_(ids), Evento.disponible <= ahora, Evento.muerto.is_(False))
+        .values(reclamo=reclamo, disponible=ahora + datetime.timedelta(seconds=plazo))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    eventos = db.session.execute(
+        select(Evento).where(Evento.reclamo == reclamo).order_by(Evento.id)
+    ).scalars().all()
+
+    por_tipo = {}
+    for evento in eventos:
+        por_tipo.setdefault(evento.tipo, []).append(evento)
+    for tipo, grupo in por_tipo.items():
+        _procesar(tipo, grupo, max_intentos)
+    return len(ids)
+
+
+def pendientes():
+    """(pendientes, muertos) en el outbox."""
+    filas = dict(db.session.execute(select(Evento.muerto, func.count()).group_by(Evento.muerto)).all())
+    return filas.get(False, 0), filas.get(True, 0)
+
+
+class Despachador:
+    """
+    Hilos que vacían el outbox en segundo plano. Cada hilo reclama un lote
+    solo cuando terminó el anterior, así que un pico de ventas se acumula en
+    la tabla y no en memoria (contrapresión). Se despiertan al hacer commit
+    de una transacción que publicó eventos y, si no, cada `intervalo` s.
+    Los hilos se inician en el proceso que publica (después del fork de
+    gunicorn), con el primer evento; los que quedaron pendientes de otro
+    proceso se retoman en ese momento o con `flask heladeria eventos`.
+    """
+
+    def __init__(self, app, hilos=1, lote=100, intervalo=1.0, max_intentos=5, plazo=60):
+        self.app = app
+        self.hilos = hilos
+        self.lote = lote
+        self.intervalo = intervalo
+        self.max_intentos = max_intentos
+        self.plazo = plazo
+        self._pid = None
+        self._aviso = threading.Event()
+        self._detenido = threading.Event()
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        if self.hilos <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._detenido.clear()
+            for i in range(self.hilos):
+                threading.Thread(target=self._bucle, name=f'eventos-{i}', daemon=True).start()
+
+    def despertar(self):
+        self.iniciar()
+        self._aviso.set()
+
+    def detener(self):
+        self._detenido.set()
+        self._aviso.set()
+        self._pid = None
+
+    def _bucle(self):
+        while not self._detenido.is_set():
+            try:
+                with self.app.app_context():
+                    reclamados = procesar_lote(self.lote, self.max_intentos, self.plazo)
+            except Exception:
+                logger.exception('Error al vaciar el outbox')
+                reclamados = 0
+            if reclamados < self.lote:
+                # Outbox vacío (o casi): esperar un aviso o el intervalo
+                self._aviso.wait(self.intervalo)
+                self._aviso.clear()
+
+
+def init_eventos(app):
+    """Crea el despachador del outbox (EVENTOS_HILOS=0 lo desactiva; ver `flask heladeria eventos`)."""
+    app.extensions['heladeria_eventos'] = Despachador(
+        app,
+        hilos=int(app.config.get('EVENTOS_HILOS', 1)),
+        lote=int(app.config.get('EVENTOS_LOTE', 100)),
+        intervalo=float(app.config.get('EVENTOS_INTERVALO', 1.0)),
+        max_intentos=int(app.config.get('EVENTOS_MAX_INTENTOS', 5)),
+    )
+
+
+# *** AVISO AL DESPACHADOR ***
+
+@event.listens_for(db.session, 'after_commit')
+def _avisar_despachador(session):
+    if session.info.pop('eventos_publicados', False) and has_app_context():
+        despachador = current_app.extensions.get('heladeria_eventos')
+        if despachador is not None:
+            despachador.despertar()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_aviso(session):
+    session.info.pop('eventos_publicados', None)
@@ -0,0 +1,309 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from sqlalchemy import bindparam, func, select, update
+from werkzeug.security import generate_password_hash
+from database import db
+from models.ingrediente import Ingrediente
+from models.producto import Producto
+from models.receta import Receta
+from models.usuario import Usuario
+from services import metricas
+from services.cache import invalidar_catalogo
+from services.consultas import insert_o_actualizar
+from services.contrasenas import obtener_contrasenas
+
+# Filas por INSERT (y por commit)
+TAMANO_LOTE = 1000
+
+# Orden de escritura: las recetas referencian productos e ingredientes
+ENTIDADES = ('usuario', 'ingrediente', 'producto', 'receta')
+
+REQUERIDO = object()
+
+
+class FilaInvalida(Exception):
+    """La fila no se puede importar; el mensaje indica por qué."""
+
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() in ('1', 'true', 'si', 'sí', 's', 'yes', 'y', 't')
+
+
+# Columnas de cada entidad: nombre -> (conversión, valor por defecto). El
+# valor por defecto solo se usa al crear la fila: al actualizar una existente,
+# una columna ausente conserva lo que ya tenía
+COLUMNAS = {
+    'usuario': {
+        'username': (str, REQUERIDO), 'password': (str, REQUERIDO),
+        'es_admin': (_booleano, False), 'es_empleado': (_booleano, False), 'es_cliente': (_booleano, False),
+    },
+    'ingrediente': {
+        'nombre': (str, REQUERIDO), 'precio': (float, REQUERIDO), 'calorias': (float, REQUERIDO),
+        'inventario': (int, 0), 'es_vegetariano': (_booleano, False), 'tipo': (str, 'ingrediente'), 'sabor': (str, None),
+    },
+    'producto': {
+        'nombre': (str, REQUERIDO), 'precio_publico': (float, REQUERIDO),
+        'calorias_totales': (float, None), 'costo_produccion': (float, None),
+    },
+    'receta': {
+        'producto': (str, REQUERIDO), 'ingrediente': (str, REQUERIDO), 'cantidad': (int, REQUERIDO),
+    },
+}
+
+
+def defectos(entidad):
+    """Valores por defecto de las columnas opcionales de una entidad, para las filas nuevas."""
+    return {c: d for c, (_, d) in COLUMNAS[entidad].items() if d is not REQUERIDO and d is not None}
+
+
+def normalizar(fila, entidad_defecto=None):
+    """
+    Valida y convierte una fila (de CSV, todo texto; de JSONL, ya tipada).
+    Las celdas vacías cuentan como ausentes y quedan en None (ver defectos()).
+    Devuelve (entidad, valores).
+    """
+    if not isinstance(fila, dict):
+        raise FilaInvalida('Se esperaba un objeto')
+    entidad = fila.get('entidad') or entidad_defecto
+    if entidad not in COLUMNAS:
+        raise FilaInvalida(f'Entidad desconocida: {entidad}')
+
+    valores = {}
+    for columna, (convertir, defecto) in COLUMNAS[entidad].items():
+        valor = fila.get(columna)
+        if valor is None or valor == '':
+            if defecto is REQUERIDO:
+                raise FilaInvalida(f'Falta {columna}')
+            valores[columna] = None
+            continue
+        try:
+            valores[columna] = convertir(valor)
+        except (TypeError, ValueError):
+            raise FilaInvalida(f'Valor inválido para {columna}: {valor!r}')
+
+    if entidad == 'ingrediente' and valores['tipo'] not in (None, *Ingrediente.__mapper__.polymorphic_map):
+        raise FilaInvalida(f'Tipo de ingrediente desconocido: {valores["tipo"]}')
+    if entidad == 'receta' and valores['cantidad'] < 1:
+        raise FilaInvalida('cantidad debe ser un entero positivo')
+    return entidad, valores
+
+
+def leer_filas(archivo, formato):
+    """
+    Recorre un archivo CSV o JSONL sin cargarlo entero y produce
+    (número de línea, fila). Una línea JSON ilegible se produce como FilaInvalida.
+    """
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        for fila in lector:
+            yield lector.line_num, fila
+    elif formato == 'jsonl':
+        for numero, linea in enumerate(archivo, 1):
+            if not linea.strip():
+                continue
+            try:
+                yield numero, json.loads(linea)
+            except json.JSONDecodeError as e:
+                yield numero, FilaInvalida(f'JSON inválido: {e.msg}')
+    else:
+        raise ValueError(f'Formato desconocido: {formato}')
+
+
+def upsert(modelo, filas, claves, actualizar, defectos=None):
+    """
+    INSERT en bloque que, si la clave ya existe, actualiza las columnas de
+    `actualizar` (ON CONFLICT en SQLite/PostgreSQL, ON DUPLICATE KEY en MySQL).
+    Un valor nulo conserva el actual. Con `actualizar` vacío las filas
+    existentes no se modifican. `defectos` ({columna: valor}) reemplaza los
+    nulos solo en las filas que se insertan.
+    """
+    defectos = defectos or {}
+    stmt = insert_o_actualizar(
+        modelo, claves, actualizar,
+        # Con defecto, el valor insertado ya no es nulo: se compara el parámetro recibido
+        lambda actual, nueva: func.coalesce(bindparam(actual.key) if actual.key in defectos else nueva, actual))
+    if defectos:
+        tabla = modelo.__table__
+        stmt = stmt.values({c: func.coalesce(bindparam(c, type_=tabla.c[c].type), d) for c, d in defectos.items()})
+    # Una clave repetida dentro del mismo lote: gana la última fila
+    unicas = {tuple(f[c] for c in claves): f for f in filas}
+    db.session.execute(stmt, list(unicas.values()))
+
+
+def _ids_por_nombre(modelo, columna, nombres):
+    columna = getattr(modelo, columna)
+    return dict(db.session.execute(select(columna, modelo.id).where(columna.in_(set(nombres)))).all())
+
+
+class Importador:
+    """
+    Acumula filas por entidad y las escribe en lotes de `tamano_lote`, un
+    commit por lote, de modo que la memoria no depende del tamaño del archivo
+    y volver a ejecutar la importación es seguro. Las contraseñas de los
+    usuarios nuevos se hashean en un pool de `procesos` procesos.
+    """
+
+    def __init__(self, tamano_lote=TAMANO_LOTE, procesos=None, solo_nuevos=False, progreso=None):
+        self.tamano_lote = tamano_lote
+        self.procesos = (os.cpu_count() or 1) if procesos is None else procesos
+        self.solo_nuevos = solo_nuevos
+        self.progreso = progreso
+        self.pendientes = {e: [] for e in ENTIDADES}
+        self.importadas = dict.fromkeys(ENTIDADES, 0)
+        self.errores = []
+        self.productos_afectados = set()
+        self.inicio = time.perf_counter()
+        self._pool = None
+
+    @property
+    def total(self):
+        return sum(self.importadas.values())
+
+    def agregar(self, numero, fila, entidad=None):
+        try:
+            if isinstance(fila, FilaInvalida):
+                raise fila
+            entidad, valores = normalizar(fila, entidad)
+        except FilaInvalida as e:
+            self.errores.append((numero, str(e)))
+            return
+        self.pendientes[entidad].append((numero, valores))
+        if len(self.pendientes[entidad]) >= self.tamano_lote:
+            self._escribir(entidad)
+
+    def terminar(self):
+        """Escribe lo pendiente, recalcula las métricas afectadas y devuelve el resumen."""
+        try:
+            for entidad in ENTIDADES:
+                self._escribir(entidad)
+            afectados = sorted(self.productos_afectados)
+            for i in range(0, len(afectados), self.tamano_lote):
+                metricas.recalcular_productos(afectados[i:i + self.tamano_lote])
+                db.session.commit()
+            if self.total:
+                invalidar_catalogo()
+        finally:
+            self.cerrar()
+
+        segundos = time.perf_counter() - self.inicio
+        return {
+            'filas': self.total,
+            'por_entidad': dict(self.importadas),
+            'errores': self.errores,
+            'segundos': segundos,
+            'filas_por_segundo': self.total / segundos if segundos else 0.0,
+        }
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _escribir(self, entidad):
+        lote = self.pendientes[entidad]
+        if not lote:
+            return
+        if entidad == 'receta':
+            # Las recetas se resuelven por nombre: primero se escribe lo que referencian
+            self._escribir('ingrediente')
+            self._escribir('producto')
+        self.pendientes[entidad] = []
+
+        try:
+            escritas = getattr(self, f'_escribir_{entidad}')(lote)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.importadas[entidad] += escritas
+        if self.progreso:
+            self.progreso(self)
+
+    def _hashear(self, passwords):
+        # Mismo método que el login (PASSWORD_HASH_METODO): no habrá que rehashear al entrar
+        hashear = partial(generate_password_hash, method=obtener_contrasenas().metodo)
+        if self.procesos <= 1 or len(passwords) < 2:
+            return [hashear(p) for p in passwords]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.procesos)
+        return list(self._pool.map(hashear, passwords, chunksize=max(1, len(passwords) // (self.procesos * 4))))
+
+    def _escribir_usuario(self, lote):
+        filas = {v['username']: v for _, v in lote}
+        existentes = set(db.session.execute(
+            select(Usuario.username).where(Usuario.username.in_(filas))).scalars())
+
+        # Solo se hashean las contraseñas de usuarios nuevos: reimportar no cuesta hashes
+        nuevos = [v for u, v in filas.items() if u not in existentes]
+        for fila, hash_ in zip(nuevos, self._hashear([v['password'] for v in nuevos])):
+            fila['password'] = hash_
+        if nuevos:
+            upsert(Usuario, nuevos, ['username'], [], defectos('usuario'))
+
+        if existentes and not self.solo_nuevos:
+            tabla = Usuario.__table__
+            # Un rol ausente en la fila conserva el actual
+            db.session.execute(
+                update(tabla).where(tabla.c.username == bindparam('u'))
+                .values(es_admin=func.coalesce(bindparam('a'), tabla.c.es_admin),
+                        es_empleado=func.coalesce(bindparam('e'), tabla.c.es_empleado),
+                        es_cliente=func.coalesce(bindparam('c'), tabla.c.es_cliente)),
+                [{'u': u, 'a': filas[u]['es_admin'], 'e': filas[u]['es_empleado'], 'c': filas[u]['es_cliente']}
+                 for u in existentes])
+        return len(filas)
+
+    def _escribir_ingrediente(self, lote):
+        filas = [v for _, v in lote]
+        actualizar = [] if self.solo_nuevos else ['precio', 'calorias', 'inventario', 'es_vegetariano', 'tipo', 'sabor']
+        upsert(Ingrediente, filas, ['nombre'], actualizar, defectos('ingrediente'))
+        if not self.solo_nuevos:
+            ids = _ids_por_nombre(Ingrediente, 'nombre', (f['nombre'] for f in filas))
+            self.productos_afectados |= metricas.productos_afectados(list(ids.values()))
+        return len(filas)
+
+    def _escribir_producto(self, lote):
+        filas = [dict(v, rentabilidad=0.0) for _, v in lote]
+        # rentabilidad es el acumulado de ventas: nunca se sobrescribe
+        actualizar = [] if self.solo_nuevos else ['precio_publico', 'calorias_totales', 'costo_produccion']
+        upsert(Producto, filas, ['nombre'], actualizar)
+        self.productos_afectados |= set(_ids_por_nombre(Producto, 'nombre', (f['nombre'] for f in filas)).values())
+        return len(filas)
+
+    def _escribir_receta(self, lote):
+        productos = _ids_por_nombre(Producto, 'nombre', (v['producto'] for _, v in lote))
+        ingredientes = _ids_por_nombre(Ingrediente, 'nombre', (v['ingrediente'] for _, v in lote))
+
+        filas = []
+        for numero, v in lote:
+            if v['producto'] not in productos:
+                self.errores.append((numero, f'Producto no encontrado: {v["producto"]}'))
+            elif v['ingrediente'] not in ingredientes:
+                self.errores.append((numero, f'Ingrediente no encontrado: {v["ingrediente"]}'))
+            else:
+                filas.append({'producto_id': productos[v['producto']],
+                              'ingrediente_id': ingredientes[v['ingrediente']], 'cantidad': v['cantidad']})
+        if filas:
+            upsert(Receta, filas, ['producto_id', 'ingrediente_id'], [] if self.solo_nuevos else ['cantidad'])
+            self.productos_afectados |= {f['producto_id'] for f in filas}
+        return len(filas)
+
+
+def importar(filas, entidad=None, **opciones):
+    """
+    Importa un iterable de (número de línea, fila) con un Importador y
+    devuelve su resumen (filas, por_entidad, errores, segundos, filas_por_segundo).
+    """
+    importador = Importador(**opciones)
+    try:
+        for numero, fila in filas:
+            importador.agregar(numero, fila, entidad)
+    except BaseException:
+        importador.cerrar()
+        raise
+    return importador.terminar()
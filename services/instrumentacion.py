@@ -0,0 +1,358 @@
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager, suppress
+from flask import Response, current_app, g, has_app_context, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from database import db
+
+# Límites de los histogramas (segundos y número de consultas)
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    """Histograma acumulativo con etiquetas, en el formato de Prometheus."""
+
+    def __init__(self, nombre, ayuda, etiquetas, buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def estado(self):
+        with self._lock:
+            return [[list(map(str, k)), [[*v[0]], v[1], v[2]]] for k, v in self._series.items()]
+
+    @staticmethod
+    def _sumar(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def exponer(self, *otros):
+        """Formato de Prometheus; `otros` son estados de otros procesos que se suman a este."""
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        for etiquetas, (conteos, suma, total) in _combinar([self.estado(), *otros], self._sumar):
+            base = _etiquetas(self.etiquetas, etiquetas)
+            for limite, conteo in zip(self.buckets, conteos):
+                lineas.append(f'{self.nombre}_bucket{{{base}{"," if base else ""}le="{limite}"}} {conteo}')
+            lineas.append(f'{self.nombre}_bucket{{{base}{"," if base else ""}le="+Inf"}} {total}')
+            lineas.append(f'{self.nombre}_sum{{{base}}} {suma}')
+            lineas.append(f'{self.nombre}_count{{{base}}} {total}')
+        return lineas
+
+
+class Contador:
+    """Contador con etiquetas, en el formato de Prometheus."""
+
+    def __init__(self, nombre, ayuda, etiquetas):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *etiquetas, valor=1):
+        with self._lock:
+            self._series[etiquetas] = self._series.get(etiquetas, 0) + valor
+
+    def estado(self):
+        with self._lock:
+            return [[list(map(str, k)), v] for k, v in self._series.items()]
+
+    def exponer(self, *otros):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} counter']
+        series = _combinar([self.estado(), *otros], lambda a, b: a + b)
+        lineas += [f'{self.nombre}{{{_etiquetas(self.etiquetas, k)}}} {v}' for k, v in series]
+        return lineas
+
+
+def _combinar(estados, sumar):
+    """Suma por etiquetas las series de varios estados (ver estado())."""
+    series = {}
+    for estado in estados:
+        for etiquetas, valor in estado:
+            etiquetas = tuple(etiquetas)
+            series[etiquetas] = sumar(series[etiquetas], valor) if etiquetas in series else valor
+    return sorted(series.items())
+
+
+def _etiquetas(nombres, valores):
+    return ','.join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores))
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class PerfilesLentos:
+    """
+    Perfilado por muestreo: una fracción de las solicitudes se ejecuta bajo
+    cProfile y se guardan en disco (.prof) solo las `maximo` más lentas.
+    Se perfila una solicitud a la vez, porque cProfile no admite perfiles
+    simultáneos.
+    """
+
+    def __init__(self, directorio, muestreo, maximo=20):
+        self.directorio = directorio
+        self.muestreo = muestreo
+        self.maximo = maximo
+        self._activo = threading.Lock()
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    def iniciar(self):
+        if random.random() >= self.muestreo or not self._activo.acquire(blocking=False):
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro perfilador (por ejemplo, un depurador) ya está activo
+            self._activo.release()
+            return None
+        return perfil
+
+    def descartar(self, perfil):
+        perfil.disable()
+        self._activo.release()
+
+    def terminar(self, perfil, duracion, endpoint):
+        self.descartar(perfil)
+        with self._lock:
+            guardados = self.guardados()
+            if len(guardados) >= self.maximo and duracion <= guardados[-1][0]:
+                return
+            nombre = f'{duracion * 1000:010.1f}ms_{re.sub(r"[^A-Za-z0-9_.-]", "_", endpoint)}_{time.time_ns()}.prof'
+            perfil.dump_stats(os.path.join(self.directorio, nombre))
+            for _, archivo in self.guardados()[self.maximo:]:
+                # Otro worker que comparte el directorio puede haberlo borrado ya
+                with suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directorio, archivo))
+
+    def guardados(self):
+        """(duración, archivo) de los perfiles guardados, del más lento al más rápido."""
+        guardados = []
+        for archivo in os.listdir(self.directorio):
+            if not archivo.endswith('.prof'):
+                continue
+            try:
+                guardados.append((float(archivo.split('ms_', 1)[0]) / 1000, archivo))
+            except ValueError:
+                # Un .prof que no guardó PerfilesLentos: no cuenta ni se borra
+                continue
+        return sorted(guardados, reverse=True)
+
+
+class Instrumentacion:
+    """
+    Métricas de la aplicación; una instancia por app y por proceso. Con
+    `directorio`, cada proceso vuelca sus métricas allí (a lo sumo una vez por
+    `intervalo` segundos, al terminar una solicitud) y /metrics suma las de
+    todos los workers, así que el scrape no depende del worker que lo atienda.
+    """
+
+    def __init__(self, perfiles=None, directorio=None, intervalo=1.0):
+        self.solicitudes = Contador(
+            'heladeria_requests_total', 'Solicitudes atendidas.', ('endpoint', 'method', 'status'))
+        self.latencia = Histograma(
+            'heladeria_request_duration_seconds', 'Latencia de las solicitudes por endpoint.', ('endpoint', 'method'))
+        self.consultas = Histograma(
+            'heladeria_sql_queries_per_request', 'Consultas SQL por solicitud.', ('endpoint',), BUCKETS_CONSULTAS)
+        self.tiempo_sql = Histograma(
+            'heladeria_sql_duration_seconds', 'Tiempo total en SQL por solicitud.', ('endpoint',))
+        self.jwt = Histograma(
+            'heladeria_jwt_decode_seconds', 'Tiempo de verificación de JWT (sin caché).', ())
+        self.plantillas = Histograma(
+            'heladeria_template_render_seconds', 'Tiempo de renderizado por plantilla.', ('template',))
+        self.perfiles = perfiles
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self._volcado = None
+        self._volcando = threading.Lock()
+        self._archivo = None
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    @property
+    def metricas(self):
+        return self.solicitudes, self.latencia, self.consultas, self.tiempo_sql, self.jwt, self.plantillas
+
+    def _ruta(self):
+        # Se calcula en el proceso que vuelca (la app puede crearse antes del
+        # fork); el instante de arranque evita pisar el archivo de un worker
+        # ya terminado que tuvo el mismo pid
+        if self._archivo is None or self._archivo[0] != os.getpid():
+            self._archivo = (os.getpid(), os.path.join(self.directorio, f'{os.getpid()}_{time.time_ns()}.json'))
+        return self._archivo[1]
+
+    def volcar(self, forzar=False):
+        """Guarda las métricas de este proceso en el directorio compartido."""
+        if not self.directorio:
+            return
+        ahora = time.monotonic()
+        if not forzar and self._volcado is not None and ahora - self._volcado < self.intervalo:
+            return
+        if not self._volcando.acquire(blocking=False):
+            return
+        try:
+            ruta = self._ruta()
+            with open(ruta + '.tmp', 'w') as f:
+                json.dump({m.nombre: m.estado() for m in self.metricas}, f)
+            os.replace(ruta + '.tmp', ruta)
+            self._volcado = ahora
+        finally:
+            self._volcando.release()
+
+    def otros_procesos(self):
+        """Métricas volcadas por los demás procesos (incluidos los que ya terminaron)."""
+        if not self.directorio:
+            return []
+        propio = self._ruta()
+        estados = []
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            if not nombre.endswith('.json') or ruta == propio:
+                continue
+            try:
+                with open(ruta) as f:
+                    estados.append(json.load(f))
+            except (OSError, ValueError):
+                # Borrado entre listdir y open, o ajeno al formato
+                continue
+        return estados
+
+    def exponer(self):
+        otros = self.otros_procesos()
+        lineas = []
+        for metrica in self.metricas:
+            lineas += metrica.exponer(*(estado.get(metrica.nombre, []) for estado in otros))
+        return '\n'.join(lineas) + '\n'
+
+
+def obtener_instrumentacion():
+    """Instrumentación de la app actual, o None si está desactivada."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('heladeria_instrumentacion')
+
+
+@contextmanager
+def medir_jwt():
+    """Mide la verificación de un JWT; no hace nada si la instrumentación está desactivada."""
+    instrumentacion = obtener_instrumentacion()
+    if instrumentacion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        instrumentacion.jwt.observar(time.perf_counter() - inicio)
+
+
+def init_instrumentacion(app):
+    """
+    Activa la instrumentación (INSTRUMENTACION=1): latencia por endpoint,
+    consultas y tiempo SQL por solicitud, verificación de JWT y renderizado de
+    plantillas, expuestos en /metrics. Con METRICAS_DIRECTORIO las métricas
+    se suman entre todos los workers que lo comparten. Con PERFIL_MUESTREO > 0
+    además se perfila esa fracción de solicitudes y se guardan las más lentas.
+    """
+    perfiles = None
+    if float(app.config.get('PERFIL_MUESTREO') or 0) > 0:
+        directorio = app.config.get('PERFIL_DIRECTORIO') or os.path.join(app.instance_path, 'perfiles')
+        perfiles = PerfilesLentos(directorio, float(app.config['PERFIL_MUESTREO']),
+                                  int(app.config.get('PERFIL_MAXIMO', 20)))
+    instrumentacion = app.extensions['heladeria_instrumentacion'] = Instrumentacion(
+        perfiles, app.config.get('METRICAS_DIRECTORIO'), float(app.config.get('METRICAS_INTERVALO', 1.0)))
+
+    @app.before_request
+    def _iniciar_medicion():
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_sql = [0, 0.0]
+        g.metricas_perfil = perfiles.iniciar() if perfiles else None
+
+    @app.after_request
+    def _registrar_medicion(response):
+        if 'metricas_inicio' not in g:
+            return response
+        duracion = time.perf_counter() - g.pop('metricas_inicio')
+        endpoint = request.endpoint or 'sin_ruta'
+        consultas, tiempo_sql = g.pop('metricas_sql')
+        instrumentacion.solicitudes.incrementar(endpoint, request.method, response.status_code)
+        instrumentacion.latencia.observar(duracion, endpoint, request.method)
+        instrumentacion.consultas.observar(consultas, endpoint)
+        instrumentacion.tiempo_sql.observar(tiempo_sql, endpoint)
+        perfil = g.pop('metricas_perfil', None)
+        if perfil is not None:
+            perfiles.terminar(perfil, duracion, endpoint)
+        instrumentacion.volcar()
+        return response
+
+    @app.teardown_request
+    def _liberar_perfil(exc):
+        # Si la vista falló, after_request no corre: el perfil se descarta
+        perfil = g.pop('metricas_perfil', None)
+        if perfil is not None:
+            perfiles.descartar(perfil)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metricas_sql' in g:
+            conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('metricas_inicio')
+        if inicios and has_request_context() and 'metricas_sql' in g:
+            g.metricas_sql[0] += 1
+            g.metricas_sql[1] += time.perf_counter() - inicios.pop()
+
+    @event.listens_for(engine, 'handle_error')
+    def _consulta_fallida(contexto):
+        # after_cursor_execute no corre si la sentencia falla: se descarta su inicio
+        inicios = contexto.connection.info.get('metricas_inicio') if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
+
+    def _antes_de_renderizar(sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault('metricas_plantillas', []).append(time.perf_counter())
+
+    def _renderizado(sender, template, context, **extra):
+        inicios = g.get('metricas_plantillas') if has_request_context() else None
+        if inicios:
+            instrumentacion.plantillas.observar(time.perf_counter() - inicios.pop(), template.name or 'anonima')
+
+    before_render_template.connect(_antes_de_renderizar, app)
+    template_rendered.connect(_renderizado, app)
+    # Las señales guardan referencias débiles: se conservan con la app
+    app.extensions['heladeria_instrumentacion_senales'] = (_antes_de_renderizar, _renderizado)
+
+    def metricas():
+        token = app.config.get('METRICAS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('No autorizado\n', 401, mimetype='text/plain')
+        return Response(instrumentacion.exponer(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metricas', metricas)
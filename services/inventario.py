@@ -0,0 +1,331 @@
+import datetime
+import logging
+import math
+from sqlalchemy import update, select, func, case
+from database import db
+from models.ingrediente import Ingrediente
+from models.complemento import Complemento
+from models.producto import Producto
+from models.receta import Receta
+from models.venta import Venta
+from services.eventos import publicar, suscriptor
+from services.ventas import ProductoNoEncontrado, _entero_positivo
+
+logger = logging.getLogger(__name__)
+
+# Máximo de líneas aceptadas en un reabastecimiento o una renovación por lote
+MAX_LINEAS_REABASTECIMIENTO = 1000
+
+
+class TipoInvalido(Exception):
+    """El tipo de ingrediente pedido no existe."""
+
+
+def modelo_de_tipo(tipo):
+    """
+    Clase mapeada para un valor del discriminador `tipo` ('ingrediente',
+    'base', 'complemento'). Lanza TipoInvalido si no existe.
+    """
+    mapper = Ingrediente.__mapper__.polymorphic_map.get(tipo)
+    if mapper is None:
+        raise TipoInvalido(f'Tipo de ingrediente desconocido: {tipo}')
+    return mapper.class_
+
+
+class ReabastecimientoInvalido(Exception):
+    """Alguna línea del reabastecimiento no es válida; `lineas` trae el resultado de cada una."""
+
+    def __init__(self, lineas):
+        super().__init__('Reabastecimiento inválido')
+        self.lineas = lineas
+
+
+class RenovacionInvalida(Exception):
+    """Alguna línea de la renovación no es válida; `lineas` trae el resultado de cada una."""
+
+    def __init__(self, lineas):
+        super().__init__('Renovación inválida')
+        self.lineas = lineas
+
+
+def reabastecer_ingredientes(items):
+    """
+    Reabastece varios ingredientes en una sola transacción.
+    `items` es una lista de diccionarios {id, cantidad}; si se omite `cantidad`
+    se usa la cantidad por defecto del tipo de ingrediente (CANTIDAD_ABASTECER:
+    5 para Base, 10 para Complemento). Todas las filas se actualizan con un
+    único UPDATE ... CASE y los niveles nuevos se leen con una sola consulta.
+    Si alguna línea es inválida no se aplica ninguna y se lanza
+    ReabastecimientoInvalido.
+    Devuelve una línea {id, nombre, cantidad, inventario} por ingrediente.
+    """
+    if not isinstance(items, list) or not items or len(items) > MAX_LINEAS_REABASTECIMIENTO:
+        raise ReabastecimientoInvalido([{'error': f'Se esperaba una lista de 1 a {MAX_LINEAS_REABASTECIMIENTO} líneas'}])
+
+    lineas = []
+    for item in items:
+        ingrediente_id = item.get('id') if isinstance(item, dict) else None
+        cantidad = item.get('cantidad') if isinstance(item, dict) else None
+        if not _entero_positivo(ingrediente_id) or not (cantidad is None or _entero_positivo(cantidad)):
+            lineas.append({'id': ingrediente_id, 'cantidad': cantidad,
+                           'error': 'id y cantidad deben ser enteros positivos'})
+        else:
+            lineas.append({'id': ingrediente_id, 'cantidad': cantidad})
+
+    # Una sola consulta IN sobre (id, tipo): confirma que existen y resuelve su clase
+    ids = {l['id'] for l in lineas if 'error' not in l}
+    tipos = dict(db.session.execute(
+        select(Ingrediente.id, Ingrediente.tipo).where(Ingrediente.id.in_(ids))
+    ).all()) if ids else {}
+
+    for linea in lineas:
+        if 'error' in linea:
+            continue
+        tipo = tipos.get(linea['id'])
+        if tipo is None:
+            linea['error'] = 'Ingrediente no encontrado'
+        elif linea['cantidad'] is None:
+            linea['cantidad'] = modelo_de_tipo(tipo).CANTIDAD_ABASTECER
+            if linea['cantidad'] is None:
+                linea['error'] = 'cantidad requerida para este tipo de ingrediente'
+    if any('error' in l for l in lineas):
+        db.session.rollback()
+        raise ReabastecimientoInvalido(lineas)
+
+    cantidades = {}
+    for linea in lineas:
+        cantidades[linea['id']] = cantidades.get(linea['id'], 0) + linea['cantidad']
+
+    try:
+        db.session.execute(
+            update(Ingrediente)
+            .where(Ingrediente.id.in_(cantidades))
+            .values(inventario=func.coalesce(Ingrediente.inventario, 0) + case(cantidades, value=Ingrediente.id))
+            .execution_options(synchronize_session=False)
+        )
+        niveles = {
+            fila.id: fila for fila in db.session.execute(
+                select(Ingrediente.id, Ingrediente.nombre, Ingrediente.inventario).where(Ingrediente.id.in_(cantidades))
+            )
+        }
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return [{'id': i, 'nombre': niveles[i].nombre, 'cantidad': c, 'inventario': niveles[i].inventario}
+            for i, c in cantidades.items()]
+
+
+def reabastecer_por_tipo(tipo, cantidad=None):
+    """
+    Reabastece todos los ingredientes de un tipo con un único UPDATE filtrado
+    por el discriminador indexado, sin cargar las filas. Sin `cantidad` se usa
+    la cantidad por defecto del tipo. Devuelve el número de ingredientes
+    reabastecidos.
+    """
+    modelo = modelo_de_tipo(tipo)
+    cantidad = modelo.CANTIDAD_ABASTECER if cantidad is None else cantidad
+    if not _entero_positivo(cantidad):
+        raise ReabastecimientoInvalido([{'tipo': tipo, 'cantidad': cantidad,
+                                         'error': 'cantidad debe ser un entero positivo'}])
+
+    # El UPDATE sobre una subclase agrega por sí mismo WHERE tipo IN (...);
+    # sobre Ingrediente no filtra nada, así que el tipo se pide explícitamente
+    consulta = update(modelo)
+    if modelo is Ingrediente:
+        consulta = consulta.where(Ingrediente.tipo == tipo)
+    resultado = db.session.execute(
+        consulta
+        .values(inventario=func.coalesce(modelo.inventario, 0) + cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return resultado.rowcount
+
+
+def renovar_complementos():
+    """
+    Renueva (deja en 0) el inventario de todos los complementos con un único
+    UPDATE. Devuelve el número de complementos renovados.
+    """
+    resultado = db.session.execute(
+        update(Complemento).values(inventario=0).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return resultado.rowcount
+
+
+# *** PRODUCTOS TERMINADOS ***
+
+def reabastecer_producto(producto_id, cantidad):
+    """
+    Suma `cantidad` unidades al stock de un producto con un UPDATE atómico
+    (col = col + :n); un producto sin stock registrado empieza a llevarlo
+    desde 0. Devuelve (nombre, inventario) después del cambio.
+    """
+    if not _entero_positivo(cantidad):
+        raise ReabastecimientoInvalido([{'id': producto_id, 'cantidad': cantidad,
+                                         'error': 'cantidad debe ser un entero positivo'}])
+    try:
+        resultado = db.session.execute(
+            update(Producto)
+            .where(Producto.id == producto_id)
+            .values(inventario=func.coalesce(Producto.inventario, 0) + cantidad)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount == 0:
+            raise ProductoNoEncontrado(producto_id)
+        fila = db.session.execute(
+            select(Producto.nombre, Producto.inventario).where(Producto.id == producto_id)
+        ).one()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return fila
+
+
+def renovar_productos(cantidades):
+    """
+    Fija el stock de varios productos con un único UPDATE ... CASE.
+    `cantidades` es {producto_id: nueva cantidad}; None deja de llevar el
+    stock del producto. Si algún producto no existe no se aplica ningún
+    cambio y se lanza ProductoNoEncontrado con los IDs faltantes. Devuelve
+    el número de productos renovados.
+    """
+    if not cantidades:
+        return 0
+    try:
+        resultado = db.session.execute(
+            update(Producto)
+            .where(Producto.id.in_(cantidades))
+            .values(inventario=case(cantidades, value=Producto.id))
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount != len(cantidades):
+            db.session.rollback()
+            existentes = set(db.session.execute(select(Producto.id).where(Producto.id.in_(cantidades))).scalars())
+            raise ProductoNoEncontrado(sorted(set(cantidades) - existentes))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return resultado.rowcount
+
+
+def validar_renovacion(items):
+    """
+    Valida el cuerpo de una renovación por lote (lista de {id, nueva_cantidad})
+    y devuelve {producto_id: nueva cantidad}. Lanza RenovacionInvalida.
+    """
+    if not isinstance(items, list) or not items or len(items) > MAX_LINEAS_REABASTECIMIENTO:
+        raise RenovacionInvalida([{'error': f'Se esperaba una lista de 1 a {MAX_LINEAS_REABASTECIMIENTO} líneas'}])
+    lineas = []
+    for item in items:
+        producto_id = item.get('id') if isinstance(item, dict) else None
+        nueva = item.get('nueva_cantidad') if isinstance(item, dict) else None
+        linea = {'id': producto_id, 'nueva_cantidad': nueva}
+        if not _entero_positivo(producto_id) or not (nueva is None or _entero_positivo(nueva, minimo=0)):
+            linea['error'] = 'id debe ser un entero y nueva_cantidad un entero no negativo (o null)'
+        lineas.append(linea)
+    if any('error' in l for l in lineas):
+        raise RenovacionInvalida(lineas)
+    # Si un producto se repite, vale la última línea
+    return {l['id']: l['nueva_cantidad'] for l in lineas}
+
+
+# *** ALERTAS DE STOCK Y REPOSICIÓN ***
+
+def _umbral(ingrediente):
+    return ingrediente.punto_reorden if ingrediente.punto_reorden is not None else ingrediente.stock_minimo
+
+
+def ingredientes_bajo_stock():
+    """
+    Ingredientes que llegaron a su punto de reorden (o a su stock mínimo).
+    Lee solo esas filas por el índice de la columna calculada bajo_stock.
+    """
+    return [dict(fila._mapping) for fila in db.session.execute(
+        select(Ingrediente.id, Ingrediente.nombre, Ingrediente.tipo, Ingrediente.inventario,
+               Ingrediente.stock_minimo, Ingrediente.punto_reorden)
+        .where(Ingrediente.bajo_stock)
+        .order_by(Ingrediente.id)
+    )]
+
+
+@suscriptor('venta_registrada')
+def alertar_bajo_stock(eventos):
+    """
+    Avisa (log y evento 'stock_bajo') de los ingredientes que cruzaron su
+    umbral con estas ventas: los que ahora están bajo stock y lo estaban por
+    encima antes de descontar lo vendido. Solo lee los ingredientes de las
+    recetas vendidas que están en bajo_stock.
+    """
+    vendidos = {}
+    for evento in eventos:
+        for linea in evento['lineas']:
+            vendidos[linea['producto_id']] = vendidos.get(linea['producto_id'], 0) + linea['cantidad']
+    if not vendidos:
+        return
+
+    ingredientes, consumo = {}, {}
+    for fila in db.session.execute(
+        select(Ingrediente.id, Ingrediente.nombre, Ingrediente.inventario, Ingrediente.stock_minimo,
+               Ingrediente.punto_reorden, Receta.producto_id, Receta.cantidad)
+        .join(Receta, Receta.ingrediente_id == Ingrediente.id)
+        .where(Receta.producto_id.in_(vendidos), Ingrediente.bajo_stock)
+    ):
+        ingredientes[fila.id] = fila
+        consumo[fila.id] = consumo.get(fila.id, 0) + fila.cantidad * vendidos[fila.producto_id]
+
+    cruzados = [
+        {'id': i.id, 'nombre': i.nombre, 'inventario': i.inventario, 'umbral': _umbral(i)}
+        for i in ingredientes.values()
+        if (i.inventario or 0) + consumo[i.id] > _umbral(i)
+    ]
+    for ingrediente in cruzados:
+        logger.warning('Stock bajo: %s (%s, umbral %s)', ingrediente['nombre'],
+                       ingrediente['inventario'], ingrediente['umbral'])
+    if cruzados:
+        publicar('stock_bajo', ingredientes=cruzados)
+
+
+def sugerir_reposicion(dias_historial=14, dias_cobertura=7):
+    """
+    Sugerencias de pedido para los ingredientes bajo stock, según el consumo
+    de los últimos `dias_historial` días (ventas x receta): cada uno se repone
+    hasta su umbral más `dias_cobertura` días de consumo, pidiendo al menos
+    la cantidad por defecto de su tipo. Ordenadas por los días de stock que
+    quedan al ritmo actual (los sin consumo al final).
+    """
+    bajos = db.session.execute(
+        select(Ingrediente.id, Ingrediente.nombre, Ingrediente.tipo, Ingrediente.inventario,
+               Ingrediente.stock_minimo, Ingrediente.punto_reorden)
+        .where(Ingrediente.bajo_stock)
+    ).all()
+    if not bajos:
+        return []
+
+    desde = datetime.datetime.utcnow() - datetime.timedelta(days=dias_historial)
+    consumo = dict(db.session.execute(
+        select(Receta.ingrediente_id, func.sum(Venta.cantidad * Receta.cantidad))
+        .join(Venta, Venta.producto_id == Receta.producto_id)
+        .where(Receta.ingrediente_id.in_([b.id for b in bajos]), Venta.fecha >= desde)
+        .group_by(Receta.ingrediente_id)
+    ).all())
+
+    sugerencias = []
+    for b in bajos:
+        diario = (consumo.get(b.id) or 0) / dias_historial
+        inventario = b.inventario or 0
+        objetivo = _umbral(b) + math.ceil(diario * dias_cobertura)
+        minimo = modelo_de_tipo(b.tipo).CANTIDAD_ABASTECER or 1
+        sugerencias.append({
+            'id': b.id, 'nombre': b.nombre, 'tipo': b.tipo, 'inventario': inventario,
+            'umbral': _umbral(b), 'consumo_diario': round(diario, 2),
+            'dias_restantes': round(inventario / diario, 1) if diario else None,
+            'cantidad': max(objetivo - inventario, minimo),
+        })
+    sugerencias.sort(key=lambda s: (s['dias_restantes'] is None, s['dias_restantes'] or 0, s['id']))
+    return sugerencias
@@ -0,0 +1,104 @@
+from sqlalchemy import event, inspect, select, update
+from database import db
+from models.funciones import calcular_costo, calcular_calorias, calcular_rentabilidad
+from models.ingrediente import Ingrediente
+from models.producto import Producto
+from models.receta import Receta
+
+# Atributos de Ingrediente que afectan las métricas de los productos
+ATRIBUTOS_DERIVADOS = ('precio', 'calorias')
+
+
+def productos_afectados(ingrediente_ids):
+    """
+    Devuelve los IDs de los productos que usan alguno de los ingredientes,
+    usando el índice inverso ix_receta_ingrediente_id.
+    """
+    if not ingrediente_ids:
+        return set()
+    return set(db.session.execute(
+        select(Receta.producto_id).where(Receta.ingrediente_id.in_(ingrediente_ids)).distinct()
+    ).scalars())
+
+
+def recalcular_productos(producto_ids):
+    """
+    Recalcula costo_produccion, calorias_totales y rentabilidad_unitaria solo para
+    los productos indicados y los escribe en bloque (un único executemany).
+    Los productos sin receta conservan sus valores actuales.
+    Devuelve la cantidad de productos actualizados.
+    """
+    if not producto_ids:
+        return 0
+
+    ingredientes = {}
+    precios = {}
+    for producto_id, precio_publico, precio, calorias, cantidad in db.session.execute(
+        select(Receta.producto_id, Producto.precio_publico, Ingrediente.precio, Ingrediente.calorias, Receta.cantidad)
+        .join(Producto, Producto.id == Receta.producto_id)
+        .join(Ingrediente, Ingrediente.id == Receta.ingrediente_id)
+        .where(Receta.producto_id.in_(producto_ids))
+    ):
+        precios[producto_id] = precio_publico
+        ingredientes.setdefault(producto_id, []).append({'precio': precio * cantidad, 'calorias': calorias * cantidad})
+
+    if not ingredientes:
+        return 0
+
+    db.session.execute(update(Producto), [{
+        'id': producto_id,
+        'costo_produccion': calcular_costo(lista),
+        'calorias_totales': calcular_calorias([ing['calorias'] for ing in lista]),
+        'rentabilidad_unitaria': calcular_rentabilidad(precios[producto_id], lista),
+    } for producto_id, lista in ingredientes.items()])
+    return len(ingredientes)
+
+
+def recalcular_por_ingredientes(ingrediente_ids):
+    """Recalcula únicamente los productos que dependen de los ingredientes indicados."""
+    return recalcular_productos(productos_afectados(ingrediente_ids))
+
+
+def recalcular_todos():
+    """Recalcula todos los productos con receta (carga inicial o reparación)."""
+    return recalcular_productos(set(db.session.execute(select(Receta.producto_id).distinct()).scalars()))
+
+
+# *** MANTENIMIENTO INCREMENTAL ***
+
+@event.listens_for(db.session, 'after_flush')
+def _registrar_cambios(session, flush_context):
+    """
+    Anota qué ingredientes y productos cambiaron en este flush; el recálculo
+    se hace una sola vez antes del commit.
+    """
+    pendientes = session.info.setdefault('metricas_pendientes', {'ingredientes': set(), 'productos': set()})
+    for obj in session.dirty:
+        if isinstance(obj, Ingrediente) and any(
+            inspect(obj).attrs[attr].history.has_changes() for attr in ATRIBUTOS_DERIVADOS
+        ):
+            pendientes['ingredientes'].add(obj.id)
+        elif isinstance(obj, Producto) and inspect(obj).attrs.precio_publico.history.has_changes():
+            pendientes['productos'].add(obj.id)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Receta):
+            pendientes['productos'].add(obj.producto_id)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _recalcular_pendientes(session):
+    session.flush()
+    pendientes = session.info.pop('metricas_pendientes', None)
+    if not pendientes:
+        return
+    productos = pendientes['productos'] | productos_afectados(pendientes['ingredientes'])
+    if recalcular_productos(productos):
+        # Las filas se actualizaron por fuera del ORM; refrescar las instancias cargadas
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, Producto) and obj.id in productos:
+                session.expire(obj)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_pendientes(session):
+    session.info.pop('metricas_pendientes', None)
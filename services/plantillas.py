@@ -0,0 +1,63 @@
+import os
+from flask import current_app, request
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from services.cache import obtener_backend
+
+
+class FragmentoCache(Extension):
+    """
+    Etiqueta {% cache 'nombre', parte, ... %}...{% endcache %}: guarda el HTML
+    del bloque en el backend de caché del catálogo, con la versión del
+    catálogo en la entrada. Cualquier escritura que invalide el catálogo
+    (invalida_catalogo) invalida también los fragmentos. Con un backend cuya
+    versión podría no enterarse nunca de las escrituras de otros workers
+    (en memoria sin ttl) el bloque se renderiza siempre.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        partes = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            partes.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_renderizar', [nodes.List(partes)]), [], [], cuerpo).set_lineno(lineno)
+
+    def _renderizar(self, partes, caller):
+        if current_app.config.get('CACHE_DESHABILITADA'):
+            return caller()
+        backend = obtener_backend()
+        if not backend.version_acotada:
+            return caller()
+        version, _ = backend.version()
+        # Los enlaces del fragmento dependen del prefijo con que se monta la app
+        clave = 'fragmento|' + '|'.join(map(str, [*partes, request.script_root]))
+        entrada = backend.get(clave)
+        if entrada is not None and entrada[0] == version:
+            return Markup(entrada[1])
+        html = caller()
+        backend.set(clave, (version, str(html)))
+        return html
+
+
+def init_plantillas(app):
+    """
+    Registra la etiqueta {% cache %} y, salvo PLANTILLAS_BYTECODE=0, guarda el
+    bytecode compilado de las plantillas en disco para que los workers nuevos
+    no vuelvan a compilarlas.
+    """
+    app.jinja_env.add_extension(FragmentoCache)
+    if app.config.get('PLANTILLAS_BYTECODE', True):
+        directorio = app.config.get('PLANTILLAS_BYTECODE_DIRECTORIO') or os.path.join(app.instance_path, 'jinja')
+        os.makedirs(directorio, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directorio)
+
+
+def precompilar_plantillas(app):
+    """Compila todas las plantillas (y llena la caché de bytecode); devuelve sus nombres."""
+    nombres = app.jinja_env.list_templates(extensions=('html',))
+    for nombre in nombres:
+        app.jinja_env.get_template(nombre)
+    return nombres
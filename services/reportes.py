@@ -0,0 +1,234 @@
+import datetime
+from sqlalchemy import delete, func, select
+from database import db
+from models.producto import Producto
+from models.resumen_venta import VentaPorDia, VentaPorHora
+from models.venta import Venta
+from services.consultas import DialectoNoSoportado, insert_o_actualizar
+
+# Días máximos por reporte según la granularidad
+MAX_DIAS = {'dia': 366, 'hora': 31}
+ORDENES = ('ingresos', 'unidades', 'margen')
+MAX_TOP = 100
+# Días del libro que se leen por consulta al reconstruir los resúmenes
+DIAS_POR_PASO = 7
+
+SUMAS = ('unidades', 'ingresos', 'costo', 'ventas')
+
+
+class ReporteInvalido(Exception):
+    """Los parámetros del reporte no son válidos."""
+
+
+# *** MANTENIMIENTO DE LOS RESÚMENES ***
+
+def _upsert_sumando(modelo, filas):
+    """
+    INSERT en bloque de filas de resumen que, si (producto_id, periodo) ya
+    existe, suma sus totales a los guardados (ON CONFLICT en SQLite/PostgreSQL,
+    ON DUPLICATE KEY en MySQL). Las claves de `filas` no deben repetirse.
+    """
+    if not filas:
+        return
+    stmt = insert_o_actualizar(modelo, ['producto_id', 'periodo'], SUMAS, lambda actual, nueva: actual + nueva)
+    db.session.execute(stmt, filas)
+
+
+def _acumular(destino, producto_id, periodo, unidades, ingresos, costo, ventas):
+    fila = destino.get((producto_id, periodo))
+    if fila is None:
+        fila = destino[producto_id, periodo] = {'producto_id': producto_id, 'periodo': periodo,
+                                                'unidades': 0, 'ingresos': 0.0, 'costo': 0.0, 'ventas': 0}
+    fila['unidades'] += unidades
+    fila['ingresos'] += ingresos
+    fila['costo'] += costo
+    fila['ventas'] += ventas
+
+
+def resumir(registros):
+    """
+    Suma líneas del libro ({producto_id, cantidad, total, costo_unitario,
+    fecha}) a los resúmenes por hora y por día, con un upsert por tabla.
+    Se llama dentro de la transacción de la venta, así que los reportes
+    nunca cuentan una venta deshecha.
+    """
+    por_hora, por_dia = {}, {}
+    for r in registros:
+        hora = r['fecha'].replace(minute=0, second=0, microsecond=0)
+        costo = (r['costo_unitario'] or 0) * r['cantidad']
+        _acumular(por_hora, r['producto_id'], hora, r['cantidad'], r['total'], costo, 1)
+        _acumular(por_dia, r['producto_id'], hora.date(), r['cantidad'], r['total'], costo, 1)
+    _upsert_sumando(VentaPorHora, list(por_hora.values()))
+    _upsert_sumando(VentaPorDia, list(por_dia.values()))
+
+
+def _truncar_a_hora(columna):
+    dialecto = db.engine.dialect.name
+    if dialecto == 'sqlite':
+        return func.strftime('%Y-%m-%d %H:00:00', columna)
+    if dialecto == 'mysql':
+        return func.date_format(columna, '%Y-%m-%d %H:00:00')
+    if dialecto == 'postgresql':
+        return func.date_trunc('hour', columna)
+    raise DialectoNoSoportado(f'Truncado por hora no soportado para {dialecto}')
+
+
+def _borrar_resumenes(inicio=None, fin=None):
+    """Borra los resúmenes por hora y por día de [inicio, fin); sin límite, hasta el extremo."""
+    for modelo, periodo in ((VentaPorHora, lambda m: m), (VentaPorDia, lambda m: m.date())):
+        condiciones = []
+        if inicio is not None:
+            condiciones.append(modelo.periodo >= periodo(inicio))
+        if fin is not None:
+            condiciones.append(modelo.periodo < periodo(fin))
+        db.session.execute(delete(modelo).where(*condiciones))
+
+
+def reconstruir_resumenes(desde=None):
+    """
+    Rehace los resúmenes desde el libro de ventas, a partir de la fecha
+    `desde` (o completos), en tramos de DIAS_POR_PASO días: cada tramo borra
+    sus resúmenes y los vuelve a sumar leyendo el libro agrupado por producto
+    y hora, en su propia transacción, así que los bloqueos duran un tramo y no
+    toda la reconstrucción. Las ventas sin costo registrado usan el costo de
+    producción actual. Devuelve el número de filas por hora escritas.
+
+    Los tramos posteriores a la última venta del libro al empezar no se
+    tocan: las ventas nuevas suman a sus resúmenes por su cuenta. El tramo
+    que incluye el momento actual sí se borra y se rehace, y según el
+    aislamiento de la base una venta confirmada entre el borrado y la lectura
+    del libro podría perderse: no se debe reconstruir ese tramo mientras
+    entran ventas (correrlo fuera del horario de atención).
+    """
+    primera, ultima = db.session.execute(select(func.min(Venta.fecha), func.max(Venta.fecha))).one()
+    db.session.commit()
+    # Sin `desde`, el primer tramo borra también lo anterior a la primera venta
+    anterior = datetime.datetime.combine(desde, datetime.time()) if desde else None
+    if primera is None or (anterior and anterior > ultima):
+        try:
+            _borrar_resumenes(anterior)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return 0
+
+    inicio = max(anterior or primera, primera).replace(hour=0, minute=0, second=0, microsecond=0)
+    hora = _truncar_a_hora(Venta.fecha)
+    consulta = (
+        select(Venta.producto_id, hora, func.sum(Venta.cantidad), func.sum(Venta.total),
+               func.sum(Venta.cantidad * func.coalesce(Venta.costo_unitario, Producto.costo_produccion, 0)),
+               func.count())
+        .join(Producto, Producto.id == Venta.producto_id)
+        .group_by(Venta.producto_id, hora)
+    )
+    escritas = 0
+    while inicio <= ultima:
+        fin = inicio + datetime.timedelta(days=DIAS_POR_PASO)
+        por_hora, por_dia = {}, {}
+        try:
+            _borrar_resumenes(anterior, fin)
+            for producto_id, periodo, unidades, ingresos, costo, ventas in db.session.execute(
+                consulta.where(Venta.fecha >= inicio, Venta.fecha < fin)
+            ):
+                if not isinstance(periodo, datetime.datetime):
+                    periodo = datetime.datetime.fromisoformat(periodo)
+                _acumular(por_hora, producto_id, periodo, unidades, ingresos, costo, ventas)
+                _acumular(por_dia, producto_id, periodo.date(), unidades, ingresos, costo, ventas)
+            _upsert_sumando(VentaPorHora, list(por_hora.values()))
+            _upsert_sumando(VentaPorDia, list(por_dia.values()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        escritas += len(por_hora)
+        anterior = inicio = fin
+    return escritas
+
+
+# *** CONSULTAS ***
+
+def _fecha(valor, nombre):
+    try:
+        return datetime.date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ReporteInvalido(f'{nombre} debe ser una fecha AAAA-MM-DD')
+
+
+def entero(valor, nombre):
+    """Parámetro entero opcional de un reporte (None si no viene)."""
+    if valor is None:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ReporteInvalido(f'{nombre} debe ser un entero')
+
+
+def rango(desde=None, hasta=None, granularidad='dia'):
+    """
+    Valida los parámetros de un reporte (fechas ISO, ambas inclusive; por
+    defecto, los últimos 7 días UTC) y devuelve (desde, hasta) como fechas.
+    """
+    if granularidad not in MAX_DIAS:
+        raise ReporteInvalido('granularidad debe ser dia u hora')
+    hasta = _fecha(hasta, 'hasta') if hasta else datetime.datetime.utcnow().date()
+    desde = _fecha(desde, 'desde') if desde else hasta - datetime.timedelta(days=6)
+    if desde > hasta:
+        raise ReporteInvalido('desde no puede ser posterior a hasta')
+    if (hasta - desde).days >= MAX_DIAS[granularidad]:
+        raise ReporteInvalido(f'El rango por {granularidad} admite como mucho {MAX_DIAS[granularidad]} días')
+    return desde, hasta
+
+
+def _filtro_periodo(modelo, desde, hasta):
+    if modelo is VentaPorDia:
+        return modelo.periodo.between(desde, hasta)
+    fin = datetime.datetime.combine(hasta + datetime.timedelta(days=1), datetime.time())
+    return (modelo.periodo >= datetime.datetime.combine(desde, datetime.time())) & (modelo.periodo < fin)
+
+
+def serie_ventas(desde, hasta, granularidad='dia', producto_id=None):
+    """
+    Unidades, ingresos, costo y margen por hora o por día entre dos fechas,
+    de todos los productos o de uno. Lee solo los resúmenes del rango.
+    """
+    modelo = VentaPorDia if granularidad == 'dia' else VentaPorHora
+    consulta = (
+        select(modelo.periodo, func.sum(modelo.unidades), func.sum(modelo.ingresos), func.sum(modelo.costo))
+        .where(_filtro_periodo(modelo, desde, hasta))
+        .group_by(modelo.periodo)
+        .order_by(modelo.periodo)
+    )
+    if producto_id is not None:
+        consulta = consulta.where(modelo.producto_id == producto_id)
+    return [
+        {'periodo': periodo.isoformat(), 'unidades': unidades, 'ingresos': round(ingresos, 2),
+         'costo': round(costo, 2), 'margen': round(ingresos - costo, 2)}
+        for periodo, unidades, ingresos, costo in db.session.execute(consulta)
+    ]
+
+
+def top_productos(desde, hasta, n=10, orden='ingresos'):
+    """Los `n` productos con más ingresos, unidades o margen entre dos fechas (resúmenes por día)."""
+    if orden not in ORDENES:
+        raise ReporteInvalido(f'orden debe ser uno de: {", ".join(ORDENES)}')
+    if not isinstance(n, int) or not 1 <= n <= MAX_TOP:
+        raise ReporteInvalido(f'n debe ser un entero entre 1 y {MAX_TOP}')
+    unidades = func.sum(VentaPorDia.unidades)
+    ingresos = func.sum(VentaPorDia.ingresos)
+    costo = func.sum(VentaPorDia.costo)
+    criterio = {'ingresos': ingresos, 'unidades': unidades, 'margen': ingresos - costo}[orden]
+    filas = db.session.execute(
+        select(VentaPorDia.producto_id, Producto.nombre, unidades, ingresos, costo)
+        .join(Producto, Producto.id == VentaPorDia.producto_id)
+        .where(_filtro_periodo(VentaPorDia, desde, hasta))
+        .group_by(VentaPorDia.producto_id, Producto.nombre)
+        .order_by(criterio.desc(), VentaPorDia.producto_id)
+        .limit(n)
+    )
+    return [
+        {'producto_id': producto_id, 'nombre': nombre, 'unidades': u, 'ingresos': round(i, 2),
+         'costo': round(c, 2), 'margen': round(i - c, 2)}
+        for producto_id, nombre, u, i, c in filas
+    ]
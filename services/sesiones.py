@@ -0,0 +1,311 @@
+import datetime
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import jwt
+from flask import current_app
+from sqlalchemy import delete, event, select
+from database import db
+from models.token_revocado import TokenRevocado
+from models.usuario import Usuario, mascara_de
+from services.instrumentacion import medir_jwt
+
+
+class CacheTTL:
+    """
+    Caché LRU acotada con expiración por entrada, segura entre hilos.
+    Con `maximo=0` queda deshabilitada.
+    """
+
+    def __init__(self, maximo, ttl):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira <= time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maximo <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class Principal:
+    """
+    Usuario autenticado por token. No es una entidad ORM: se arma con los
+    roles del token y el nombre de usuario cacheado, sin tocar la sesión.
+    """
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, es_admin=False, es_empleado=False, es_cliente=False):
+        self.id = id
+        self.username = username
+        self.es_admin = es_admin
+        self.es_empleado = es_empleado
+        self.es_cliente = es_cliente
+        self.roles = mascara_de(es_admin, es_empleado, es_cliente)
+
+    def get_id(self):
+        return str(self.id)
+
+    def __repr__(self):
+        return f'<Principal {self.username}>'
+
+
+# Clave de los JWT firmados con HMAC (HS256, el algoritmo por defecto)
+SECRET_KEY = os.getenv('SECRET_KEY', 'clave_secreta_default')  # Valor predeterminado si no está configurado
+
+
+class RefrescoInvalido(jwt.InvalidTokenError):
+    """Refresh token revocado o de un usuario que ya no existe."""
+
+
+def _leer_clave(valor):
+    """Clave PEM dada como ruta a un archivo o como texto (con '\\n' escapados en el .env)."""
+    if os.path.isfile(valor):
+        with open(valor, encoding='utf-8') as f:
+            return f.read()
+    return valor.replace('\\n', '\n')
+
+
+class ClavesJWT:
+    """
+    Algoritmo y claves de los JWT. Con HS* se firma y verifica con SECRET_KEY;
+    con algoritmos asimétricos (EdDSA, ES256, RS256) se firma con la clave
+    privada y otros servicios pueden verificar solo con la pública.
+    """
+
+    def __init__(self, algoritmo='HS256', privada=None, publica=None):
+        self.algoritmo = algoritmo
+        if algoritmo.startswith('HS'):
+            self.firma = self.verificacion = SECRET_KEY
+        elif privada and publica:
+            self.firma = _leer_clave(privada)
+            self.verificacion = _leer_clave(publica)
+        else:
+            raise ValueError(f'{algoritmo} requiere JWT_CLAVE_PRIVADA y JWT_CLAVE_PUBLICA')
+
+
+class Revocados:
+    """
+    Lista de refresh tokens revocados (jti -> vencimiento) en memoria,
+    persistida en la tabla tokens_revocados. Cada `intervalo` segundos se
+    releen todas las filas vigentes (no solo las de id mayor al último
+    visto: con varios workers los ids no se confirman en orden), de modo que
+    una revocación hecha en otro worker se aplica a lo sumo con ese retraso.
+    Los vencidos se descartan: un token vencido ya no pasa la verificación.
+    """
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self._jtis = {}
+        self._sincronizado = None
+        self._lock = threading.Lock()
+
+    def contiene(self, jti):
+        self._sincronizar()
+        return jti in self._jtis
+
+    def revocar(self, jti, exp):
+        """Revoca un token hasta su vencimiento (`exp`, segundos epoch) y purga los ya vencidos."""
+        ahora = datetime.datetime.utcnow()
+        db.session.execute(delete(TokenRevocado).where(TokenRevocado.expira <= ahora))
+        if not db.session.execute(select(TokenRevocado.id).where(TokenRevocado.jti == jti)).first():
+            db.session.add(TokenRevocado(jti=jti, expira=datetime.datetime.utcfromtimestamp(exp)))
+        db.session.commit()
+        with self._lock:
+            self._jtis[jti] = exp
+
+    def _sincronizar(self):
+        ahora = time.monotonic()
+        if self._sincronizado is not None and ahora - self._sincronizado < self.intervalo:
+            return
+        filas = db.session.execute(
+            select(TokenRevocado.jti, TokenRevocado.expira).where(TokenRevocado.expira > datetime.datetime.utcnow())
+        ).all()
+        epoch = time.time()
+        with self._lock:
+            # Se suma a lo que ya había: una revocación nunca se deshace
+            for jti, expira in filas:
+                self._jtis[jti] = expira.replace(tzinfo=datetime.timezone.utc).timestamp()
+            for jti in [j for j, exp in self._jtis.items() if exp <= epoch]:
+                del self._jtis[jti]
+            self._sincronizado = ahora
+
+    def clear(self):
+        with self._lock:
+            self._jtis.clear()
+            self._sincronizado = None
+
+    def __len__(self):
+        return len(self._jtis)
+
+
+# Tokens ya verificados y datos básicos de usuarios. Cada proceso (worker de
+# gunicorn) tiene su propia caché; el TTL acota cuánto puede quedar obsoleta.
+tokens = CacheTTL(int(os.getenv('TOKEN_CACHE_MAX', 10000)), int(os.getenv('TOKEN_CACHE_TTL', 300)))
+usuarios = CacheTTL(int(os.getenv('USUARIO_CACHE_MAX', 10000)), int(os.getenv('USUARIO_CACHE_TTL', 300)))
+# Refresh tokens revocados, releídos de la base cada JWT_REVOCADOS_SEGUNDOS
+revocados = Revocados(int(os.getenv('JWT_REVOCADOS_SEGUNDOS', 30)))
+
+
+def verificar_token(token, secret_key, algoritmos=('HS256',)):
+    """
+    Decodifica y verifica un JWT, reutilizando el resultado mientras el token
+    siga vigente. Lanza las mismas excepciones que jwt.decode.
+    """
+    payload = tokens.get(token)
+    if payload is None:
+        with medir_jwt():
+            payload = jwt.decode(token, secret_key, algorithms=list(algoritmos))
+        restante = payload.get('exp', time.time() + tokens.ttl) - time.time()
+        tokens.set(token, payload, ttl=restante)
+    elif payload.get('exp') is not None and payload['exp'] <= time.time():
+        tokens.delete(token)
+        raise jwt.ExpiredSignatureError('Signature has expired')
+    return payload
+
+
+def obtener_username(user_id):
+    """Devuelve el username de un usuario existente (cacheado) o None."""
+    username = usuarios.get(user_id)
+    if username is None:
+        username = db.session.execute(select(Usuario.username).where(Usuario.id == user_id)).scalar()
+        if username is not None:
+            usuarios.set(user_id, username)
+    return username
+
+
+def principal_desde_token(token, secret_key, algoritmos=('HS256',)):
+    """
+    Arma el Principal de un token de acceso válido; devuelve None si el
+    usuario ya no existe. Un refresh token no sirve como token de acceso.
+    """
+    data = verificar_token(token, secret_key, algoritmos)
+    if data.get('tipo') == 'refresco':
+        raise jwt.InvalidTokenError('Se esperaba un token de acceso')
+    username = obtener_username(data['user_id'])
+    if username is None:
+        return None
+    return Principal(
+        data['user_id'],
+        username,
+        es_admin=data.get('es_admin', False),
+        es_empleado=data.get('es_empleado', False),
+        es_cliente=data.get('es_cliente', False),
+    )
+
+
+def invalidar_usuario(user_id):
+    usuarios.delete(user_id)
+
+
+# *** EMISIÓN Y REFRESCO ***
+
+def obtener_claves():
+    claves = current_app.extensions.get('heladeria_jwt')
+    if claves is None:
+        config = current_app.config
+        claves = current_app.extensions['heladeria_jwt'] = ClavesJWT(
+            config.get('JWT_ALGORITMO', 'HS256'), config.get('JWT_CLAVE_PRIVADA'), config.get('JWT_CLAVE_PUBLICA'))
+    return claves
+
+
+def emitir_token_acceso(usuario):
+    """JWT de acceso con los roles del usuario; vence a los JWT_MINUTOS_ACCESO."""
+    claves = obtener_claves()
+    return jwt.encode({
+        'user_id': usuario.id,
+        'es_admin': usuario.es_admin,
+        'es_empleado': usuario.es_empleado,
+        'es_cliente': usuario.es_cliente,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=current_app.config.get('JWT_MINUTOS_ACCESO', 60))
+    }, claves.firma, algorithm=claves.algoritmo)
+
+
+def emitir_token_refresco(usuario):
+    """Refresh token (sin roles, con un jti revocable); vence a los JWT_DIAS_REFRESCO."""
+    claves = obtener_claves()
+    return jwt.encode({
+        'user_id': usuario.id,
+        'tipo': 'refresco',
+        'jti': uuid.uuid4().hex,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(days=current_app.config.get('JWT_DIAS_REFRESCO', 30))
+    }, claves.firma, algorithm=claves.algoritmo)
+
+
+def decodificar_refresco(token):
+    claves = obtener_claves()
+    data = jwt.decode(token, claves.verificacion, algorithms=[claves.algoritmo], options={'require': ['exp', 'jti']})
+    if data.get('tipo') != 'refresco':
+        raise jwt.InvalidTokenError('No es un refresh token')
+    return data
+
+
+def refrescar(token):
+    """
+    Nuevo token de acceso a partir de un refresh token vigente y no revocado,
+    sin verificar la contraseña. Los roles se leen de nuevo de la base, así
+    que los cambios de rol se aplican en el siguiente refresco. Lanza las
+    excepciones de jwt (RefrescoInvalido incluida).
+    """
+    data = decodificar_refresco(token)
+    if revocados.contiene(data['jti']):
+        raise RefrescoInvalido('El token fue revocado')
+    usuario = db.session.get(Usuario, data['user_id'])
+    if usuario is None:
+        raise RefrescoInvalido('Usuario no encontrado')
+    return emitir_token_acceso(usuario)
+
+
+# *** INVALIDACIÓN ***
+
+@event.listens_for(db.session, 'after_flush')
+def _anotar_usuarios_modificados(session, flush_context):
+    modificados = session.info.setdefault('usuarios_modificados', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Usuario):
+            modificados.add(obj.id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_usuarios_modificados(session):
+    # Se invalida después del commit para que nadie vuelva a cachear la versión anterior
+    for user_id in session.info.pop('usuarios_modificados', ()):
+        invalidar_usuario(user_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_usuarios_modificados(session):
+    session.info.pop('usuarios_modificados', None)
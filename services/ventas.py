@@ -0,0 +1,250 @@
+import datetime
+from sqlalchemy import update, insert, select, func, literal, case, or_
+from database import db
+from models.producto import Producto
+from models.ingrediente import Ingrediente
+from models.receta import Receta
+from models.venta import Venta
+from services.eventos import publicar
+from services.reportes import resumir
+
+
+# Máximo de líneas aceptadas en una venta por lote
+MAX_LINEAS_LOTE = 500
+
+
+class ProductoNoEncontrado(Exception):
+    """El producto solicitado no existe."""
+
+
+class StockInsuficiente(Exception):
+    """No hay inventario suficiente de algún ingrediente; `ingredientes` trae sus nombres."""
+
+    def __init__(self, ingredientes):
+        super().__init__('Stock insuficiente: ' + ', '.join(ingredientes))
+        self.ingredientes = ingredientes
+
+
+class ProductoAgotado(Exception):
+    """No hay unidades suficientes de algún producto con stock; `productos` trae sus nombres."""
+
+    def __init__(self, productos):
+        super().__init__('Producto agotado: ' + ', '.join(productos))
+        self.productos = productos
+
+
+class LoteInvalido(Exception):
+    """Alguna línea del lote no es válida; `lineas` trae el resultado de cada una."""
+
+    def __init__(self, lineas):
+        super().__init__('Lote de venta inválido')
+        self.lineas = lineas
+
+
+def _entero_positivo(valor, minimo=1):
+    # bool es subclase de int: True no es una cantidad
+    return isinstance(valor, int) and not isinstance(valor, bool) and valor >= minimo
+
+
+def descontar_ingredientes(cantidades):
+    """
+    Descuenta del inventario los ingredientes que consumen los productos vendidos.
+    `cantidades` es un diccionario {producto_id: unidades vendidas}. Las recetas
+    se leen con una sola consulta y todos los ingredientes se actualizan con un
+    único UPDATE ... CASE que solo afecta filas con stock suficiente; si alguna
+    queda fuera se deshace la transacción y se lanza StockInsuficiente.
+    """
+    consumo = {}
+    for ingrediente_id, producto_id, cantidad in db.session.execute(
+        select(Receta.ingrediente_id, Receta.producto_id, Receta.cantidad)
+        .where(Receta.producto_id.in_(cantidades))
+    ):
+        consumo[ingrediente_id] = consumo.get(ingrediente_id, 0) + cantidad * cantidades[producto_id]
+    if not consumo:
+        return
+
+    requerido = case(consumo, value=Ingrediente.id)
+    resultado = db.session.execute(
+        update(Ingrediente)
+        .where(Ingrediente.id.in_(consumo), Ingrediente.inventario >= requerido)
+        .values(inventario=Ingrediente.inventario - requerido)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != len(consumo):
+        # Deshacer lo descontado para poder identificar los faltantes con el stock original
+        db.session.rollback()
+        faltantes = db.session.execute(
+            select(Ingrediente.nombre)
+            .where(Ingrediente.id.in_(consumo), func.coalesce(Ingrediente.inventario, 0) < requerido)
+            .order_by(Ingrediente.id)
+        ).scalars().all()
+        raise StockInsuficiente(faltantes)
+
+
+def agotados(cantidades):
+    """
+    Después de un UPDATE condicional que no alcanzó todas las filas: deshace
+    la transacción y devuelve los nombres de los productos (de `cantidades`,
+    {producto_id: unidades}) cuyo stock no alcanza.
+    """
+    db.session.rollback()
+    requerido = case(cantidades, value=Producto.id)
+    return db.session.execute(
+        select(Producto.nombre)
+        .where(Producto.id.in_(cantidades), Producto.inventario < requerido)
+        .order_by(Producto.id)
+    ).scalars().all()
+
+
+def registrar_venta(producto_id, cantidad=1, usuario_id=None):
+    """
+    Registra la venta de un producto sin leer-modificar-escribir la fila:
+    la rentabilidad se incrementa y el stock del producto (si lo lleva) se
+    descuenta con un UPDATE atómico condicionado a `inventario >= :n`, se
+    descuentan los ingredientes de su receta y la venta se agrega al libro
+    `ventas` con un INSERT ... SELECT, todo en una sola transacción junto con
+    los resúmenes de los reportes y el evento 'venta_registrada' del outbox.
+    Devuelve un diccionario con el resumen de la venta; lanza
+    ProductoNoEncontrado, ProductoAgotado o StockInsuficiente.
+    """
+    fecha = datetime.datetime.utcnow()
+    try:
+        resultado = db.session.execute(
+            update(Producto)
+            .where(Producto.id == producto_id,
+                   or_(Producto.inventario.is_(None), Producto.inventario >= cantidad))
+            .values(rentabilidad=func.coalesce(Producto.rentabilidad, 0) + Producto.precio_publico * cantidad,
+                    inventario=Producto.inventario - cantidad)  # NULL - n sigue siendo NULL
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount == 0:
+            # Solo en el caso de falla se consulta si el producto existe
+            nombres = agotados({producto_id: cantidad})
+            if nombres:
+                raise ProductoAgotado(nombres)
+            raise ProductoNoEncontrado(producto_id)
+        descontar_ingredientes({producto_id: cantidad})
+
+        db.session.execute(
+            insert(Venta).from_select(
+                ['producto_id', 'usuario_id', 'cantidad', 'precio_unitario', 'total', 'costo_unitario', 'fecha'],
+                select(
+                    Producto.id,
+                    literal(usuario_id, db.Integer),
+                    literal(cantidad, db.Integer),
+                    Producto.precio_publico,
+                    Producto.precio_publico * cantidad,
+                    Producto.costo_produccion,
+                    literal(fecha, db.DateTime),
+                ).where(Producto.id == producto_id)
+            )
+        )
+
+        nombre, precio, costo = db.session.execute(
+            select(Producto.nombre, Producto.precio_publico, Producto.costo_produccion).where(Producto.id == producto_id)
+        ).one()
+        resumir([{'producto_id': producto_id, 'cantidad': cantidad, 'total': precio * cantidad,
+                  'costo_unitario': costo, 'fecha': fecha}])
+        # Efectos posteriores (puntos, alertas, recibos) fuera de la solicitud, vía outbox
+        publicar('venta_registrada', usuario_id=usuario_id,
+                 lineas=[{'producto_id': producto_id, 'cantidad': cantidad, 'total': precio * cantidad}])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'producto_id': producto_id, 'nombre': nombre, 'cantidad': cantidad, 'total': precio * cantidad}
+
+
+def registrar_ventas_lote(items, usuario_id=None):
+    """
+    Vende un carrito completo en una sola transacción.
+    `items` es una lista de diccionarios {producto_id, cantidad}. Los productos
+    se cargan con una única consulta IN, la rentabilidad de todos se actualiza
+    con un solo UPDATE ... CASE, los ingredientes se descuentan con otro y las
+    líneas se insertan en bloque en el libro y se suman a los resúmenes.
+    Si alguna línea es inválida no se aplica ninguna y se lanza LoteInvalido;
+    si falta stock de algún producto o ingrediente se lanza ProductoAgotado
+    o StockInsuficiente.
+    Devuelve el resultado de cada línea en el mismo orden recibido.
+    """
+    if not isinstance(items, list) or not items or len(items) > MAX_LINEAS_LOTE:
+        raise LoteInvalido([{'error': f'Se esperaba una lista de 1 a {MAX_LINEAS_LOTE} líneas'}])
+
+    lineas = []
+    for item in items:
+        producto_id = item.get('producto_id') if isinstance(item, dict) else None
+        cantidad = item.get('cantidad', 1) if isinstance(item, dict) else None
+        if not _entero_positivo(producto_id) or not _entero_positivo(cantidad):
+            lineas.append({'producto_id': producto_id, 'cantidad': cantidad,
+                           'error': 'producto_id y cantidad deben ser enteros positivos'})
+        else:
+            lineas.append({'producto_id': producto_id, 'cantidad': cantidad})
+
+    ids = {l['producto_id'] for l in lineas if 'error' not in l}
+    productos = {
+        fila.id: fila for fila in db.session.execute(
+            select(Producto.id, Producto.nombre, Producto.precio_publico, Producto.costo_produccion)
+            .where(Producto.id.in_(ids))
+        )
+    } if ids else {}
+
+    for linea in lineas:
+        if 'error' not in linea and linea['producto_id'] not in productos:
+            linea['error'] = 'Producto no encontrado'
+    if any('error' in l for l in lineas):
+        db.session.rollback()
+        raise LoteInvalido(lineas)
+
+    # Cantidad total por producto (un mismo producto puede venir en varias líneas)
+    cantidades = {}
+    for linea in lineas:
+        cantidades[linea['producto_id']] = cantidades.get(linea['producto_id'], 0) + linea['cantidad']
+
+    fecha = datetime.datetime.utcnow()
+    try:
+        requerido = case(cantidades, value=Producto.id)
+        resultado = db.session.execute(
+            update(Producto)
+            .where(Producto.id.in_(cantidades),
+                   or_(Producto.inventario.is_(None), Producto.inventario >= requerido))
+            .values(rentabilidad=func.coalesce(Producto.rentabilidad, 0) + Producto.precio_publico * requerido,
+                    inventario=Producto.inventario - requerido)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount != len(cantidades):
+            raise ProductoAgotado(agotados(cantidades))
+        descontar_ingredientes(cantidades)
+        registros = []
+        for linea in lineas:
+            producto = productos[linea['producto_id']]
+            linea.update({'nombre': producto.nombre, 'total': producto.precio_publico * linea['cantidad']})
+            registros.append({
+                'producto_id': producto.id,
+                'usuario_id': usuario_id,
+                'cantidad': linea['cantidad'],
+                'precio_unitario': producto.precio_publico,
+                'total': linea['total'],
+                'costo_unitario': producto.costo_produccion,
+                'fecha': fecha,
+            })
+        db.session.execute(insert(Venta), registros)
+        resumir(registros)
+        publicar('venta_registrada', usuario_id=usuario_id,
+                 lineas=[{'producto_id': r['producto_id'], 'cantidad': r['cantidad'], 'total': r['total']}
+                         for r in registros])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return lineas
+
+
+def rentabilidad_desde_libro(producto_id):
+    """
+    Recalcula la rentabilidad acumulada de un producto a partir del libro de ventas.
+    """
+    return db.session.execute(
+        select(func.coalesce(func.sum(Venta.total), 0)).where(Venta.producto_id == producto_id)
+    ).scalar()
@@ -0,0 +1,68 @@
+import datetime
+import jwt
+import pytest
+from app import create_app
+from config import TestingConfig
+from database import db
+from controllers.auth_controller import SECRET_KEY
+from models.usuario import Usuario
+from services import sesiones
+
+pytest_plugins = ["tests.plugin_sql"]
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Aplicación de pruebas sobre una base SQLite en archivo, para que varios
+    hilos puedan compartirla.
+    """
+    app = create_app({
+        'TESTING': True,
+        'SECRET_KEY': TestingConfig.SECRET_KEY,
+        # Sin hilos del outbox: las pruebas lo vacían con procesar_lote
+        'EVENTOS_HILOS': 0,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'heladeria.db'}",
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture(autouse=True)
+def limpiar_caches():
+    """Cada prueba usa una base nueva: no reutilizar tokens ni usuarios cacheados."""
+    sesiones.tokens.clear()
+    sesiones.usuarios.clear()
+    sesiones.revocados.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def crear_token(usuario):
+    """Genera un JWT equivalente al que entrega /auth/api_login."""
+    return jwt.encode({
+        'user_id': usuario.id,
+        'es_admin': usuario.es_admin,
+        'es_empleado': usuario.es_empleado,
+        'es_cliente': usuario.es_cliente,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, SECRET_KEY, algorithm='HS256')
+
+
+@pytest.fixture
+def usuarios(app):
+    """Crea un usuario por rol y devuelve sus tokens."""
+    creados = {
+        'admin': Usuario(username='admin', password='x', es_admin=True),
+        'empleado': Usuario(username='empleado', password='x', es_empleado=True),
+        'cliente': Usuario(username='cliente', password='x', es_cliente=True),
+    }
+    db.session.add_all(creados.values())
+    db.session.commit()
+    return {rol: {'x-access-token': crear_token(u)} for rol, u in creados.items()}
@@ -0,0 +1,87 @@
+"""
+Plugin de pytest que vigila el SQL de cada solicitud atendida durante las
+pruebas. Una prueba falla si alguna solicitud:
+- ejecuta más sentencias que el presupuesto declarado en su ruta con
+  @presupuesto_sql(n), o
+- repite la misma sentencia (N+1), salvo que la ruta lo permita.
+Se desactiva en una prueba con @pytest.mark.sin_presupuesto_sql.
+También ofrece el fixture `contar_sql` para contar sentencias a mano.
+"""
+import pytest
+from flask import current_app, g, request, request_finished, request_started
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from database import db
+from services.consultas import ContadorSQL, repetidas
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'sin_presupuesto_sql: no verificar el presupuesto SQL de las solicitudes')
+
+
+class VigilanteSQL:
+    """
+    Mientras está activo (`with VigilanteSQL() as vigilante:`) anota el SQL de
+    cada solicitud y deja en `violaciones` las que exceden su presupuesto o
+    repiten sentencias.
+    """
+
+    def __init__(self):
+        self.violaciones = []
+
+    def __enter__(self):
+        request_started.connect(self.iniciar)
+        request_finished.connect(self.verificar)
+        event.listen(Engine, 'before_cursor_execute', self.anotar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'before_cursor_execute', self.anotar)
+        request_started.disconnect(self.iniciar)
+        request_finished.disconnect(self.verificar)
+
+    def iniciar(self, sender, **extra):
+        g.sentencias_sql = []
+
+    def anotar(self, conn, cursor, statement, parameters, context, executemany):
+        try:
+            sentencias = g.get('sentencias_sql')
+        except RuntimeError:
+            return  # Fuera de una solicitud
+        if sentencias is not None:
+            sentencias.append(statement)
+
+    def verificar(self, sender, response, **extra):
+        sentencias = g.pop('sentencias_sql', None)
+        vista = current_app.view_functions.get(request.endpoint)
+        if sentencias is None or vista is None:
+            return
+        ruta = f'{request.method} {request.path}'
+        presupuesto = getattr(vista, 'presupuesto_sql', None)
+        if presupuesto is not None and len(sentencias) > presupuesto:
+            self.violaciones.append(f'{ruta}: {len(sentencias)} sentencias SQL, presupuesto {presupuesto}\n  '
+                                    + '\n  '.join(sentencias))
+        if not getattr(vista, 'permite_repetidas', False):
+            for sentencia, veces in repetidas(sentencias).items():
+                self.violaciones.append(f'{ruta}: sentencia repetida {veces} veces (N+1)\n  {sentencia}')
+
+
+@pytest.fixture(autouse=True)
+def vigilar_presupuesto_sql(request):
+    if request.node.get_closest_marker('sin_presupuesto_sql'):
+        yield
+        return
+
+    with VigilanteSQL() as vigilante:
+        yield
+    if vigilante.violaciones:
+        pytest.fail('\n'.join(vigilante.violaciones), pytrace=False)
+
+
+@pytest.fixture
+def contar_sql(app):
+    """
+    Cuenta las sentencias del engine de la app: `with contar_sql() as contador:`.
+    Acepta las opciones de ContadorSQL (`filtro`, `parametros`).
+    """
+    return lambda **opciones: ContadorSQL(db.engine, **opciones)
@@ -0,0 +1,79 @@
+import pytest
+from flask import Blueprint, g
+from database import db
+from models.ingrediente import Ingrediente
+from models.usuario import ROLES, Usuario
+from controllers.auth_controller import role_required_html, role_required_api
+from services.autorizacion import mascara_roles, tiene_rol
+
+
+def iniciar_sesion(client, username):
+    usuario = Usuario.query.filter_by(username=username).one()
+    with client.session_transaction() as sesion:
+        sesion['_user_id'] = str(usuario.id)
+        sesion['_fresh'] = True
+    # El contexto de la app de pruebas sigue activo entre solicitudes: olvidar el usuario anterior
+    g.pop('_login_user', None)
+
+
+def test_reabastecer_html_incrementa_una_sola_vez(client, usuarios):
+    db.session.add(Ingrediente(nombre='Leche', precio=1.5, calorias=50, inventario=10, es_vegetariano=True))
+    db.session.commit()
+    iniciar_sesion(client, 'admin')
+
+    response = client.post('/heladeria/ingredientes/reabastecer/1', data={'cantidad': 5})
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Ingrediente, 1).inventario == 15
+
+
+def test_vista_html_se_ejecuta_una_vez(app, client, usuarios):
+    ejecuciones = []
+    bp = Blueprint('prueba_roles', __name__)
+
+    @bp.route('/prueba/solo-admin')
+    @role_required_html('admin')
+    def vista():
+        ejecuciones.append(1)
+        return 'ok'
+
+    app.register_blueprint(bp)
+
+    iniciar_sesion(client, 'admin')
+    assert client.get('/prueba/solo-admin').status_code == 200
+    assert ejecuciones == [1]
+
+    iniciar_sesion(client, 'empleado')
+    assert client.get('/prueba/solo-admin').status_code == 403
+    assert ejecuciones == [1]
+
+
+def test_vista_api_se_ejecuta_una_vez():
+    ejecuciones = []
+
+    @role_required_api('empleado', 'admin')
+    def vista(current_user):
+        ejecuciones.append(current_user)
+        return 'ok'
+
+    class Usuario:
+        roles = ROLES['empleado']
+
+    assert vista(Usuario()) == 'ok'
+    assert len(ejecuciones) == 1
+
+
+def test_paginas_html_rechazan_roles_sin_permiso(client, usuarios):
+    iniciar_sesion(client, 'cliente')
+    assert client.get('/heladeria/ingredientes').status_code == 403
+    iniciar_sesion(client, 'empleado')
+    assert client.get('/heladeria/ingredientes').status_code == 200
+
+
+def test_mascaras():
+    assert mascara_roles('admin', 'cliente') == ROLES['admin'] | ROLES['cliente']
+    assert tiene_rol(Usuario(es_empleado=True), mascara_roles('empleado', 'admin'))
+    assert not tiene_rol(Usuario(es_cliente=True), mascara_roles('empleado', 'admin'))
+    assert not tiene_rol(object(), mascara_roles('admin'))
+    with pytest.raises(ValueError):
+        mascara_roles('gerente')
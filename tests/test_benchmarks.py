@@ -0,0 +1,27 @@
+import argparse
+from benchmarks.bench_endpoints import comparar, medir
+
+
+def resultado(escenario, p50, p99, rps, errores=0):
+    return {'escenario': escenario, 'modo': 'cliente', 'db': 'memoria', 'tamano': 100, 'errores': errores,
+            'p50_ms': p50, 'p99_ms': p99, 'req_por_segundo': rps}
+
+
+def test_comparar_marca_regresiones():
+    base = {'resultados': [resultado('detalle', 1.0, 2.0, 500), resultado('vender', 4.0, 10.0, 200),
+                           resultado('login', 500, 600, 2)]}
+    nuevo = {'resultados': [resultado('detalle', 1.05, 2.1, 480), resultado('vender', 5.0, 10.0, 190),
+                            resultado('login', 100, 120, 10, errores=3)]}
+    filas = {f['escenario'][0]: f for f in comparar(base, nuevo, umbral=0.10)}
+    assert not filas['detalle']['regresion']
+    assert filas['vender']['regresion'] and filas['vender']['cambios']['p50_ms'] == 0.25
+    # Más rápido pero con errores nuevos también es una regresión
+    assert filas['login']['regresion']
+
+
+def test_medir_suite_minima():
+    args = argparse.Namespace(db=['memoria'], tamanos=[20], modos=['cliente'], escenarios=['detalle', 'vender'],
+                              solicitudes=5, solicitudes_login=1, calentamiento=1, concurrencia=1, semilla=1)
+    salida = medir(args)
+    assert [(r['escenario'], r['errores']) for r in salida['resultados']] == [('detalle', 0), ('vender', 0)]
+    assert salida['meta']['parametros']['tamanos'] == [20]
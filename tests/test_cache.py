@@ -0,0 +1,204 @@
+import pytest
+from jinja2 import FileSystemBytecodeCache
+from app import create_app
+from config import TestingConfig
+from database import db
+from models.ingrediente import Ingrediente
+from models.producto import Producto
+from services import cache as modulo_cache
+from services.cache import CacheMemoria, CacheSQLite, crear_backend, invalidar_catalogo
+from services.plantillas import precompilar_plantillas
+from tests.test_autorizacion import iniciar_sesion
+
+
+def crear_producto():
+    db.session.add(Producto(nombre='Helado de Chocolate', precio_publico=15.0, calorias_totales=200,
+                            costo_produccion=8.0, rentabilidad=0.0))
+    db.session.commit()
+
+
+def test_lectura_repetida_no_consulta_la_base(client, contar_sql):
+    crear_producto()
+    with contar_sql() as contador:
+        primera = client.get('/heladeria/api/productos')
+    assert primera.status_code == 200 and contador.total == 1
+
+    with contar_sql() as contador:
+        segunda = client.get('/heladeria/api/productos')
+    assert segunda.json == primera.json
+    assert contador.total == 0
+
+
+def test_solicitud_condicional_responde_304(client, contar_sql):
+    crear_producto()
+    response = client.get('/heladeria/productos')
+    etag = response.headers['ETag']
+    last_modified = response.headers['Last-Modified']
+
+    with contar_sql() as contador:
+        response = client.get('/heladeria/productos', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert contador.total == 0
+
+    response = client.get('/heladeria/productos', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+
+def test_venta_cambia_el_etag(client, usuarios):
+    crear_producto()
+    etag = client.get('/heladeria/productos/detalle/1').headers['ETag']
+
+    assert client.post('/heladeria/api/productos/vender/1', headers=usuarios['cliente']).status_code == 200
+
+    response = client.get('/heladeria/productos/detalle/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_venta_fallida_no_invalida(client, usuarios):
+    crear_producto()
+    etag = client.get('/heladeria/api/productos').headers['ETag']
+    assert client.post('/heladeria/api/productos/vender/99', headers=usuarios['cliente']).status_code == 404
+    assert client.get('/heladeria/api/productos', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_formulario_rechazado_no_invalida(client, usuarios):
+    crear_producto()
+    db.session.add(Ingrediente(nombre='Leche', precio=1.5, calorias=50, inventario=10, es_vegetariano=True))
+    db.session.commit()
+    iniciar_sesion(client, 'admin')
+    etag = client.get('/heladeria/api/productos').headers['ETag']
+
+    # El rechazo llega como redirección con un mensaje, no como error
+    response = client.post('/heladeria/ingredientes/reabastecer/1', data={'cantidad': '-5'})
+    assert response.status_code == 302
+    assert client.get('/heladeria/api/productos', headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.post('/heladeria/ingredientes/reabastecer/1', data={'cantidad': '5'}).status_code == 302
+    assert client.get('/heladeria/api/productos', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_backend_memoria_lru():
+    cache = CacheMemoria(maximo=1)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') is None and cache.get('b') == 2
+    version, modificado = cache.version()
+    cache.incrementar_version()
+    assert cache.version()[0] == version + 1
+    assert cache.version()[1] >= modificado + 1
+    assert cache.get('b') is None
+
+
+def test_backend_memoria_caduca(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr(modulo_cache.time, 'monotonic', lambda: reloj[0])
+    cache = CacheMemoria(ttl=5)
+    cache.set('clave', 1)
+    version = cache.version()[0]
+    reloj[0] += 4
+    assert cache.version()[0] == version and cache.get('clave') == 1
+    reloj[0] += 1
+    assert cache.version()[0] == version + 1
+    assert cache.get('clave') is None
+
+
+def test_varios_workers_usan_sqlite_por_defecto(app):
+    assert isinstance(crear_backend({'WEB_CONCURRENCY': 4}), CacheSQLite)
+    assert isinstance(crear_backend({'WEB_CONCURRENCY': 1}), CacheMemoria)
+    assert isinstance(crear_backend({'WEB_CONCURRENCY': 4, 'CACHE_BACKEND': 'memoria'}), CacheMemoria)
+
+
+@pytest.mark.parametrize('backend', ['memoria', 'sqlite'])
+def test_dos_workers_no_sirven_un_catalogo_viejo(app, tmp_path, monkeypatch, backend):
+    """Otra instancia de la aplicación sobre la misma base hace de segundo worker."""
+    reloj = [100.0]
+    monkeypatch.setattr(modulo_cache.time, 'monotonic', lambda: reloj[0])
+    config = {'TESTING': True, 'SECRET_KEY': TestingConfig.SECRET_KEY, 'EVENTOS_HILOS': 0,
+              'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'],
+              'CACHE_BACKEND': backend, 'CACHE_TTL': 5, 'CACHE_SQLITE_RUTA': str(tmp_path / 'cache.db')}
+    app.extensions['heladeria_cache'] = crear_backend(config)
+    otro = create_app(config)
+    crear_producto()
+
+    lectura = otro.test_client().get('/heladeria/api/productos')
+    assert len(lectura.json) == 1
+    etag = lectura.headers['ETag']
+    # Escritura atendida por el primer worker
+    db.session.add(Producto(nombre='Helado de Fresa', precio_publico=12.0, calorias_totales=150,
+                            costo_produccion=6.0, rentabilidad=0.0))
+    db.session.commit()
+    invalidar_catalogo()
+
+    if backend == 'memoria':
+        # Hasta que caduque su versión el otro worker sigue con la anterior
+        assert otro.test_client().get('/heladeria/api/productos').json == lectura.json
+        reloj[0] += 5
+    lectura = otro.test_client().get('/heladeria/api/productos', headers={'If-None-Match': etag})
+    assert lectura.status_code == 200
+    assert len(lectura.json) == 2
+
+
+def test_backend_sqlite_comparte_version(tmp_path):
+    ruta = str(tmp_path / 'cache.db')
+    worker_a, worker_b = CacheSQLite(ruta), CacheSQLite(ruta)
+    worker_a.set('clave', (1, b'cuerpo', 'text/html'))
+    assert worker_b.get('clave') == (1, b'cuerpo', 'text/html')
+
+    version = worker_b.version()[0]
+    worker_a.incrementar_version()
+    assert worker_b.version()[0] == version + 1
+    assert worker_b.get('clave') is None
+
+
+def test_fragmento_de_ingredientes_se_invalida_al_reabastecer(client, usuarios, contar_sql):
+    db.session.add(Ingrediente(nombre='Leche', precio=1.5, calorias=50, inventario=10, es_vegetariano=True))
+    db.session.commit()
+    iniciar_sesion(client, 'empleado')
+
+    primera = client.get('/heladeria/ingredientes')
+    assert b'<td>10</td>' in primera.data
+    # Con el cuerpo de la tabla en caché no se consultan los ingredientes
+    with contar_sql() as contador:
+        segunda = client.get('/heladeria/ingredientes')
+    assert segunda.data == primera.data
+    assert contador.total == 0
+
+    assert client.post('/heladeria/api/ingredientes/reabastecer/1', json={'cantidad': 5},
+                       headers=usuarios['empleado']).status_code == 200
+    assert b'<td>15</td>' in client.get('/heladeria/ingredientes').data
+
+
+def test_fragmento_de_otro_worker_caduca(app, usuarios, monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr(modulo_cache.time, 'monotonic', lambda: reloj[0])
+    db.session.add(Ingrediente(nombre='Leche', precio=1.5, calorias=50, inventario=10, es_vegetariano=True))
+    db.session.commit()
+    otro = create_app({'TESTING': True, 'SECRET_KEY': TestingConfig.SECRET_KEY, 'EVENTOS_HILOS': 0,
+                       'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'],
+                       'CACHE_BACKEND': 'memoria', 'CACHE_TTL': 5})
+    cliente = otro.test_client()
+    iniciar_sesion(cliente, 'empleado')
+    assert b'<td>10</td>' in cliente.get('/heladeria/ingredientes').data
+
+    assert app.test_client().post('/heladeria/api/ingredientes/reabastecer/1', json={'cantidad': 5},
+                                  headers=usuarios['empleado']).status_code == 200
+    reloj[0] += 5
+    assert b'<td>15</td>' in cliente.get('/heladeria/ingredientes').data
+
+
+def test_fragmento_no_se_guarda_sin_version_acotada(client, usuarios, app):
+    app.extensions['heladeria_cache'] = CacheMemoria()
+    db.session.add(Ingrediente(nombre='Leche', precio=1.5, calorias=50, inventario=10, es_vegetariano=True))
+    db.session.commit()
+    iniciar_sesion(client, 'empleado')
+    assert b'<td>10</td>' in client.get('/heladeria/ingredientes').data
+    assert not any(clave.startswith('fragmento|') for clave in app.extensions['heladeria_cache']._datos)
+
+
+def test_precompilar_guarda_bytecode(app, tmp_path):
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(str(tmp_path))
+    app.jinja_env.cache.clear()
+    nombres = precompilar_plantillas(app)
+    assert 'productos.html' in nombres
+    assert len(list(tmp_path.glob('__jinja2_*.cache'))) == len(nombres)
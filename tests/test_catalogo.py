@@ -0,0 +1,62 @@
+import json
+from database import db
+from models.ingrediente import Ingrediente
+from models.producto import Producto
+
+
+def sembrar(n=25):
+    db.session.add_all(Producto(nombre=f'Producto {i}', precio_publico=10.0 + i, calorias_totales=100,
+                                costo_produccion=5.0, rentabilidad=0.0) for i in range(n))
+    db.session.add_all(Ingrediente(nombre=f'Ingrediente {i}', precio=1.0, calorias=50, inventario=i,
+                                   es_vegetariano=True) for i in range(n))
+    db.session.commit()
+
+
+def test_listar_productos_sin_parametros(client):
+    sembrar(3)
+    response = client.get('/heladeria/api/productos')
+    assert response.status_code == 200
+    assert len(response.json) == 3
+    assert set(response.json[0]) == {'id', 'nombre', 'precio_publico', 'calorias_totales'}
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_paginacion_por_cursor(client):
+    sembrar(25)
+    vistos = []
+    url = '/heladeria/api/productos?limit=10'
+    while True:
+        response = client.get(url)
+        vistos += [p['id'] for p in response.json]
+        if 'X-Next-Cursor' not in response.headers:
+            break
+        url = f"/heladeria/api/productos?limit=10&after={response.headers['X-Next-Cursor']}"
+    assert vistos == sorted(vistos)
+    assert len(vistos) == len(set(vistos)) == 25
+
+
+def test_proyeccion_de_campos(client, usuarios):
+    sembrar(2)
+    response = client.get('/heladeria/api/productos?fields=nombre')
+    assert response.json[0] == {'id': 1, 'nombre': 'Producto 0'}
+
+    response = client.get('/heladeria/api/productos?fields=nombre,costo_produccion')
+    assert response.status_code == 400
+
+    response = client.get('/heladeria/api/ingredientes?fields=inventario', headers=usuarios['empleado'])
+    assert response.json == [{'id': 1, 'inventario': 0}, {'id': 2, 'inventario': 1}]
+
+
+def test_streaming_ndjson(client, usuarios):
+    sembrar(30)
+    response = client.get('/heladeria/api/ingredientes?format=ndjson&after=10&fields=nombre',
+                          headers=usuarios['admin'])
+    assert response.mimetype == 'application/x-ndjson'
+    filas = [json.loads(linea) for linea in response.get_data(as_text=True).splitlines()]
+    assert len(filas) == 20
+    assert filas[0] == {'id': 11, 'nombre': 'Ingrediente 10'}
+
+
+def test_parametros_invalidos(client):
+    assert client.get('/heladeria/api/productos?limit=0').status_code == 400
+    assert client.get('/heladeria/api/productos?after=abc').status_code == 400
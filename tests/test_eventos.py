@@ -0,0 +1,71 @@
+import time
+import pytest
+from database import db
+from models.evento import Evento
+from models.producto import Producto
+from services import eventos
+from services.eventos import Despachador, pendientes, procesar_lote, publicar
+
+
+@pytest.fixture
+def recibidos(monkeypatch):
+    """Suscriptor de prueba de 'venta_registrada' que anota cada lote recibido."""
+    lotes = []
+    monkeypatch.setitem(eventos.SUSCRIPTORES, 'venta_registrada', [lotes.append])
+    return lotes
+
+
+def test_venta_publica_evento_en_su_transaccion(client, usuarios, recibidos):
+    db.session.add(Producto(nombre='Helado', precio_publico=10.0, rentabilidad=0.0))
+    db.session.commit()
+
+    assert client.post('/heladeria/api/productos/vender/1', headers=usuarios['cliente']).status_code == 200
+    assert client.post('/heladeria/api/ventas/lote', json=[{'producto_id': 1, 'cantidad': 2}],
+                       headers=usuarios['cliente']).status_code == 200
+    # Una venta fallida no deja eventos
+    assert client.post('/heladeria/api/productos/vender/99', headers=usuarios['cliente']).status_code == 404
+    assert pendientes() == (2, 0)
+
+    assert procesar_lote() == 2
+    assert len(recibidos) == 1  # un solo lote con los dos eventos
+    assert [e['lineas'][0]['cantidad'] for e in recibidos[0]] == [1, 2]
+    assert Evento.query.count() == 0
+
+
+def test_evento_fallido_se_aisla_y_reintenta(app, monkeypatch):
+    procesados = []
+
+    def suscriptor(lote):
+        if any(e['n'] == 2 for e in lote):
+            raise ValueError('falla')
+        procesados.extend(e['n'] for e in lote)
+
+    monkeypatch.setitem(eventos.SUSCRIPTORES, 'prueba', [suscriptor])
+    for n in (1, 2, 3):
+        publicar('prueba', n=n)
+    db.session.commit()
+
+    assert procesar_lote(max_intentos=2) == 3
+    assert procesados == [1, 3]
+    fallido = Evento.query.one()
+    assert fallido.intentos == 1 and not fallido.muerto and 'ValueError' in fallido.error
+    # Postergado: no se vuelve a procesar hasta que pase la espera
+    assert procesar_lote() == 0
+
+    fallido.disponible = fallido.creado
+    db.session.commit()
+    assert procesar_lote(max_intentos=2) == 1
+    assert pendientes() == (0, 1)
+
+
+def test_despachador_vacia_el_outbox_al_hacer_commit(app, recibidos):
+    despachador = app.extensions['heladeria_eventos'] = Despachador(app, hilos=1, intervalo=30)
+    try:
+        publicar('venta_registrada', usuario_id=None, lineas=[])
+        db.session.commit()
+        limite = time.monotonic() + 5
+        while not recibidos and time.monotonic() < limite:
+            time.sleep(0.01)
+    finally:
+        despachador.detener()
+    assert len(recibidos) == 1
@@ -0,0 +1,70 @@
+import random
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from models.funciones import (calcular_calorias, calcular_costo, calcular_rentabilidad, es_sano,
+                              producto_mas_rentable)
+from models.funciones_lote import (calcular_calorias_lote, calcular_costo_lote, calcular_rentabilidad_lote,
+                                   es_sano_lote, matriz_recetas, producto_mas_rentable_lote)
+
+
+@pytest.fixture
+def catalogo():
+    """20 productos con 1 a 4 ingredientes (de 8) y 3 escenarios de precios."""
+    rng = random.Random(7)
+    ingredientes = list(range(1, 9))
+    recetas = [(p, i, rng.randint(1, 3)) for p in range(1, 21) for i in rng.sample(ingredientes, rng.randint(1, 4))]
+    return {
+        'productos': list(range(1, 21)),
+        'ingredientes': ingredientes,
+        'recetas': recetas,
+        'calorias': [rng.randint(10, 300) for _ in ingredientes],
+        'escenarios': [[round(rng.uniform(0.5, 5), 2) for _ in ingredientes] for _ in range(3)],
+        'precio': [float(rng.randint(10, 30)) for _ in range(20)],
+    }
+
+
+def lineas(catalogo, producto_id, valores):
+    """Lista de dicts como la que reciben las funciones escalares (valor x cantidad por ingrediente)."""
+    return [{'precio': valores[i - 1] * c, 'calorias': catalogo['calorias'][i - 1] * c}
+            for p, i, c in catalogo['recetas'] if p == producto_id]
+
+
+def test_es_sano_lote():
+    calorias = [50, 150, 99, 100, 250]
+    vegetariano = [False, True, False, False, False]
+    assert es_sano_lote(calorias, vegetariano).tolist() == [es_sano(c, v) for c, v in zip(calorias, vegetariano)]
+
+
+def test_calculadoras_lote_equivalen_a_las_escalares(catalogo):
+    cantidades = matriz_recetas(catalogo['recetas'], catalogo['productos'], catalogo['ingredientes'])
+    precios = catalogo['escenarios'][0]
+
+    por_producto = [lineas(catalogo, p, precios) for p in catalogo['productos']]
+    np.testing.assert_allclose(calcular_calorias_lote(cantidades, catalogo['calorias']),
+                               [calcular_calorias([l['calorias'] for l in ls]) for ls in por_producto])
+    np.testing.assert_allclose(calcular_costo_lote(cantidades, precios),
+                               [calcular_costo(ls) for ls in por_producto])
+    rentabilidad = calcular_rentabilidad_lote(catalogo['precio'], cantidades, precios)
+    np.testing.assert_allclose(rentabilidad,
+                               [calcular_rentabilidad(pr, ls) for pr, ls in zip(catalogo['precio'], por_producto)])
+
+    nombres = [f'Producto {p}' for p in catalogo['productos']]
+    assert producto_mas_rentable_lote(nombres, rentabilidad) == producto_mas_rentable(
+        [{'nombre': n, 'rentabilidad': r} for n, r in zip(nombres, rentabilidad.tolist())])
+
+
+def test_escenarios_de_precios(catalogo):
+    cantidades = matriz_recetas(catalogo['recetas'], catalogo['productos'], catalogo['ingredientes'])
+    rentabilidad = calcular_rentabilidad_lote(catalogo['precio'], cantidades, catalogo['escenarios'])
+    assert rentabilidad.shape == (3, 20)
+    for fila, precios in zip(rentabilidad, catalogo['escenarios']):
+        np.testing.assert_allclose(fila, calcular_rentabilidad_lote(catalogo['precio'], cantidades, precios))
+
+    nombres = [f'Producto {p}' for p in catalogo['productos']]
+    assert list(producto_mas_rentable_lote(nombres, rentabilidad)) == [
+        producto_mas_rentable([{'nombre': n, 'rentabilidad': r} for n, r in zip(nombres, fila.tolist())])
+        for fila in rentabilidad]
+    # Empate: gana el primero, como max()
+    assert producto_mas_rentable_lote(['a', 'b', 'c'], [1.0, 3.0, 3.0]) == 'b'
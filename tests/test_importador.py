@@ -0,0 +1,99 @@
+import json
+from werkzeug.security import check_password_hash
+from database import db
+from models.base import Base
+from models.ingrediente import Ingrediente
+from models.producto import Producto
+from models.receta import Receta
+from models.usuario import Usuario
+from poblar_base_datos import poblar_base_datos
+
+CATALOGO_CSV = """entidad,nombre,precio,calorias,inventario,es_vegetariano,tipo,sabor,precio_publico,producto,ingrediente,cantidad
+ingrediente,Vainilla,2,100,10,si,base,Vainilla,,,,
+ingrediente,Nueces,3,200,5,no,complemento,,,,,
+producto,Copa Vainilla,,,,,,,20,,,
+receta,,,,,,,,,Copa Vainilla,Vainilla,2
+receta,,,,,,,,,Copa Vainilla,Nueces,1
+"""
+
+
+def importar_archivo(app, ruta, *opciones):
+    return app.test_cli_runner().invoke(args=['heladeria', 'import', str(ruta), *opciones])
+
+
+def test_importar_csv_es_idempotente(app, tmp_path):
+    ruta = tmp_path / 'catalogo.csv'
+    ruta.write_text(CATALOGO_CSV, encoding='utf-8')
+
+    resultado = importar_archivo(app, ruta)
+    assert resultado.exit_code == 0, resultado.output
+    assert '5 filas importadas' in resultado.output
+    assert 'filas/s' in resultado.output
+
+    vainilla = Ingrediente.query.filter_by(nombre='Vainilla').one()
+    assert isinstance(vainilla, Base) and vainilla.sabor == 'Vainilla'
+    copa = Producto.query.filter_by(nombre='Copa Vainilla').one()
+    assert copa.costo_produccion == 2 * 2 + 3
+    assert copa.rentabilidad == 0.0
+
+    # Reimportar no duplica filas ni pisa el acumulado de ventas
+    copa.rentabilidad = 40.0
+    db.session.commit()
+    resultado = importar_archivo(app, ruta)
+    assert resultado.exit_code == 0, resultado.output
+    db.session.expire_all()
+    assert Ingrediente.query.count() == 2
+    assert Receta.query.count() == 2
+    assert db.session.get(Producto, copa.id).rentabilidad == 40.0
+
+
+def test_reimportar_sin_columnas_opcionales_conserva_las_existentes(app, tmp_path):
+    ruta = tmp_path / 'completo.jsonl'
+    ruta.write_text(json.dumps({'entidad': 'ingrediente', 'nombre': 'Chispas', 'precio': 1.0, 'calorias': 40,
+                                'inventario': 12, 'es_vegetariano': True, 'tipo': 'complemento'}) + '\n'
+                    + json.dumps({'entidad': 'usuario', 'username': 'ana', 'password': 'x', 'es_admin': True}) + '\n',
+                    encoding='utf-8')
+    assert importar_archivo(app, ruta, '--procesos', '1').exit_code == 0
+
+    # Solo el precio: stock, tipo, bandera vegetariana y roles se conservan
+    ruta = tmp_path / 'precios.jsonl'
+    ruta.write_text(json.dumps({'entidad': 'ingrediente', 'nombre': 'Chispas', 'precio': 2.0, 'calorias': 40}) + '\n'
+                    + json.dumps({'entidad': 'usuario', 'username': 'ana', 'password': 'x'}) + '\n'
+                    + json.dumps({'entidad': 'ingrediente', 'nombre': 'Agua', 'precio': 0.5, 'calorias': 0}) + '\n',
+                    encoding='utf-8')
+    resultado = importar_archivo(app, ruta, '--procesos', '1')
+    assert resultado.exit_code == 0, resultado.output
+
+    db.session.expire_all()
+    chispas = Ingrediente.query.filter_by(nombre='Chispas').one()
+    assert (chispas.precio, chispas.inventario, chispas.tipo, chispas.es_vegetariano) == (2.0, 12, 'complemento', True)
+    assert Usuario.query.filter_by(username='ana').one().es_admin
+    # Las filas nuevas sí reciben los valores por defecto
+    agua = Ingrediente.query.filter_by(nombre='Agua').one()
+    assert (agua.inventario, agua.tipo, agua.es_vegetariano) == (0, 'ingrediente', False)
+
+
+def test_importar_jsonl_con_errores(app, tmp_path):
+    ruta = tmp_path / 'usuarios.jsonl'
+    filas = [{'username': f'usuario{i}', 'password': f'clave{i}', 'es_cliente': True} for i in range(4)]
+    ruta.write_text('\n'.join(json.dumps(f) for f in filas) + '\n{roto\n{"username": "sin_clave"}\n',
+                    encoding='utf-8')
+
+    resultado = importar_archivo(app, ruta, '--entidad', 'usuario', '--procesos', '2', '--lote', '3')
+    assert resultado.exit_code == 1
+    assert 'Línea 5: JSON inválido' in resultado.output
+    assert 'Línea 6: Falta password' in resultado.output
+
+    usuario = Usuario.query.filter_by(username='usuario3').one()
+    assert usuario.es_cliente
+    assert check_password_hash(usuario.password, 'clave3')
+    assert Usuario.query.count() == 4
+
+
+def test_poblar_base_datos_dos_veces(app):
+    poblar_base_datos(app)
+    resumen = poblar_base_datos(app)
+    assert resumen['errores'] == []
+    assert Usuario.query.count() == 3
+    assert Receta.query.count() == 7
+    assert Producto.query.filter_by(nombre='Batido Mixto').one().costo_produccion == 5.0 + 4.0 + 3.0 * 2
@@ -0,0 +1,117 @@
+import os
+import re
+import pytest
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from config import TestingConfig
+from database import db
+from models.producto import Producto
+from models.usuario import Usuario
+from tests.conftest import crear_token
+
+
+@pytest.fixture
+def app_instrumentada(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SECRET_KEY': TestingConfig.SECRET_KEY,
+        'EVENTOS_HILOS': 0,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'metricas.db'}",
+        'INSTRUMENTACION': True,
+        'PERFIL_MUESTREO': 1.0,
+        'PERFIL_MAXIMO': 2,
+        'PERFIL_DIRECTORIO': str(tmp_path / 'perfiles'),
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def valor(texto, metrica):
+    coincidencia = re.search(rf'^{re.escape(metrica)} (\S+)$', texto, re.M)
+    return float(coincidencia.group(1)) if coincidencia else None
+
+
+def test_metricas_por_endpoint(app_instrumentada):
+    db.session.add(Producto(nombre='Helado', precio_publico=10.0))
+    usuario = Usuario(username='cliente', password='x', es_cliente=True)
+    db.session.add(usuario)
+    db.session.commit()
+    headers = {'x-access-token': crear_token(usuario)}
+
+    client = app_instrumentada.test_client()
+    for _ in range(3):
+        assert client.get('/heladeria/api/productos/1', headers=headers).status_code == 200
+    assert client.get('/heladeria/productos').status_code == 200
+
+    texto = client.get('/metrics').get_data(as_text=True)
+    assert valor(texto, 'heladeria_requests_total{endpoint="heladeria.obtener_producto",method="GET",status="200"}') == 3
+    assert valor(texto, 'heladeria_request_duration_seconds_count{endpoint="heladeria.obtener_producto",method="GET"}') == 3
+    assert valor(texto, 'heladeria_sql_queries_per_request_sum{endpoint="heladeria.obtener_producto"}') >= 3
+    # El token se verifica una sola vez; las siguientes solicitudes usan la caché
+    assert valor(texto, 'heladeria_jwt_decode_seconds_count{}') == 1
+    assert valor(texto, 'heladeria_template_render_seconds_count{template="productos.html"}') == 1
+
+    # Solo se conservan los perfiles de las PERFIL_MAXIMO solicitudes más lentas
+    perfiles = app_instrumentada.extensions['heladeria_instrumentacion'].perfiles
+    assert len(perfiles.guardados()) == 2
+
+
+def test_metricas_suman_todos_los_workers(tmp_path):
+    """Dos instancias de la app con el mismo METRICAS_DIRECTORIO hacen de dos workers."""
+    config = {'TESTING': True, 'SECRET_KEY': TestingConfig.SECRET_KEY, 'EVENTOS_HILOS': 0,
+              'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'metricas.db'}",
+              'INSTRUMENTACION': True, 'METRICAS_DIRECTORIO': str(tmp_path / 'metricas'), 'METRICAS_INTERVALO': 0}
+    worker_a, worker_b = create_app(config), create_app(config)
+    # Con dos procesos reales cada uno tendría su pid; aquí se fuerza otro archivo
+    worker_b.extensions['heladeria_instrumentacion']._archivo = (os.getpid(), str(tmp_path / 'metricas' / 'b.json'))
+    with worker_a.app_context():
+        db.create_all()
+    (tmp_path / 'metricas' / 'incompleto.json').write_text('{"heladeria')
+
+    for _ in range(2):
+        assert worker_a.test_client().get('/heladeria/productos').status_code == 200
+    assert worker_b.test_client().get('/heladeria/productos').status_code == 200
+
+    for worker in (worker_a, worker_b):
+        texto = worker.test_client().get('/metrics').get_data(as_text=True)
+        assert valor(texto, 'heladeria_requests_total{endpoint="heladeria.pagina_listar_productos",'
+                            'method="GET",status="200"}') == 3
+
+
+def test_perfiles_compartidos_entre_workers(app_instrumentada, tmp_path, monkeypatch):
+    perfiles = app_instrumentada.extensions['heladeria_instrumentacion'].perfiles
+    (tmp_path / 'perfiles' / 'manual.prof').write_bytes(b'')
+    for ms in (100, 200):
+        (tmp_path / 'perfiles' / f'{ms:010.1f}ms_otro_{ms}.prof').write_bytes(b'')
+    # Otro worker borra el sobrante antes que este
+    borrar = os.remove
+
+    def borrado_por_otro(ruta):
+        borrar(ruta)
+        raise FileNotFoundError(ruta)
+
+    monkeypatch.setattr(os, 'remove', borrado_por_otro)
+    perfiles.terminar(perfiles.iniciar(), 0.3, 'heladeria.lento')
+    assert [round(d, 1) for d, _ in perfiles.guardados()] == [0.3, 0.2]
+
+
+def test_consulta_fallida_no_deja_inicios(app_instrumentada):
+    with app_instrumentada.test_request_context():
+        app_instrumentada.preprocess_request()
+        with db.engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql('SELECT * FROM tabla_inexistente')
+            assert not conn.info.get('metricas_inicio')
+
+
+def test_metricas_con_token(app_instrumentada):
+    app_instrumentada.config['METRICAS_TOKEN'] = 'secreto'
+    client = app_instrumentada.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secreto'}).status_code == 200
+
+
+def test_sin_instrumentacion_no_hay_metricas(client):
+    assert client.get('/metrics').status_code == 404
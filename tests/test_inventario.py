@@ -0,0 +1,192 @@
+import datetime
+from sqlalchemy import insert
+from database import db
+from models.ingrediente import Ingrediente
+from models.base import Base
+from models.complemento import Complemento
+from models.producto import Producto
+from models.receta import Receta
+from models.venta import Venta
+from services import eventos
+from services.eventos import procesar_lote
+from services.inventario import sugerir_reposicion
+
+
+def crear_ingredientes(n=3):
+    db.session.add_all(Ingrediente(nombre=f'Ingrediente {i}', precio=1.0, calorias=50, inventario=10,
+                                   es_vegetariano=True) for i in range(n))
+    db.session.commit()
+
+
+def test_reabastecer_lote(client, usuarios, contar_sql):
+    crear_ingredientes(3)
+    with contar_sql() as contador:
+        response = client.post('/heladeria/api/ingredientes/reabastecer', headers=usuarios['empleado'], json=[
+            {'id': 1, 'cantidad': 5},
+            {'id': 3, 'cantidad': 20},
+            {'id': 1, 'cantidad': 1},
+        ])
+
+    assert response.status_code == 200
+    assert {l['id']: l['inventario'] for l in response.json['ingredientes']} == {1: 16, 3: 30}
+    assert len([s for s in contador.sentencias if s.startswith('UPDATE ingredientes')]) == 1
+
+    db.session.expire_all()
+    assert [i.inventario for i in Ingrediente.query.order_by(Ingrediente.id)] == [16, 10, 30]
+
+
+def test_reabastecer_lote_invalido_no_aplica_nada(client, usuarios):
+    crear_ingredientes(2)
+    response = client.post('/heladeria/api/ingredientes/reabastecer', headers=usuarios['admin'], json={'items': [
+        {'id': 1, 'cantidad': 5},
+        {'id': 99, 'cantidad': 5},
+        {'id': 2, 'cantidad': -1},
+        {'id': 2, 'cantidad': True},
+        {'id': True, 'cantidad': 5},
+    ]})
+    assert response.status_code == 400
+    errores = [l.get('error') for l in response.json['lineas']]
+    assert errores[1] == 'Ingrediente no encontrado'
+    assert all(errores[2:])
+    db.session.expire_all()
+    assert [i.inventario for i in Ingrediente.query.order_by(Ingrediente.id)] == [10, 10]
+
+
+def test_reabastecer_lote_requiere_rol(client, usuarios):
+    crear_ingredientes(1)
+    response = client.post('/heladeria/api/ingredientes/reabastecer', headers=usuarios['cliente'],
+                           json=[{'id': 1, 'cantidad': 5}])
+    assert response.status_code == 403
+
+
+def test_reabastecer_ingrediente_inexistente(client, usuarios):
+    response = client.post('/heladeria/api/ingredientes/reabastecer/5', headers=usuarios['empleado'], json={'cantidad': 1})
+    assert response.status_code == 404
+
+
+def crear_tipos():
+    db.session.add_all([
+        Base('Chocolate', 5.0, 120, 10, True, 'Chocolate'),
+        Complemento('Leche', 3.0, 150, 10, False),
+        Base('Fresa', 4.0, 90, 10, True, 'Fresa'),
+    ])
+    db.session.commit()
+
+
+def test_carga_polimorfica(app):
+    crear_tipos()
+    db.session.expunge_all()
+    ingredientes = Ingrediente.query.order_by(Ingrediente.id).all()
+    assert [type(i) for i in ingredientes] == [Base, Complemento, Base]
+    assert ingredientes[0].sabor == 'Chocolate'
+    assert [i.tipo for i in ingredientes] == ['base', 'complemento', 'base']
+
+
+def test_listar_ingredientes_por_tipo(client, usuarios):
+    crear_tipos()
+    response = client.get('/heladeria/api/ingredientes?tipo=base&fields=nombre,sabor', headers=usuarios['empleado'])
+    assert response.status_code == 200
+    assert response.json == [{'id': 1, 'nombre': 'Chocolate', 'sabor': 'Chocolate'},
+                             {'id': 3, 'nombre': 'Fresa', 'sabor': 'Fresa'}]
+
+    response = client.get('/heladeria/api/ingredientes?tipo=complemento', headers=usuarios['empleado'])
+    assert [i['nombre'] for i in response.json] == ['Leche']
+
+    response = client.get('/heladeria/api/ingredientes?tipo=salsa', headers=usuarios['empleado'])
+    assert response.status_code == 400
+
+
+def test_reabastecer_y_renovar_por_tipo(client, usuarios, contar_sql):
+    crear_tipos()
+    with contar_sql() as contador:
+        response = client.post('/heladeria/api/ingredientes/reabastecer', headers=usuarios['empleado'],
+                               json={'tipo': 'base'})
+    assert response.status_code == 200
+    assert response.json['total'] == 2
+    assert not [s for s in contador.sentencias if s.startswith('SELECT') and 'ingredientes' in s]
+    assert len([s for s in contador.sentencias if s.startswith('UPDATE ingredientes')]) == 1
+
+    response = client.post('/heladeria/api/ingredientes/renovar', headers=usuarios['admin'])
+    assert response.json['total'] == 1
+
+    db.session.expire_all()
+    assert [i.inventario for i in Ingrediente.query.order_by(Ingrediente.id)] == [15, 0, 15]
+
+
+def test_reabastecer_por_tipo_ingrediente_no_toca_subclases(client, usuarios):
+    crear_tipos()
+    db.session.add(Ingrediente(nombre='Hielo', precio=0.5, calorias=0, inventario=0, es_vegetariano=True))
+    db.session.commit()
+
+    response = client.post('/heladeria/api/ingredientes/reabastecer', headers=usuarios['empleado'],
+                           json={'tipo': 'ingrediente', 'cantidad': 3})
+    assert response.json['total'] == 1
+
+    db.session.expire_all()
+    assert [i.inventario for i in Ingrediente.query.order_by(Ingrediente.id)] == [10, 10, 10, 3]
+
+
+def test_reabastecer_lote_usa_cantidad_del_tipo(client, usuarios):
+    crear_tipos()
+    response = client.post('/heladeria/api/ingredientes/reabastecer', headers=usuarios['empleado'],
+                           json=[{'id': 1}, {'id': 2}])
+    assert {l['id']: l['cantidad'] for l in response.json['ingredientes']} == {1: 5, 2: 10}
+
+
+def test_bajo_stock_y_alerta_al_cruzar_el_umbral(client, usuarios, monkeypatch):
+    crear_tipos()
+    db.session.add(Producto(nombre='Malteada', precio_publico=10.0, rentabilidad=0.0))
+    db.session.add(Receta(producto_id=1, ingrediente_id=2, cantidad=3))
+    db.session.commit()
+    alertas = []
+    monkeypatch.setitem(eventos.SUSCRIPTORES, 'stock_bajo', [alertas.extend])
+
+    response = client.put('/heladeria/api/ingredientes/2', headers=usuarios['admin'],
+                          json={'stock_minimo': 2, 'punto_reorden': 4})
+    assert response.status_code == 200
+    assert client.put('/heladeria/api/ingredientes/2', headers=usuarios['admin'],
+                      json={'stock_minimo': -1}).status_code == 400
+    assert client.get('/heladeria/api/ingredientes/bajo_stock', headers=usuarios['empleado']).json == []
+
+    # 10 - 2 * 3 = 4: llega al punto de reorden
+    client.post('/heladeria/api/ventas/lote', json=[{'producto_id': 1, 'cantidad': 2}], headers=usuarios['cliente'])
+    response = client.get('/heladeria/api/ingredientes/bajo_stock', headers=usuarios['empleado'])
+    assert [(i['nombre'], i['inventario']) for i in response.json] == [('Leche', 4)]
+    procesar_lote()
+    procesar_lote()
+    assert alertas == [{'ingredientes': [{'id': 2, 'nombre': 'Leche', 'inventario': 4, 'umbral': 4}]}]
+
+    # Ya estaba bajo stock: no se vuelve a avisar
+    client.post('/heladeria/api/productos/vender/1', headers=usuarios['cliente'])
+    procesar_lote()
+    procesar_lote()
+    assert len(alertas) == 1
+
+    client.post('/heladeria/api/ingredientes/reabastecer/2', headers=usuarios['empleado'], json={'cantidad': 10})
+    assert client.get('/heladeria/api/ingredientes/bajo_stock', headers=usuarios['empleado']).json == []
+
+
+def test_sugerir_reposicion_segun_consumo(app):
+    crear_tipos()
+    chocolate, leche, fresa = Ingrediente.query.order_by(Ingrediente.id).all()
+    chocolate.stock_minimo = 10   # bajo stock, con consumo
+    leche.punto_reorden = 12      # bajo stock, sin consumo
+    fresa.stock_minimo = 5        # sobre el umbral
+    db.session.add(Producto(nombre='Copa', precio_publico=10.0, rentabilidad=0.0))
+    db.session.add(Receta(producto_id=1, ingrediente_id=1, cantidad=2))
+    db.session.commit()
+    ahora = datetime.datetime.utcnow()
+    db.session.execute(insert(Venta), [
+        {'producto_id': 1, 'cantidad': 7, 'precio_unitario': 10.0, 'total': 70.0, 'fecha': ahora},
+        # Fuera del historial: no cuenta
+        {'producto_id': 1, 'cantidad': 50, 'precio_unitario': 10.0, 'total': 500.0,
+         'fecha': ahora - datetime.timedelta(days=30)},
+    ])
+    db.session.commit()
+
+    sugerencias = sugerir_reposicion(dias_historial=7, dias_cobertura=7)
+    # Chocolate: 14 unidades en 7 días = 2 por día; 10 + 14 - 10 = 14
+    assert [(s['nombre'], s['consumo_diario'], s['dias_restantes'], s['cantidad']) for s in sugerencias] == [
+        ('Chocolate', 2.0, 5.0, 14),
+        ('Leche', 0.0, None, 10),  # 12 - 10 = 2, pero se pide al menos lo del tipo
+    ]
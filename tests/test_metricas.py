@@ -0,0 +1,70 @@
+from database import db
+from models.ingrediente import Ingrediente
+from models.producto import Producto
+from models.receta import Receta
+from services.metricas import recalcular_todos
+
+
+def crear_catalogo():
+    chocolate = Ingrediente(nombre='Chocolate', precio=5.0, calorias=120, inventario=10, es_vegetariano=True)
+    fresa = Ingrediente(nombre='Fresa', precio=4.0, calorias=90, inventario=10, es_vegetariano=True)
+    leche = Ingrediente(nombre='Leche', precio=3.0, calorias=150, inventario=10, es_vegetariano=False)
+    db.session.add_all([
+        Producto(nombre='Helado de Chocolate', precio_publico=15.0, rentabilidad=0.0,
+                 receta=[Receta(ingrediente=chocolate, cantidad=2), Receta(ingrediente=leche, cantidad=1)]),
+        Producto(nombre='Helado de Fresa', precio_publico=12.0, rentabilidad=0.0,
+                 receta=[Receta(ingrediente=fresa, cantidad=1)]),
+        Producto(nombre='Agua', precio_publico=2.0, costo_produccion=1.0, calorias_totales=0, rentabilidad=0.0),
+    ])
+    db.session.commit()
+    return chocolate.id, fresa.id
+
+
+def metricas(nombre):
+    producto = Producto.query.filter_by(nombre=nombre).one()
+    return producto.costo_produccion, producto.calorias_totales, producto.rentabilidad_unitaria
+
+
+def test_metricas_se_calculan_al_crear_recetas(app):
+    crear_catalogo()
+    assert metricas('Helado de Chocolate') == (13.0, 370.5, 2.0)
+    assert metricas('Helado de Fresa') == (4.0, 85.5, 8.0)
+    # Sin receta: conserva los valores cargados a mano
+    assert metricas('Agua') == (1.0, 0, None)
+
+
+def test_cambio_de_ingrediente_solo_recalcula_afectados(app, contar_sql):
+    _, fresa = crear_catalogo()
+    with contar_sql(filtro=lambda sentencia: sentencia.startswith('UPDATE productos'), parametros=True) as contador:
+        db.session.get(Ingrediente, fresa).precio = 6.0
+        db.session.commit()
+    actualizados = contador.parametros
+
+    assert metricas('Helado de Fresa') == (6.0, 85.5, 6.0)
+    assert metricas('Helado de Chocolate') == (13.0, 370.5, 2.0)
+    # Un único UPDATE con una sola fila: la del producto que usa Fresa
+    producto_fresa = Producto.query.filter_by(nombre='Helado de Fresa').one()
+    assert len(actualizados) == 1
+    assert actualizados[0][-1] == producto_fresa.id
+
+
+def test_actualizar_ingrediente_api(client, usuarios):
+    chocolate, _ = crear_catalogo()
+
+    response = client.put(f'/heladeria/api/ingredientes/{chocolate}', headers=usuarios['admin'],
+                          json={'precio': 4.0, 'calorias': 100})
+    assert response.status_code == 200
+    assert metricas('Helado de Chocolate') == (11.0, 332.5, 4.0)
+
+    response = client.put(f'/heladeria/api/ingredientes/{chocolate}', headers=usuarios['empleado'], json={'precio': 1.0})
+    assert response.status_code == 403
+
+
+def test_recalcular_todos(app):
+    crear_catalogo()
+    db.session.execute(db.update(Producto).values(costo_produccion=None))
+    db.session.commit()
+
+    assert recalcular_todos() == 2
+    db.session.commit()
+    assert metricas('Helado de Chocolate') == (13.0, 370.5, 2.0)
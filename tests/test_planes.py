@@ -0,0 +1,144 @@
+"""
+Regresión de planes de consulta: cada ruta caliente se ejecuta sobre una base
+SQLite creada con las migraciones y sembrada, y cada sentencia que emite se
+pasa por EXPLAIN QUERY PLAN. Falla si alguna recorre una tabla completa.
+"""
+import sqlite3
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import insert, text
+from app import create_app
+from config import TestingConfig
+from database import db, bootstrap_db
+from models.ingrediente import Ingrediente
+from models.producto import Producto
+from models.receta import Receta
+from models.usuario import Usuario
+from models.venta import Venta
+from services.consultas import ContadorSQL
+from tests.conftest import crear_token
+
+N = 200
+
+# (método, ruta, rol, cuerpo JSON)
+RUTAS_CALIENTES = [
+    ('GET', '/heladeria/api/productos/7', 'cliente', None),
+    ('GET', '/heladeria/api/productos/nombre/Producto 7', 'empleado', None),
+    ('GET', '/heladeria/api/productos?after=100&limit=20', 'cliente', None),
+    ('GET', '/heladeria/api/ingredientes/7', 'empleado', None),
+    ('GET', '/heladeria/api/ingredientes/nombre/Ingrediente 7', 'empleado', None),
+    ('GET', '/heladeria/api/ingredientes/7/es_sano', 'cliente', None),
+    ('GET', '/heladeria/api/ingredientes/bajo_stock', 'empleado', None),
+    ('PUT', '/heladeria/api/ingredientes/7', 'admin', {'precio': 2.5}),
+    ('POST', '/heladeria/api/ingredientes/reabastecer/7', 'empleado', {'cantidad': 3}),
+    ('POST', '/heladeria/api/ingredientes/reabastecer', 'empleado', [{'id': 7, 'cantidad': 1}, {'id': 9, 'cantidad': 1}]),
+    ('POST', '/heladeria/api/productos/vender/7', 'cliente', None),
+    ('POST', '/heladeria/api/ventas/lote', 'cliente', [{'producto_id': 7}, {'producto_id': 9, 'cantidad': 2}]),
+    ('GET', '/heladeria/api/reportes/ventas?granularidad=hora', 'admin', None),
+    ('GET', '/heladeria/api/reportes/ventas?producto_id=7', 'admin', None),
+    ('GET', '/heladeria/api/reportes/productos/top', 'admin', None),
+]
+
+
+@pytest.fixture
+def app_sembrada(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SECRET_KEY': TestingConfig.SECRET_KEY,
+        'EVENTOS_HILOS': 0,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'planes.db'}",
+        'CACHE_DESHABILITADA': True,
+    })
+    # El esquema sale de las migraciones, no de create_all: así se prueban los índices reales
+    bootstrap_db(app)
+    with app.app_context():
+        db.session.execute(insert(Ingrediente), [
+            {'nombre': f'Ingrediente {i}', 'precio': 1.0, 'calorias': 50, 'inventario': 10 ** 6,
+             'es_vegetariano': True} for i in range(1, N + 1)])
+        db.session.execute(insert(Producto), [
+            {'nombre': f'Producto {i}', 'precio_publico': 10.0, 'rentabilidad': 0.0} for i in range(1, N + 1)])
+        db.session.execute(insert(Receta), [
+            {'producto_id': i, 'ingrediente_id': j, 'cantidad': 1}
+            for i in range(1, N + 1) for j in {i, i % N + 1}])
+        db.session.execute(insert(Venta), [
+            {'producto_id': i % N + 1, 'cantidad': 1, 'precio_unitario': 10.0, 'total': 10.0} for i in range(N * 5)])
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def tokens(app_sembrada):
+    creados = {rol: Usuario(username=rol, password='x', **{f'es_{rol}': True})
+               for rol in ('admin', 'empleado', 'cliente')}
+    db.session.add_all(creados.values())
+    db.session.commit()
+    return {rol: {'x-access-token': crear_token(u)} for rol, u in creados.items()}
+
+
+def escaneos_completos(conn, sentencia, parametros):
+    """Líneas del plan que recorren una tabla entera (SCAN sin índice)."""
+    if isinstance(parametros, list):
+        parametros = parametros[0]
+    plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sentencia}', parametros).all()
+    return [fila.detail for fila in plan
+            if fila.detail.startswith('SCAN ') and 'USING' not in fila.detail and 'CONSTANT ROW' not in fila.detail]
+
+
+@pytest.mark.parametrize('metodo, ruta, rol, cuerpo', RUTAS_CALIENTES)
+def test_rutas_calientes_no_recorren_tablas(app_sembrada, tokens, metodo, ruta, rol, cuerpo):
+    dml = ('SELECT', 'UPDATE', 'DELETE', 'INSERT')
+    with ContadorSQL(db.engine, filtro=lambda sentencia: sentencia.lstrip().upper().startswith(dml),
+                     parametros=True) as contador:
+        response = app_sembrada.test_client().open(ruta, method=metodo, headers=tokens[rol], json=cuerpo)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert contador.sentencias
+
+    with db.engine.connect() as conn:
+        problemas = {s: escaneos_completos(conn, s, p) for s, p in zip(contador.sentencias, contador.parametros)}
+    assert not {s: e for s, e in problemas.items() if e}
+
+
+def test_login_busca_usuario_por_indice(app_sembrada, tokens):
+    with db.engine.connect() as conn:
+        assert not escaneos_completos(conn, 'SELECT id FROM usuarios WHERE username = ?', ('admin',))
+        assert not escaneos_completos(conn, 'SELECT id FROM ingredientes WHERE nombre = ?', ('Ingrediente 7',))
+        assert not escaneos_completos(conn, 'SELECT SUM(total) FROM ventas WHERE producto_id = ?', (7,))
+
+
+def test_migraciones_coinciden_con_modelos(app_sembrada):
+    """Los índices declarados en los modelos deben existir en alguna migración."""
+    with db.engine.connect() as conn:
+        diferencias = compare_metadata(MigrationContext.configure(conn), db.metadata)
+    assert diferencias == []
+
+
+# Tablas tal como las creaba db.create_all() en la aplicación original
+ESQUEMA_ORIGINAL = (
+    'CREATE TABLE ingredientes (id INTEGER NOT NULL, nombre VARCHAR(100) NOT NULL, precio FLOAT NOT NULL, '
+    'calorias FLOAT NOT NULL, inventario INTEGER, es_vegetariano BOOLEAN, PRIMARY KEY (id))',
+    'CREATE TABLE productos (id INTEGER NOT NULL, nombre VARCHAR(80) NOT NULL, precio_publico FLOAT NOT NULL, '
+    'calorias_totales FLOAT, costo_produccion FLOAT, rentabilidad FLOAT, PRIMARY KEY (id), UNIQUE (nombre))',
+    'CREATE TABLE usuarios (id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, password VARCHAR(200) NOT NULL, '
+    'es_admin BOOLEAN, es_empleado BOOLEAN, es_cliente BOOLEAN, PRIMARY KEY (id), UNIQUE (username))',
+    "INSERT INTO ingredientes VALUES (1, 'Leche', 1.5, 50, 7, 1)",
+)
+
+
+def test_bootstrap_desde_el_esquema_original(tmp_path):
+    ruta = tmp_path / 'original.db'
+    with sqlite3.connect(ruta) as conn:
+        for sentencia in ESQUEMA_ORIGINAL:
+            conn.execute(sentencia)
+    app = create_app({'TESTING': True, 'SECRET_KEY': TestingConfig.SECRET_KEY, 'EVENTOS_HILOS': 0,
+                      'SQLALCHEMY_DATABASE_URI': f'sqlite:///{ruta}'})
+
+    bootstrap_db(app)
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert compare_metadata(MigrationContext.configure(conn), db.metadata) == []
+        leche = db.session.get(Ingrediente, 1)
+        assert (leche.nombre, leche.inventario, leche.tipo) == ('Leche', 7, 'ingrediente')
+        db.session.remove()
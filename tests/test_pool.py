@@ -0,0 +1,32 @@
+from config import Config
+from database.pool import PoolMedido, opciones_engine
+
+
+def configuracion(uri):
+    config = {clave: getattr(Config, clave) for clave in dir(Config) if clave.isupper()}
+    config['SQLALCHEMY_DATABASE_URI'] = uri
+    return config
+
+
+def test_opciones_engine_mysql():
+    opciones = opciones_engine(configuracion('mysql+pymysql://u:p@localhost/heladeria'))
+    assert opciones['poolclass'] is PoolMedido
+    assert opciones['pool_pre_ping'] is True
+    assert opciones['pool_recycle'] == Config.DB_POOL_RECYCLE
+    assert opciones['pool_size'] == Config.DB_POOL_SIZE
+
+
+def test_opciones_engine_sqlite_en_memoria():
+    assert opciones_engine(configuracion('sqlite://')) == {}
+
+
+def test_metricas_del_pool(client, usuarios):
+    response = client.get('/heladeria/api/sistema/pool', headers=usuarios['admin'])
+    assert response.status_code == 200
+    pool = response.json['default']
+    assert pool['clase'] == 'PoolMedido'
+    assert pool['en_uso'] >= 1
+    assert pool['obtenciones'] >= 1
+    assert {'overflow', 'espera_media_ms', 'espera_maxima_ms', 'agotados'} <= set(pool)
+
+    assert client.get('/heladeria/api/sistema/pool', headers=usuarios['empleado']).status_code == 403
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import text
+from database import db
+from models.producto import Producto
+from services.consultas import presupuesto_sql
+from tests.plugin_sql import VigilanteSQL
+
+
+def test_token_cacheado_consulta_solo_el_producto(client, usuarios, contar_sql):
+    db.session.add(Producto(nombre='Helado', precio_publico=10.0))
+    db.session.commit()
+    client.get('/heladeria/api/productos/1', headers=usuarios['cliente'])
+
+    with contar_sql() as contador:
+        response = client.get('/heladeria/api/productos/1', headers=usuarios['cliente'])
+    assert response.status_code == 200
+    assert contador.total == 1
+
+
+@pytest.mark.sin_presupuesto_sql
+def test_vigilante_detecta_excesos_y_repeticiones(app):
+    @presupuesto_sql(1)
+    def n_mas_uno():
+        for i in range(3):
+            db.session.execute(text('SELECT :i'), {'i': i})
+        return 'ok'
+
+    @presupuesto_sql(5, repetidas=True)
+    def repeticion_permitida():
+        for i in range(3):
+            db.session.execute(text('SELECT :i'), {'i': i})
+        return 'ok'
+
+    app.add_url_rule('/n_mas_uno', view_func=n_mas_uno)
+    app.add_url_rule('/repeticion_permitida', view_func=repeticion_permitida)
+
+    with VigilanteSQL() as vigilante:
+        client = app.test_client()
+        client.get('/repeticion_permitida')
+        assert vigilante.violaciones == []
+        client.get('/n_mas_uno')
+
+    assert len(vigilante.violaciones) == 2
+    assert '3 sentencias SQL, presupuesto 1' in vigilante.violaciones[0]
+    assert 'repetida 3 veces' in vigilante.violaciones[1]
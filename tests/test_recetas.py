@@ -0,0 +1,57 @@
+from database import db
+from models.ingrediente import Ingrediente
+from models.producto import Producto
+from models.receta import Receta
+from models.venta import Venta
+
+
+def crear_catalogo():
+    chocolate = Ingrediente(nombre='Chocolate', precio=5.0, calorias=120, inventario=10, es_vegetariano=True)
+    fresa = Ingrediente(nombre='Fresa', precio=4.0, calorias=90, inventario=3, es_vegetariano=True)
+    leche = Ingrediente(nombre='Leche', precio=3.0, calorias=150, inventario=100, es_vegetariano=False)
+    helado = Producto(nombre='Helado de Chocolate', precio_publico=15.0, rentabilidad=0.0,
+                      receta=[Receta(ingrediente=chocolate, cantidad=2), Receta(ingrediente=leche, cantidad=1)])
+    batido = Producto(nombre='Batido Mixto', precio_publico=20.0, rentabilidad=0.0,
+                      receta=[Receta(ingrediente=chocolate, cantidad=1), Receta(ingrediente=fresa, cantidad=1),
+                              Receta(ingrediente=leche, cantidad=2)])
+    db.session.add_all([helado, batido])
+    db.session.commit()
+    return helado.id, batido.id
+
+
+def inventarios():
+    db.session.expire_all()
+    return {i.nombre: i.inventario for i in Ingrediente.query.all()}
+
+
+def test_venta_descuenta_ingredientes(client, usuarios):
+    helado, _ = crear_catalogo()
+
+    response = client.post(f'/heladeria/api/productos/vender/{helado}', headers=usuarios['cliente'])
+    assert response.status_code == 200
+    assert inventarios() == {'Chocolate': 8, 'Fresa': 3, 'Leche': 99}
+
+
+def test_venta_lote_descuenta_ingredientes(client, usuarios):
+    helado, batido = crear_catalogo()
+
+    response = client.post('/heladeria/api/ventas/lote', headers=usuarios['cliente'], json=[
+        {'producto_id': helado, 'cantidad': 2},
+        {'producto_id': batido, 'cantidad': 3},
+    ])
+    assert response.status_code == 200
+    assert inventarios() == {'Chocolate': 3, 'Fresa': 0, 'Leche': 92}
+
+
+def test_stock_insuficiente_no_aplica_nada(client, usuarios):
+    helado, batido = crear_catalogo()
+
+    response = client.post('/heladeria/api/ventas/lote', headers=usuarios['cliente'], json=[
+        {'producto_id': helado, 'cantidad': 1},
+        {'producto_id': batido, 'cantidad': 4},
+    ])
+    assert response.status_code == 409
+    assert response.json['ingredientes'] == ['Fresa']
+    assert inventarios() == {'Chocolate': 10, 'Fresa': 3, 'Leche': 100}
+    assert Venta.query.count() == 0
+    assert db.session.get(Producto, helado).rentabilidad == 0.0
@@ -0,0 +1,91 @@
+import datetime
+from sqlalchemy import insert, select
+from database import db
+from models.producto import Producto
+from models.resumen_venta import VentaPorDia, VentaPorHora
+from models.venta import Venta
+from services.reportes import reconstruir_resumenes
+
+
+def crear_productos():
+    db.session.add_all([
+        Producto(nombre='Copa', precio_publico=10.0, costo_produccion=4.0, rentabilidad=0.0),
+        Producto(nombre='Malteada', precio_publico=8.0, costo_produccion=2.0, rentabilidad=0.0),
+    ])
+    db.session.commit()
+
+
+def resumenes(modelo):
+    return db.session.execute(
+        select(modelo.producto_id, modelo.periodo, modelo.unidades, modelo.ingresos, modelo.costo, modelo.ventas)
+        .order_by(modelo.producto_id, modelo.periodo)
+    ).all()
+
+
+def test_ventas_alimentan_los_reportes(client, usuarios):
+    crear_productos()
+    client.post('/heladeria/api/productos/vender/1', headers=usuarios['cliente'])
+    client.post('/heladeria/api/ventas/lote', headers=usuarios['cliente'],
+                json=[{'producto_id': 1, 'cantidad': 2}, {'producto_id': 2, 'cantidad': 5}])
+
+    response = client.get('/heladeria/api/reportes/ventas', headers=usuarios['admin'])
+    assert response.status_code == 200
+    hoy, = response.json['periodos']
+    assert hoy['periodo'] == datetime.datetime.utcnow().date().isoformat()
+    assert (hoy['unidades'], hoy['ingresos'], hoy['costo'], hoy['margen']) == (8, 70.0, 22.0, 48.0)
+
+    response = client.get('/heladeria/api/reportes/ventas?granularidad=hora&producto_id=2', headers=usuarios['admin'])
+    assert [(p['unidades'], p['margen']) for p in response.json['periodos']] == [(5, 30.0)]
+
+    response = client.get('/heladeria/api/reportes/productos/top?orden=unidades&n=1', headers=usuarios['admin'])
+    assert [(p['nombre'], p['unidades']) for p in response.json['productos']] == [('Malteada', 5)]
+    response = client.get('/heladeria/api/reportes/productos/top', headers=usuarios['admin'])
+    assert [p['nombre'] for p in response.json['productos']] == ['Malteada', 'Copa']
+
+    assert client.get('/heladeria/api/reportes/ventas', headers=usuarios['empleado']).status_code == 403
+    for consulta in ('?desde=ayer', '?desde=2026-02-01&hasta=2026-01-01', '?granularidad=semana',
+                     '?granularidad=hora&desde=2026-01-01&hasta=2026-03-01', '?producto_id=abc'):
+        assert client.get(f'/heladeria/api/reportes/ventas{consulta}', headers=usuarios['admin']).status_code == 400
+    for n in ('0', 'diez'):
+        assert client.get(f'/heladeria/api/reportes/productos/top?n={n}', headers=usuarios['admin']).status_code == 400
+
+
+def test_reconstruir_desde_el_libro(client, usuarios):
+    crear_productos()
+    client.post('/heladeria/api/ventas/lote', headers=usuarios['cliente'],
+                json=[{'producto_id': 1, 'cantidad': 2}, {'producto_id': 2}, {'producto_id': 1}])
+    vivos = {modelo: resumenes(modelo) for modelo in (VentaPorHora, VentaPorDia)}
+
+    assert reconstruir_resumenes() == 2
+    assert {modelo: resumenes(modelo) for modelo in vivos} == vivos
+
+    # Una venta anterior al costo registrado usa el costo actual del producto
+    hace_diez_dias = datetime.datetime.utcnow() - datetime.timedelta(days=10)
+    db.session.execute(insert(Venta), [{'producto_id': 1, 'cantidad': 1, 'precio_unitario': 10.0, 'total': 10.0,
+                                        'fecha': hace_diez_dias}])
+    db.session.commit()
+    # Desde hoy: la venta vieja no entra
+    assert reconstruir_resumenes(datetime.datetime.utcnow().date()) == 2
+    assert len(resumenes(VentaPorDia)) == 2
+
+    assert reconstruir_resumenes() == 3
+    viejo = db.session.execute(
+        select(VentaPorDia.costo).where(VentaPorDia.periodo == hace_diez_dias.date())
+    ).scalar_one()
+    assert viejo == 4.0
+
+
+def test_reconstruir_confirma_cada_tramo(app, contar_sql):
+    crear_productos()
+    ahora = datetime.datetime.utcnow()
+    db.session.execute(insert(Venta), [
+        {'producto_id': 1, 'cantidad': 1, 'precio_unitario': 10.0, 'total': 10.0, 'costo_unitario': 4.0,
+         'fecha': ahora - datetime.timedelta(days=dias)}
+        for dias in (20, 10, 0)])
+    db.session.commit()
+
+    with contar_sql(filtro=lambda sentencia: sentencia.startswith('DELETE')) as contador:
+        assert reconstruir_resumenes() == 3
+    # Tres tramos de DIAS_POR_PASO días, cada uno borra y rehace lo suyo
+    assert contador.total == 2 * len(range(0, 21, 7))
+    assert [fila.unidades for fila in resumenes(VentaPorDia)] == [1, 1, 1]
@@ -0,0 +1,176 @@
+import datetime
+import time
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+from database import db
+from models.producto import Producto
+from models.token_revocado import TokenRevocado
+from models.usuario import Usuario
+from services import sesiones
+from services.consultas import ContadorSQL
+from services.contrasenas import (Contrasenas, CuboTokens, RanurasHost, VerificadorOcupado, hashear,
+                                  normalizar_metodo)
+from services.sesiones import CacheTTL
+
+
+def consultas_a_usuarios(client, url, headers):
+    with ContadorSQL(db.engine, filtro=lambda sentencia: 'usuarios' in sentencia) as contador:
+        response = client.get(url, headers=headers)
+    return response, contador.sentencias
+
+
+def test_token_cacheado_no_consulta_usuarios(client, usuarios):
+    db.session.add(Producto(nombre='Helado', precio_publico=10.0))
+    db.session.commit()
+
+    response, consultas = consultas_a_usuarios(client, '/heladeria/api/productos/1', usuarios['cliente'])
+    assert response.status_code == 200
+    assert len(consultas) == 1
+
+    response, consultas = consultas_a_usuarios(client, '/heladeria/api/productos/1', usuarios['cliente'])
+    assert response.status_code == 200
+    assert consultas == []
+
+
+def test_usuario_eliminado_invalida_cache(client, usuarios):
+    assert client.get('/heladeria/api/ingredientes', headers=usuarios['empleado']).status_code == 200
+
+    db.session.delete(Usuario.query.filter_by(username='empleado').one())
+    db.session.commit()
+
+    response = client.get('/heladeria/api/ingredientes', headers=usuarios['empleado'])
+    assert response.status_code == 404
+
+
+def test_cache_ttl_lru():
+    cache = CacheTTL(maximo=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    # 'b' era la entrada menos usada
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+    cache.set('d', 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('d') is None
+
+
+def test_cache_deshabilitada():
+    cache = CacheTTL(maximo=0, ttl=60)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+
+def login(client, password='clave'):
+    return client.post('/auth/api_login', json={'username': 'pos', 'password': password})
+
+
+def test_login_rehashea_con_el_metodo_configurado(app, client):
+    db.session.add(Usuario(username='pos', password=generate_password_hash('clave', 'pbkdf2:sha256:2000'),
+                           es_cliente=True))
+    db.session.commit()
+    app.extensions['heladeria_contrasenas'].metodo = 'pbkdf2:sha256:1500'
+
+    assert login(client, 'otra').status_code == 401
+    assert Usuario.query.filter_by(username='pos').one().password.startswith('pbkdf2:sha256:2000$')
+
+    assert login(client).status_code == 200
+    db.session.expire_all()
+    nuevo = Usuario.query.filter_by(username='pos').one().password
+    assert nuevo.startswith('pbkdf2:sha256:1500$')
+    assert check_password_hash(nuevo, 'clave')
+
+
+def test_login_limita_intentos_por_usuario(app, client):
+    app.extensions['heladeria_contrasenas'].limite_usuario = CuboTokens(rafaga=3, por_minuto=1)
+    db.session.add(Usuario(username='pos', password=hashear('clave'), es_cliente=True))
+    db.session.commit()
+
+    assert [login(client, 'mala').status_code for _ in range(3)] == [401, 401, 401]
+    response = login(client)
+    assert response.status_code == 429
+    assert 0 < int(response.headers['Retry-After']) <= 60
+
+
+def test_cubo_tokens_recupera_intentos(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr('services.contrasenas.time.monotonic', lambda: reloj[0])
+    cubo = CuboTokens(rafaga=2, por_minuto=6)
+    assert cubo.consumir('a') == 0 and cubo.consumir('a') == 0
+    assert cubo.consumir('a') == pytest.approx(10)
+    assert cubo.consumir('b') == 0
+    reloj[0] += 10
+    assert cubo.consumir('a') == 0
+
+
+def test_verificador_saturado_rechaza(app):
+    contrasenas = Contrasenas('pbkdf2:sha256:1000', hilos=1, cola=1,
+                              limite_usuario=CuboTokens(0, 0), limite_ip=CuboTokens(0, 0))
+    hash_ = contrasenas.hashear('clave')
+    assert contrasenas.verificar(hash_, 'clave') == (True, None)
+    contrasenas._pendientes.acquire()
+    with pytest.raises(VerificadorOcupado):
+        contrasenas.verificar(hash_, 'clave')
+    assert normalizar_metodo('pbkdf2') == 'pbkdf2:sha256:1000000'
+    assert normalizar_metodo('scrypt:16384') == 'scrypt:16384:8:1'
+
+
+def test_ranuras_compartidas_entre_procesos(tmp_path):
+    # Dos instancias sobre el mismo directorio se comportan como dos workers
+    pytest.importorskip('fcntl')
+    worker_1 = RanurasHost(str(tmp_path), n=1)
+    worker_2 = Contrasenas('pbkdf2:sha256:1000', hilos=2, cola=2, limite_usuario=CuboTokens(0, 0),
+                           limite_ip=CuboTokens(0, 0), ranuras=RanurasHost(str(tmp_path), n=1, espera=0.05))
+    hash_ = worker_2.hashear('clave')
+    with worker_1.ocupar():
+        with pytest.raises(VerificadorOcupado):
+            worker_2.verificar(hash_, 'clave')
+    assert worker_2.verificar(hash_, 'clave') == (True, None)
+
+
+def test_refresh_token_renueva_sin_contrasena(app, client, monkeypatch):
+    db.session.add(Usuario(username='pos', password=hashear('clave'), es_empleado=True))
+    db.session.commit()
+    tokens = login(client).get_json()
+
+    # El refresco no verifica la contraseña
+    monkeypatch.setattr('services.contrasenas.check_password_hash', None)
+    response = client.post('/auth/refresh', json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+    acceso = response.get_json()['token']
+    assert client.get('/heladeria/api/ingredientes', headers={'x-access-token': acceso}).status_code == 200
+
+    # Un refresh token no sirve como token de acceso, ni al revés
+    assert client.get('/heladeria/api/ingredientes',
+                      headers={'x-access-token': tokens['refresh_token']}).status_code == 401
+    assert client.post('/auth/refresh', json={'refresh_token': acceso}).status_code == 401
+
+
+def test_refresh_token_revocado(app, client):
+    db.session.add(Usuario(username='pos', password=hashear('clave'), es_cliente=True))
+    db.session.commit()
+    refresco = login(client).get_json()['refresh_token']
+
+    assert client.post('/auth/revocar', json={'refresh_token': refresco}).status_code == 200
+    assert client.post('/auth/refresh', json={'refresh_token': refresco}).status_code == 401
+    assert TokenRevocado.query.count() == 1
+
+    # Otro worker (lista en memoria vacía) la lee de la base
+    sesiones.revocados.clear()
+    assert client.post('/auth/refresh', json={'refresh_token': refresco}).status_code == 401
+    assert len(sesiones.revocados) == 1
+
+
+def test_revocacion_confirmada_fuera_de_orden(app):
+    """Un id asignado antes que otro pero confirmado después no se pierde en la siguiente lectura."""
+    expira = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+    revocados = sesiones.Revocados(intervalo=0)
+    db.session.add(TokenRevocado(id=2, jti='posterior', expira=expira))
+    db.session.commit()
+    assert not revocados.contiene('anterior')
+
+    db.session.add(TokenRevocado(id=1, jti='anterior', expira=expira))
+    db.session.commit()
+    assert revocados.contiene('anterior') and revocados.contiene('posterior')
@@ -0,0 +1,169 @@
+from concurrent.futures import ThreadPoolExecutor
+from database import db
+from models.producto import Producto
+from models.venta import Venta
+from services.ventas import rentabilidad_desde_libro
+
+
+def crear_producto(**kwargs):
+    datos = {'nombre': 'Helado de Chocolate', 'precio_publico': 15.0, 'calorias_totales': 200,
+             'costo_produccion': 8.0, 'rentabilidad': 0.0}
+    datos.update(kwargs)
+    producto = Producto(**datos)
+    db.session.add(producto)
+    db.session.commit()
+    return producto.id
+
+
+def test_vender_producto_registra_en_libro(client, usuarios):
+    producto_id = crear_producto()
+
+    response = client.post(f'/heladeria/api/productos/vender/{producto_id}', headers=usuarios['cliente'])
+    assert response.status_code == 200
+    assert response.json['message'] == "¡Producto Helado de Chocolate vendido exitosamente!"
+
+    venta = Venta.query.one()
+    assert venta.producto_id == producto_id
+    assert venta.precio_unitario == 15.0
+    assert venta.total == 15.0
+    assert db.session.get(Producto, producto_id).rentabilidad == 15.0
+
+
+def test_vender_producto_inexistente(client, usuarios):
+    response = client.post('/heladeria/api/productos/vender/999', headers=usuarios['cliente'])
+    assert response.status_code == 404
+    assert Venta.query.count() == 0
+
+
+def test_vender_producto_con_rentabilidad_nula(client, usuarios):
+    producto_id = crear_producto(rentabilidad=None)
+
+    response = client.post(f'/heladeria/api/productos/vender/{producto_id}', headers=usuarios['empleado'])
+    assert response.status_code == 200
+    assert db.session.get(Producto, producto_id).rentabilidad == 15.0
+
+
+def test_ventas_concurrentes_no_pierden_incrementos(app, usuarios):
+    producto_id = crear_producto()
+    n = 40
+
+    def vender(_):
+        with app.test_client() as c:
+            return c.post(f'/heladeria/api/productos/vender/{producto_id}', headers=usuarios['cliente']).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codigos = list(pool.map(vender, range(n)))
+
+    assert codigos == [200] * n
+    db.session.expire_all()
+    assert Venta.query.count() == n
+    assert db.session.get(Producto, producto_id).rentabilidad == 15.0 * n
+    assert rentabilidad_desde_libro(producto_id) == 15.0 * n
+
+
+def test_pagina_vender_producto(client):
+    producto_id = crear_producto()
+
+    response = client.post(f'/heladeria/productos/vender/{producto_id}')
+    assert response.status_code == 302
+    assert Venta.query.count() == 1
+    assert db.session.get(Producto, producto_id).rentabilidad == 15.0
+
+
+def test_vender_lote(client, usuarios):
+    chocolate = crear_producto()
+    fresa = crear_producto(nombre='Helado de Fresa', precio_publico=12.0)
+
+    response = client.post('/heladeria/api/ventas/lote', headers=usuarios['cliente'], json={'items': [
+        {'producto_id': chocolate, 'cantidad': 2},
+        {'producto_id': fresa, 'cantidad': 1},
+        {'producto_id': chocolate},
+    ]})
+    assert response.status_code == 200
+    assert response.json['total'] == 15.0 * 3 + 12.0
+    assert [l['nombre'] for l in response.json['lineas']] == ['Helado de Chocolate', 'Helado de Fresa', 'Helado de Chocolate']
+    assert Venta.query.count() == 3
+    assert db.session.get(Producto, chocolate).rentabilidad == 45.0
+    assert db.session.get(Producto, fresa).rentabilidad == 12.0
+
+
+def test_vender_lote_invalido_no_aplica_nada(client, usuarios):
+    chocolate = crear_producto()
+
+    response = client.post('/heladeria/api/ventas/lote', headers=usuarios['cliente'], json=[
+        {'producto_id': chocolate, 'cantidad': 1},
+        {'producto_id': 999, 'cantidad': 1},
+        {'producto_id': chocolate, 'cantidad': 0},
+        {'producto_id': chocolate, 'cantidad': True},
+        {'producto_id': True},
+    ])
+    assert response.status_code == 400
+    lineas = response.json['lineas']
+    assert 'error' not in lineas[0]
+    assert lineas[1]['error'] == 'Producto no encontrado'
+    assert all('error' in l for l in lineas[2:])
+    assert Venta.query.count() == 0
+    assert db.session.get(Producto, chocolate).rentabilidad == 0.0
+
+
+def test_stock_de_producto_reabastecer_vender_y_agotar(client, usuarios):
+    producto_id = crear_producto()
+    vender = lambda: client.post(f'/heladeria/api/productos/vender/{producto_id}', headers=usuarios['cliente'])
+
+    # Sin stock registrado (NULL) se vende sin límite
+    assert vender().status_code == 200
+    response = client.post(f'/heladeria/api/productos/reabastecer/{producto_id}', json={'cantidad': 2},
+                           headers=usuarios['empleado'])
+    assert response.status_code == 200 and response.json['inventario'] == 2
+
+    assert vender().status_code == 200
+    assert vender().status_code == 200
+    response = vender()
+    assert response.status_code == 409
+    assert response.json['productos'] == ['Helado de Chocolate']
+    db.session.expire_all()
+    assert db.session.get(Producto, producto_id).inventario == 0
+    assert Venta.query.count() == 3
+
+
+def test_vender_lote_agotado_no_aplica_nada(client, usuarios):
+    con_stock = crear_producto(nombre='Paleta', inventario=5)
+    escaso = crear_producto(nombre='Cono', inventario=1)
+    response = client.post('/heladeria/api/ventas/lote', headers=usuarios['cliente'],
+                           json=[{'producto_id': con_stock, 'cantidad': 2}, {'producto_id': escaso, 'cantidad': 2}])
+    assert response.status_code == 409
+    assert response.json['productos'] == ['Cono']
+    db.session.expire_all()
+    assert [db.session.get(Producto, i).inventario for i in (con_stock, escaso)] == [5, 1]
+    assert Venta.query.count() == 0
+
+
+def test_renovar_inventario_de_varios_productos(client, usuarios, contar_sql):
+    ids = [crear_producto(nombre=f'Producto {i}', inventario=i) for i in range(3)]
+    cuerpo = [{'id': ids[0], 'nueva_cantidad': 10}, {'id': ids[1], 'nueva_cantidad': None},
+              {'id': ids[2], 'nueva_cantidad': 0}]
+    with contar_sql() as contador:
+        response = client.post('/heladeria/api/productos/renovar', json=cuerpo, headers=usuarios['admin'])
+    assert response.status_code == 200 and response.json['total'] == 3
+    assert sum(s.startswith('UPDATE productos') for s in contador.sentencias) == 1
+    db.session.expire_all()
+    assert [db.session.get(Producto, i).inventario for i in ids] == [10, None, 0]
+
+    response = client.post('/heladeria/api/productos/renovar', headers=usuarios['admin'],
+                           json=[{'id': ids[0], 'nueva_cantidad': 1}, {'id': 999, 'nueva_cantidad': 1}])
+    assert response.status_code == 404 and response.json['ids'] == [999]
+    db.session.expire_all()
+    assert db.session.get(Producto, ids[0]).inventario == 10
+
+
+def test_renovar_inventario_de_un_producto_rechaza_booleanos(client, usuarios):
+    producto_id = crear_producto(inventario=5)
+    for cantidad in (True, False, -1, '3'):
+        response = client.post(f'/heladeria/api/productos/renovar/{producto_id}', json={'nueva_cantidad': cantidad},
+                               headers=usuarios['admin'])
+        assert response.status_code == 400
+    response = client.post(f'/heladeria/api/productos/renovar/{producto_id}', json={'nueva_cantidad': 0},
+                           headers=usuarios['admin'])
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Producto, producto_id).inventario == 0